@@ -2,6 +2,11 @@
 from .base import Agent, AgentResponse
 from .openai_agent import OpenAIAgent
 from .anthropic_agent import AnthropicAgent
-from .agent_factory import AgentFactory
+from .agent_factory import AgentFactory, AgentRegistry, agent_registry
+from .clients import ProviderClients, provider_clients
+from .cassettes import CassetteAgent, CassetteMiss, CassetteStore
 
-__all__ = ["Agent", "AgentResponse", "OpenAIAgent", "AnthropicAgent", "AgentFactory"]
\ No newline at end of file
+__all__ = [
+    "Agent", "AgentResponse", "OpenAIAgent", "AnthropicAgent", "AgentFactory", "AgentRegistry", "agent_registry",
+    "ProviderClients", "provider_clients", "CassetteAgent", "CassetteMiss", "CassetteStore"
+]
\ No newline at end of file
@@ -1,11 +1,18 @@
 """
 Agent Factory for creating AI agents based on configuration
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Tuple
+import logging
+
 from app.agents.base import Agent
+from app.agents.cassettes import CassetteAgent, cassette_store
 from app.agents.openai_agent import OpenAIAgent
 from app.agents.anthropic_agent import AnthropicAgent
 from app.agents.mock_agent import MockAgent
+from app.core.config import settings
+from app.db.experiment_configs import CompiledExperiment
+
+logger = logging.getLogger(__name__)
 
 
 class AgentFactory:
@@ -34,7 +41,7 @@ class AgentFactory:
         
         # Create appropriate agent based on provider
         if provider == "openai":
-            return OpenAIAgent(
+            agent = OpenAIAgent(
                 name=name,
                 model=model,
                 persona=persona,
@@ -43,7 +50,7 @@ class AgentFactory:
                 config=config
             )
         elif provider == "anthropic":
-            return AnthropicAgent(
+            agent = AnthropicAgent(
                 name=name,
                 model=model,
                 persona=persona,
@@ -52,7 +59,7 @@ class AgentFactory:
                 config=config
             )
         elif provider == "mock":
-            return MockAgent(
+            agent = MockAgent(
                 name=name,
                 model=model,
                 persona=persona,
@@ -62,6 +69,16 @@ class AgentFactory:
             )
         else:
             raise ValueError(f"Unknown model provider: {provider}")
+        
+        # Record or replay replies when a cassette is configured
+        if settings.LLM_CASSETTE_MODE in CassetteAgent.MODES:
+            agent = CassetteAgent(
+                agent,
+                cassette_store(settings.LLM_CASSETTE_PATH),
+                settings.LLM_CASSETTE_MODE,
+                replay_latency=settings.LLM_CASSETTE_REPLAY_LATENCY
+            )
+        return agent
     
     @staticmethod
     def create_agents_from_config(experiment_config: Dict[str, Any]) -> Dict[str, Agent]:
@@ -80,4 +97,76 @@ class AgentFactory:
                 )
                 agents[role["name"]] = agent
         
-        return agents
\ No newline at end of file
+        return agents
+
+
+class AgentRegistry:
+    """Agent instances kept for the lifetime of a session.
+    
+    Agents are keyed by (session_id, participant_id, role-config hash) and
+    built once, when the session is activated or on the first turn that
+    needs them, so per-agent state such as prompt caches and provider
+    clients survives between turns. Editing a role's configuration changes
+    its hash and the agent is rebuilt on the next turn. Sessions are
+    evicted when they complete, time out or are cancelled.
+    """
+    
+    def __init__(self):
+        self._sessions: Dict[str, Dict[Tuple[str, str], Agent]] = {}
+        self.built = 0
+        self.reused = 0
+    
+    def activate(
+        self,
+        session_id: str,
+        ai_participants: Iterable[Any],
+        experiment: CompiledExperiment
+    ) -> List[Tuple[Any, Dict[str, Any], Agent]]:
+        """Get (participant, role, agent) for each AI participant with a role, building missing agents"""
+        agents = self._sessions.setdefault(str(session_id), {})
+        active = []
+        for participant in ai_participants:
+            role = experiment.ai_role(participant.name)
+            if not role:
+                continue
+            
+            key = (str(participant.id), experiment.role_hashes[participant.name])
+            agent = agents.get(key)
+            if agent is not None:
+                self.reused += 1
+            else:
+                try:
+                    agent = AgentFactory.create_agent(
+                        name=participant.name,
+                        model=role.get("model", participant.ai_model),
+                        persona=role.get("persona", ""),
+                        knowledge=role.get("knowledge", {}),
+                        strategy=role.get("strategy"),
+                        config=role.get("config", {})
+                    )
+                except Exception as e:
+                    logger.error(f"Error creating agent for {participant.name}: {e}")
+                    continue
+                # An agent built for an older version of the role is dropped
+                for stale in [k for k in agents if k[0] == key[0]]:
+                    del agents[stale]
+                agents[key] = agent
+                self.built += 1
+            active.append((participant, role, agent))
+        return active
+    
+    def evict(self, session_id: str) -> int:
+        """Drop a session's agents; returns how many were dropped"""
+        return len(self._sessions.pop(str(session_id), {}))
+    
+    def session_agents(self, session_id: str) -> int:
+        """Number of agents held for a session"""
+        return len(self._sessions.get(str(session_id), {}))
+    
+    def shutdown(self):
+        """Drop every session's agents"""
+        self._sessions.clear()
+
+
+# Global agent registry instance
+agent_registry = AgentRegistry()
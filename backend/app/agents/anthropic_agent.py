@@ -1,23 +1,92 @@
 """
 Anthropic Agent implementation
 """
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
+import json
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.agents.base import Agent, AgentResponse, ConversationMessage
+from app.agents.clients import provider_clients
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 
 class AnthropicAgent(Agent):
-    """Agent powered by Anthropic's Claude models"""
+    """Agent powered by Anthropic's Claude models.
+    
+    Talks to the Messages API directly over the shared connection pool for
+    settings.ANTHROPIC_BASE_URL (roles may set base_url in config). The
+    system prompt is sent as cached blocks, so the instructions, rules,
+    persona and knowledge are processed once and read from the provider's
+    prompt cache on later turns. Token usage, including cache reads and writes, is reported
+    in AgentResponse.metadata; for streamed replies it is kept in last_usage.
+    """
+    
+    API_VERSION = "2023-06-01"
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Initialize Anthropic client when API is available
+        self.last_usage: Dict[str, int] = {}
+    
+    @property
+    def base_url(self) -> str:
+        return self.config.get("base_url") or settings.ANTHROPIC_BASE_URL
+    
+    def build_request(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        stream: bool = False
+    ) -> Dict[str, Any]:
+        """Build the Messages API request body"""
+        messages: List[Dict[str, str]] = []
+        for msg in self.context_messages(conversation_history):
+            role = "assistant" if msg.participant_name == self.name else "user"
+            content = f"{msg.participant_name}: {msg.content}"
+            # Turns must alternate, so consecutive messages from others are merged
+            if messages and messages[-1]["role"] == role:
+                messages[-1]["content"] += f"\n{content}"
+            else:
+                messages.append({"role": role, "content": content})
         
+        # The conversation must start with, and the reply follow, a user turn
+        if not messages or messages[0]["role"] != "user":
+            messages.insert(0, {"role": "user", "content": "(The conversation is starting.)"})
+        if messages[-1]["role"] != "user":
+            messages.append({"role": "user", "content": "(It is your turn to reply.)"})
+        
+        return {
+            "model": self.model.split("/")[-1],  # Extract model name from identifier
+            "max_tokens": self.max_reply_tokens,
+            "temperature": 0.7,
+            # The shared part is its own cached block so other agents in the
+            # experiment can reuse it; the agent's own part extends the prefix
+            "system": [
+                {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+                for text in self.system_prompt_parts(task_instructions) if text
+            ],
+            "messages": messages,
+            "stream": stream
+        }
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": settings.ANTHROPIC_API_KEY or "",
+            "anthropic-version": self.API_VERSION,
+            "content-type": "application/json"
+        }
+    
+    @staticmethod
+    def _usage(usage: Dict[str, Any]) -> Dict[str, int]:
+        counts = {
+            key: usage.get(key) or 0
+            for key in ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+        }
+        counts["tokens_used"] = sum(counts.values())
+        return counts
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
     async def generate_response(
         self,
@@ -26,14 +95,80 @@ class AnthropicAgent(Agent):
         last_message: Optional[ConversationMessage] = None
     ) -> AgentResponse:
         """Generate a response using Anthropic API"""
+        body = self.build_request(conversation_history, task_instructions)
         
-        # TODO: Implement Anthropic API integration
-        # For now, return a placeholder response
-        return AgentResponse(
-            content="I'm an Anthropic agent (coming soon!)",
-            should_respond=True,
-            metadata={"model": self.model}
-        )
+        try:
+            response = await provider_clients.http(self.base_url).post(
+                "/v1/messages", json=body, headers=self._headers()
+            )
+            response.raise_for_status()
+            data = response.json()
+            
+            content = "".join(
+                block.get("text", "") for block in data.get("content", []) if block.get("type") == "text"
+            ).strip()
+            self.last_usage = self._usage(data.get("usage", {}))
+            
+            return AgentResponse(
+                content=content,
+                should_respond=bool(content),
+                metadata={
+                    "model": self.model,
+                    "stop_reason": data.get("stop_reason"),
+                    **self.last_usage
+                }
+            )
+        
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            return AgentResponse(
+                content="Sorry, I'm having trouble responding right now.",
+                should_respond=True,
+                metadata={"error": str(e)}
+            )
+    
+    async def stream_response(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        last_message: Optional[ConversationMessage] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response from the Anthropic API as server-sent events"""
+        body = self.build_request(conversation_history, task_instructions, stream=True)
+        usage: Dict[str, Any] = {}
+        streamed = False
+        
+        try:
+            async with provider_clients.http(self.base_url).stream(
+                "POST", "/v1/messages", json=body, headers=self._headers()
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    kind = event.get("type")
+                    if kind == "message_start":
+                        usage.update(event.get("message", {}).get("usage", {}))
+                    elif kind == "message_delta":
+                        usage.update(event.get("usage", {}))
+                    elif kind == "error":
+                        raise RuntimeError(event.get("error", {}).get("message", "stream error"))
+                    elif kind == "content_block_delta" and event["delta"].get("type") == "text_delta":
+                        delta = event["delta"]["text"]
+                        # Leading whitespace of the reply is dropped, as in generate_response
+                        if not streamed:
+                            delta = delta.lstrip()
+                            if not delta:
+                                continue
+                        streamed = True
+                        yield delta
+            self.last_usage = self._usage(usage)
+        
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            if not streamed:
+                yield "Sorry, I'm having trouble responding right now."
     
     async def should_participate(
         self,
@@ -45,9 +180,9 @@ class AnthropicAgent(Agent):
         # Use same logic as OpenAI agent for now
         if not last_message:
             return False
-            
+        
         if self.name.lower() in last_message.content.lower():
             return True
-            
+        
         import random
-        return random.random() < 0.3
\ No newline at end of file
+        return random.random() < 0.3
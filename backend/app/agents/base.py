@@ -2,10 +2,13 @@
 Base Agent class for AI team members
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from pydantic import BaseModel
 from datetime import datetime
 
+from app.agents.context import fit_context, reply_token_limit
+from app.core.config import settings
+
 
 class AgentResponse(BaseModel):
     """Response from an AI agent"""
@@ -22,8 +25,34 @@ class ConversationMessage(BaseModel):
     timestamp: datetime
 
 
+class PromptCacheStats:
+    """How often agents reused a compiled system prompt, across all agents"""
+    
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+    
+    def snapshot(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None
+        }
+
+
+# Global system prompt cache counters
+prompt_cache_stats = PromptCacheStats()
+
+
 class Agent(ABC):
-    """Abstract base class for AI agents"""
+    """Abstract base class for AI agents.
+    
+    An agent's persona, knowledge and strategy are fixed for its lifetime
+    (AgentRegistry builds a new agent when the role config changes), so its
+    system prompt is compiled once per set of task instructions and reused
+    on every turn.
+    """
     
     def __init__(
         self,
@@ -40,6 +69,8 @@ class Agent(ABC):
         self.knowledge = knowledge
         self.strategy = strategy
         self.config = config or {}
+        self._knowledge_text: Optional[str] = None
+        self._system_prompts: Dict[str, Tuple[str, str]] = {}
         
     @abstractmethod
     async def generate_response(
@@ -51,6 +82,22 @@ class Agent(ABC):
         """Generate a response based on conversation history"""
         pass
     
+    async def stream_response(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        last_message: Optional[ConversationMessage] = None
+    ) -> AsyncIterator[str]:
+        """Yield the response in pieces as it is generated.
+        
+        Agents whose provider can stream override this; by default the whole
+        response from generate_response is yielded at once, and nothing if
+        the agent decided not to respond.
+        """
+        response = await self.generate_response(conversation_history, task_instructions, last_message)
+        if response.should_respond and response.content:
+            yield response.content
+    
     @abstractmethod
     async def should_participate(
         self,
@@ -60,39 +107,76 @@ class Agent(ABC):
         """Decide if the agent should respond to the current message"""
         pass
     
+    @property
+    def reply_char_limit(self) -> int:
+        """Longest reply the agent is asked for (roles may set max_reply_chars in config)"""
+        return self.config.get("max_reply_chars") or settings.AI_REPLY_MAX_CHARS
+    
+    @property
+    def max_reply_tokens(self) -> int:
+        """Provider max_tokens that fits a reply at the character limit"""
+        return reply_token_limit(self.reply_char_limit)
+    
+    def context_messages(self, conversation_history: List[ConversationMessage]) -> List[ConversationMessage]:
+        """The recent messages that fit the model's context token budget.
+        
+        Roles may set context_tokens in config; otherwise the budget comes
+        from AI_CONTEXT_TOKEN_BUDGETS or AI_CONTEXT_TOKEN_BUDGET.
+        """
+        return fit_context(conversation_history, self.model, self.config.get("context_tokens"))
+    
     def format_knowledge(self) -> str:
         """Format agent's knowledge into a readable string"""
-        lines = []
-        for location, facts in self.knowledge.items():
-            lines.append(f"\n{location}:")
-            for criterion, value in facts.items():
-                lines.append(f"  - {criterion}: {value}")
-        return "\n".join(lines)
+        if self._knowledge_text is None:
+            lines = []
+            for location, facts in self.knowledge.items():
+                lines.append(f"\n{location}:")
+                for criterion, value in facts.items():
+                    lines.append(f"  - {criterion}: {value}")
+            self._knowledge_text = "\n".join(lines)
+        return self._knowledge_text
     
-    def build_system_prompt(self, task_instructions: str) -> str:
-        """Build the system prompt for the agent"""
-        prompt_parts = [
-            # Base persona
-            self.persona,
-            
+    def system_prompt_parts(self, task_instructions: str) -> Tuple[str, str]:
+        """The system prompt as (shared, own) text, compiled once per task instructions.
+        
+        The shared part (task instructions and rules) is the same for every
+        agent in an experiment and comes first, so providers that cache by
+        prompt prefix can reuse it across agents; the agent's own persona,
+        knowledge and strategy follow. Both are byte-identical on every turn.
+        """
+        parts = self._system_prompts.get(task_instructions)
+        if parts is not None:
+            prompt_cache_stats.hits += 1
+            return parts
+        prompt_cache_stats.misses += 1
+        
+        shared = "\n".join(filter(None, [
             # Task context
-            "\nTASK INSTRUCTIONS:",
+            "TASK INSTRUCTIONS:",
             task_instructions,
             
-            # Agent's unique knowledge
-            "\nYOUR UNIQUE INFORMATION:",
-            self.format_knowledge(),
-            
-            # Strategy hints
-            f"\nSTRATEGY: {self.strategy}" if self.strategy else "",
-            
             # General behavior rules
             "\nIMPORTANT RULES:",
-            "- Keep messages under 250 characters",
+            f"- Keep messages under {self.reply_char_limit} characters",
             "- Respond naturally and conversationally",
             "- Share your unique information when relevant",
             "- Help the team work toward completing the task",
             "- Say 'task-complete' only when the team has agreed on a final ranking"
-        ]
-        
-        return "\n".join(filter(None, prompt_parts))
\ No newline at end of file
+        ]))
+        own = "\n".join(filter(None, [
+            # Base persona
+            self.persona,
+            
+            # Agent's unique knowledge
+            "\nYOUR UNIQUE INFORMATION:",
+            self.format_knowledge(),
+            
+            # Strategy hints
+            f"\nSTRATEGY: {self.strategy}" if self.strategy else ""
+        ]))
+        parts = self._system_prompts[task_instructions] = (shared, own)
+        return parts
+    
+    def build_system_prompt(self, task_instructions: str) -> str:
+        """Build the system prompt for the agent"""
+        return "\n\n".join(filter(None, self.system_prompt_parts(task_instructions)))
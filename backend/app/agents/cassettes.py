@@ -0,0 +1,222 @@
+"""
+Record and replay of agent replies, for offline tests and reproducible benchmarks
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+
+from app.agents.base import Agent, AgentResponse, ConversationMessage
+
+logger = logging.getLogger(__name__)
+
+
+class CassetteMiss(KeyError):
+    """A replayed request that was never recorded"""
+
+
+def request_fingerprint(
+    agent: Agent,
+    conversation_history: List[ConversationMessage],
+    task_instructions: str
+) -> str:
+    """Stable key for what an agent would send its provider.
+    
+    Covers the model, the system prompt and who said what; timestamps are
+    left out so a recorded session matches when it is played again later.
+    """
+    request = {
+        "model": agent.model,
+        "system": agent.build_system_prompt(task_instructions),
+        "conversation": [[msg.participant_name, msg.content] for msg in conversation_history]
+    }
+    return _digest(request)
+
+
+def participation_fingerprint(agent: Agent, conversation_history: List[ConversationMessage]) -> str:
+    """Stable key for an agent's decision whether to join the conversation"""
+    request = {
+        "participate": agent.name,
+        "model": agent.model,
+        "conversation": [[msg.participant_name, msg.content] for msg in conversation_history]
+    }
+    return _digest(request)
+
+
+def _digest(request: Dict) -> str:
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+@dataclass
+class Recording:
+    """One reply as it was received"""
+    content: str
+    should_respond: bool
+    metadata: Dict
+    latency: float
+
+
+@dataclass
+class _Track:
+    recordings: List[Recording] = field(default_factory=list)
+    played: int = 0
+
+
+class CassetteStore:
+    """Recorded replies keyed by request fingerprint, kept in a JSON Lines file.
+    
+    Each line is one reply. A request recorded several times (an agent may
+    answer the same conversation differently) is replayed round-robin.
+    Records are appended as they happen, so an interrupted recording run
+    keeps what it captured.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._tracks: Dict[str, _Track] = {}
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._load()
+    
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._track(entry.pop("key")).recordings.append(Recording(**entry))
+    
+    def _track(self, key: str) -> _Track:
+        return self._tracks.setdefault(key, _Track())
+    
+    def __len__(self) -> int:
+        return sum(len(track.recordings) for track in self._tracks.values())
+    
+    def record(self, key: str, recording: Recording):
+        """Keep a reply and append it to the file"""
+        self._track(key).recordings.append(recording)
+        self.recorded += 1
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, **recording.__dict__}, separators=(",", ":")) + "\n")
+    
+    def replay(self, key: str) -> Recording:
+        """The next recorded reply for a request"""
+        track = self._tracks.get(key)
+        if not track or not track.recordings:
+            self.misses += 1
+            raise CassetteMiss(key)
+        self.hits += 1
+        recording = track.recordings[track.played % len(track.recordings)]
+        track.played += 1
+        return recording
+
+
+class CassetteAgent(Agent):
+    """Wraps an agent so its replies are recorded to, or replayed from, a store.
+    
+    In record mode every generate_response call goes to the wrapped agent and
+    its reply and latency are stored. In replay mode nothing reaches the
+    provider: replies come from the store, after the recorded latency when
+    replay_latency is set, and an unrecorded request raises CassetteMiss.
+    Streaming goes through generate_response (the Agent default), so a
+    streamed reply is recorded and replayed whole.
+    
+    should_participate decisions are often random, so they are recorded and
+    replayed too; otherwise a replayed session would take other turns than
+    the recording and drift off it.
+    """
+    
+    MODES = ("record", "replay")
+    
+    def __init__(self, inner: Agent, store: CassetteStore, mode: str, replay_latency: bool = True):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        super().__init__(
+            name=inner.name,
+            model=inner.model,
+            persona=inner.persona,
+            knowledge=inner.knowledge,
+            strategy=inner.strategy,
+            config=inner.config
+        )
+        self.inner = inner
+        self.store = store
+        self.mode = mode
+        self.replay_latency = replay_latency
+    
+    def build_system_prompt(self, task_instructions: str) -> str:
+        return self.inner.build_system_prompt(task_instructions)
+    
+    async def generate_response(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        last_message: Optional[ConversationMessage] = None
+    ) -> AgentResponse:
+        """Replay the recorded reply, or generate one and record it"""
+        key = request_fingerprint(self.inner, conversation_history, task_instructions)
+        
+        if self.mode == "replay":
+            try:
+                recording = self.store.replay(key)
+            except CassetteMiss:
+                logger.warning(f"No recorded reply for {self.name} ({key}) in {self.store.path}")
+                raise
+            if self.replay_latency and recording.latency > 0:
+                await asyncio.sleep(recording.latency)
+            return AgentResponse(
+                content=recording.content,
+                should_respond=recording.should_respond,
+                metadata={**recording.metadata, "replayed": True}
+            )
+        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        response = await self.inner.generate_response(conversation_history, task_instructions, last_message)
+        self.store.record(key, Recording(
+            content=response.content,
+            should_respond=response.should_respond,
+            metadata=response.metadata,
+            latency=round(loop.time() - started, 4)
+        ))
+        return response
+    
+    async def should_participate(
+        self,
+        conversation_history: List[ConversationMessage],
+        last_message: Optional[ConversationMessage] = None
+    ) -> bool:
+        """Replay the recorded decision, or make one and record it"""
+        key = participation_fingerprint(self.inner, conversation_history)
+        
+        if self.mode == "replay":
+            try:
+                return self.store.replay(key).should_respond
+            except CassetteMiss:
+                logger.warning(f"No recorded participation for {self.name} ({key}) in {self.store.path}")
+                raise
+        
+        decision = await self.inner.should_participate(conversation_history, last_message)
+        self.store.record(key, Recording(content="", should_respond=decision, metadata={}, latency=0.0))
+        return decision
+
+
+_stores: Dict[str, CassetteStore] = {}
+
+
+def cassette_store(path: str) -> CassetteStore:
+    """The process-wide store for a cassette file"""
+    store = _stores.get(path)
+    if store is None:
+        store = _stores[path] = CassetteStore(path)
+    return store
@@ -0,0 +1,105 @@
+"""
+Process-wide pooled HTTP clients for LLM providers
+"""
+from typing import Dict, Optional, Tuple
+import importlib.util
+import logging
+
+import httpx
+import openai
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderClients:
+    """Keep-alive connection pools shared by every agent, one per base URL.
+    
+    Agents borrow clients instead of building their own, so a turn with
+    several agents on one provider reuses warm connections (and, with h2
+    installed, multiplexes them over HTTP/2) rather than paying for a TLS
+    handshake per agent. Pool sizes and timeouts come from the LLM_HTTP_*
+    settings. The app lifespan calls close(); clients are created again on
+    first use after that.
+    """
+    
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        http2: Optional[bool] = None
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections or settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY if keepalive_expiry is None else keepalive_expiry
+        )
+        connect = settings.LLM_HTTP_CONNECT_TIMEOUT if connect_timeout is None else connect_timeout
+        read = settings.LLM_HTTP_READ_TIMEOUT if read_timeout is None else read_timeout
+        self.timeout = httpx.Timeout(read, connect=connect)
+        http2 = settings.LLM_HTTP2 if http2 is None else http2
+        # HTTP/2 needs the optional h2 package
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.info("h2 is not installed; LLM provider connections use HTTP/1.1")
+        self._http: Dict[str, httpx.AsyncClient] = {}
+        self._openai: Dict[Tuple[Optional[str], str], Tuple[openai.AsyncOpenAI, httpx.AsyncClient]] = {}
+    
+    def open(self):
+        """Create the pools of the providers that have an API key configured"""
+        if settings.OPENAI_API_KEY:
+            self.openai(settings.OPENAI_API_KEY)
+        if settings.ANTHROPIC_API_KEY:
+            self.http(settings.ANTHROPIC_BASE_URL)
+    
+    def http(self, base_url: str) -> httpx.AsyncClient:
+        """Pooled client for a provider's base URL"""
+        client = self._http.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2
+            )
+            self._http[base_url] = client
+        return client
+    
+    def openai(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """OpenAI SDK client running over the pool for its base URL"""
+        base_url = base_url or settings.OPENAI_BASE_URL
+        http_client = self.http(base_url)
+        cached = self._openai.get((api_key, base_url))
+        if cached is not None and cached[1] is http_client:
+            return cached[0]
+        client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=self.timeout,
+            http_client=http_client
+        )
+        self._openai[(api_key, base_url)] = (client, http_client)
+        return client
+    
+    async def close(self):
+        """Close every pool"""
+        clients = list(self._http.values())
+        self._http.clear()
+        self._openai.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.error(f"Error closing provider client: {e}")
+    
+    def stats(self) -> Dict[str, int]:
+        """Open pools, for health checks"""
+        return {"pools": len(self._http), "openai_clients": len(self._openai)}
+
+
+# Global provider client manager
+provider_clients = ProviderClients()
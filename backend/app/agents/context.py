@@ -0,0 +1,80 @@
+"""
+Token-budgeted conversation context for agents
+"""
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional
+import math
+
+from app.core.config import settings
+
+if TYPE_CHECKING:  # base imports this module
+    from app.agents.base import ConversationMessage
+
+try:
+    import tiktoken
+except ImportError:  # Optional exact tokenizer; estimated from length otherwise
+    tiktoken = None
+
+
+# Characters per token assumed when no tokenizer is installed
+CHARS_PER_TOKEN = 4
+# Role and separator tokens each chat message adds on top of its text
+MESSAGE_OVERHEAD_TOKENS = 4
+# Characters per token assumed when sizing replies; lower than CHARS_PER_TOKEN
+# so a reply at the character limit is not cut off
+REPLY_CHARS_PER_TOKEN = 3
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str, model: str = "") -> int:
+    """Tokens in a piece of text, cached since the same messages are counted every turn"""
+    if tiktoken is not None:
+        return len(_encoding(model.split("/")[-1]).encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def render_message(message: "ConversationMessage") -> str:
+    """A conversation message as agents send it to their provider"""
+    return f"{message.participant_name}: {message.content}"
+
+
+def context_budget(model: str) -> int:
+    """Context tokens allowed for a model: AI_CONTEXT_TOKEN_BUDGETS, else the default"""
+    budgets = settings.AI_CONTEXT_TOKEN_BUDGETS
+    return budgets.get(model) or budgets.get(model.split("/")[-1]) or settings.AI_CONTEXT_TOKEN_BUDGET
+
+
+def fit_context(
+    conversation_history: List["ConversationMessage"],
+    model: str,
+    budget: Optional[int] = None
+) -> List["ConversationMessage"]:
+    """The most recent messages that fit in the token budget, oldest first.
+    
+    Messages are taken from newest to oldest until the next one would go
+    over; the newest is always included so the agent has something to
+    answer.
+    """
+    budget = budget or context_budget(model)
+    used = 0
+    start = len(conversation_history)
+    for index in range(len(conversation_history) - 1, -1, -1):
+        cost = count_tokens(render_message(conversation_history[index]), model) + MESSAGE_OVERHEAD_TOKENS
+        if used + cost > budget and start < len(conversation_history):
+            break
+        used += cost
+        start = index
+    return conversation_history[start:]
+
+
+def reply_token_limit(max_chars: int) -> int:
+    """max_tokens for a reply that should stay under max_chars characters"""
+    return math.ceil(max_chars / REPLY_CHARS_PER_TOKEN)
@@ -3,7 +3,7 @@ Mock Agent implementation for testing without API keys
 """
 import random
 import asyncio
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from datetime import datetime
 
 from app.agents.base import Agent, AgentResponse, ConversationMessage
@@ -62,6 +62,23 @@ class MockAgent(Agent):
             }
         )
     
+    async def stream_response(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        last_message: Optional[ConversationMessage] = None
+    ) -> AsyncIterator[str]:
+        """Stream a mock response word by word, like a model emitting tokens"""
+        
+        # Simulate time to first token
+        await asyncio.sleep(random.uniform(0.2, 0.6))
+        
+        response = self._generate_contextual_response(conversation_history)
+        for index, word in enumerate(response.split(" ")):
+            if index:
+                await asyncio.sleep(random.uniform(0.02, 0.08))
+            yield word if index == 0 else " " + word
+    
     async def should_participate(
         self,
         conversation_history: List[ConversationMessage],
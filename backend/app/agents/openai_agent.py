@@ -2,11 +2,12 @@
 OpenAI Agent implementation
 """
 import openai
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 import logging
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.agents.base import Agent, AgentResponse, ConversationMessage
+from app.agents.clients import provider_clients
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -15,10 +16,26 @@ logger = logging.getLogger(__name__)
 class OpenAIAgent(Agent):
     """Agent powered by OpenAI models"""
     
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        openai.api_key = settings.OPENAI_API_KEY
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """Async API client on the shared connection pool (roles may set base_url in config)"""
+        return provider_clients.openai(settings.OPENAI_API_KEY, self.config.get("base_url"))
+    
+    def build_messages(self, conversation_history: List[ConversationMessage], task_instructions: str) -> List[dict]:
+        """Build the chat messages for the API"""
+        messages = [
+            {"role": "system", "content": self.build_system_prompt(task_instructions)}
+        ]
         
+        # Add as much recent conversation as fits the token budget
+        for msg in self.context_messages(conversation_history):
+            role = "assistant" if msg.participant_name == self.name else "user"
+            messages.append({
+                "role": role,
+                "content": f"{msg.participant_name}: {msg.content}"
+            })
+        return messages
+    
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
     async def generate_response(
         self,
@@ -29,25 +46,15 @@ class OpenAIAgent(Agent):
         """Generate a response using OpenAI API"""
         
         # Build messages for the API
-        messages = [
-            {"role": "system", "content": self.build_system_prompt(task_instructions)}
-        ]
-        
-        # Add conversation history
-        for msg in conversation_history[-20:]:  # Last 20 messages for context
-            role = "assistant" if msg.participant_name == self.name else "user"
-            messages.append({
-                "role": role,
-                "content": f"{msg.participant_name}: {msg.content}"
-            })
+        messages = self.build_messages(conversation_history, task_instructions)
         
         try:
             # Call OpenAI API
-            response = await openai.ChatCompletion.acreate(
+            response = await self.client.chat.completions.create(
                 model=self.model.split("/")[-1],  # Extract model name from identifier
                 messages=messages,
                 temperature=0.7,
-                max_tokens=150,
+                max_tokens=self.max_reply_tokens,
                 presence_penalty=0.1,
                 frequency_penalty=0.1
             )
@@ -76,6 +83,44 @@ class OpenAIAgent(Agent):
                 metadata={"error": str(e)}
             )
     
+    async def stream_response(
+        self,
+        conversation_history: List[ConversationMessage],
+        task_instructions: str,
+        last_message: Optional[ConversationMessage] = None
+    ) -> AsyncIterator[str]:
+        """Stream a response from the OpenAI API token by token"""
+        messages = self.build_messages(conversation_history, task_instructions)
+        streamed = False
+        
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model.split("/")[-1],
+                messages=messages,
+                temperature=0.7,
+                max_tokens=self.max_reply_tokens,
+                presence_penalty=0.1,
+                frequency_penalty=0.1,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    # Leading whitespace of the reply is dropped, as in generate_response
+                    if not streamed:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    streamed = True
+                    yield delta
+        
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            if not streamed:
+                yield "Sorry, I'm having trouble responding right now."
+    
     async def should_participate(
         self,
         conversation_history: List[ConversationMessage],
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 from app.db.database import get_db
+from app.db.experiment_configs import experiment_configs
 from app.models.experiment import Experiment, Condition
 from app.schemas.experiment import (
     ExperimentCreate,
@@ -219,6 +220,7 @@ async def update_experiment(
     
     await db.commit()
     await db.refresh(experiment)
+    experiment_configs.invalidate(experiment.id)
     
     # Load conditions relationship
     await db.execute(
@@ -245,6 +247,7 @@ async def delete_experiment(experiment_id: UUID, db: AsyncSession = Depends(get_
     
     await db.delete(experiment)
     await db.commit()
+    experiment_configs.invalidate(experiment_id)
 
 
 @router.get("/{experiment_id}/conditions", response_model=List[ConditionResponse])
@@ -6,6 +6,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
 from sqlalchemy.orm import selectinload
 from app.db.database import get_db
+from app.db.history import get_message_page
+from app.db.sequences import sequence_allocator
+from app.db.message_writer import message_writer
+from app.db.experiment_configs import experiment_configs
+from app.db.conversations import conversation_windows
+from app.core.config import settings
 from app.models.session import Session, SessionStatus
 from app.models.participant import Participant, ParticipantType
 from app.models.experiment import Condition, Experiment
@@ -19,9 +25,12 @@ from app.schemas.session import (
     SessionJoinResponse,
     SessionLeaveRequest,
     SessionCompleteRequest,
-    SessionStatsResponse
+    SessionStatsResponse,
+    MessagePageResponse
 )
 from app.core.websocket_manager import manager
+from app.core.ai_turns import ai_turns
+from app.agents.agent_factory import agent_registry
 from typing import List, Optional
 from uuid import UUID
 import secrets
@@ -205,6 +214,19 @@ async def join_session(
         # TODO: Initialize AI participants based on experiment config
         
         await db.commit()
+        
+        # Build the session's agents now rather than on the first human message
+        ai_participants = await db.execute(
+            select(Participant).where(
+                and_(
+                    Participant.session_id == db_session.id,
+                    Participant.type == ParticipantType.AI,
+                    Participant.left_at.is_(None)
+                )
+            )
+        )
+        experiment = await db.get(Experiment, condition.experiment_id)
+        agent_registry.activate(db_session.id, ai_participants.scalars().all(), experiment_configs.get(experiment))
     
     # Build WebSocket URL
     ws_scheme = "wss" if request.url.scheme == "https" else "ws"
@@ -263,6 +285,12 @@ async def leave_session(
     
     await db.commit()
     
+    if session.status == SessionStatus.CANCELLED:
+        ai_turns.cancel(session_id)
+        agent_registry.evict(session_id)
+        experiment_configs.forget_session(session_id)
+        conversation_windows.forget(session_id)
+    
     # Notify other participants via WebSocket
     await manager.broadcast_to_session(
         session_id,
@@ -300,8 +328,15 @@ async def complete_session(
     session.completed_at = datetime.utcnow()
     session.final_outcome = complete_request.final_outcome or {}
     
+    # No AI replies after completion, and the transcript must be durable first
+    ai_turns.cancel(session.id)
+    agent_registry.evict(session.id)
+    await message_writer.flush()
     await db.commit()
     await db.refresh(session)
+    sequence_allocator.forget(session.id)
+    experiment_configs.forget_session(session.id)
+    conversation_windows.forget(session.id)
     
     # Notify all participants
     await manager.broadcast_to_session(
@@ -344,6 +379,25 @@ async def get_session(
     return session
 
 
+@router.get("/{session_id}/messages", response_model=MessagePageResponse)
+async def get_session_messages(
+    session_id: UUID,
+    before: Optional[int] = Query(None, description="Only messages with a lower sequence number"),
+    limit: int = Query(50, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get a page of session messages, newest page first"""
+    session = await db.get(Session, str(session_id))
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    
+    messages, next_cursor = await get_message_page(db, session.id, limit, before=before)
+    return MessagePageResponse(messages=messages, next_cursor=next_cursor)
+
+
 @router.get("/stats/summary", response_model=SessionStatsResponse)
 async def get_session_stats(
     start_date: Optional[datetime] = None,
@@ -421,6 +475,11 @@ async def timeout_session(session_id: UUID, db: AsyncSession = Depends(get_db)):
         session.status = SessionStatus.TIMEOUT
         session.completed_at = datetime.utcnow()
         await db.commit()
+        ai_turns.cancel(session.id)
+        agent_registry.evict(session.id)
+        sequence_allocator.forget(session.id)
+        experiment_configs.forget_session(session.id)
+        conversation_windows.forget(session.id)
         
         # Notify participants
         await manager.broadcast_to_session(
@@ -2,21 +2,28 @@
 WebSocket endpoints for real-time communication
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, and_
-from app.db.database import get_db
+from app.db.database import get_session_factory
+from app.db.history import get_message_page
+from app.db.sequences import sequence_allocator
+from app.db.message_writer import message_writer
+from app.db.experiment_configs import experiment_configs
+from app.db.conversations import conversation_windows
+from app.core.config import settings
 from app.core.websocket_manager import manager
+from app.core.ai_turns import ai_turns, ReplyPacer
+from app.core.frames import negotiate_encoding, decode_inbound
 from app.models.session import Session, SessionStatus
 from app.models.participant import Participant, ParticipantType
 from app.models.message import Message
-from app.models.experiment import Experiment
-from app.agents.agent_factory import AgentFactory
-from app.schemas.websocket import ChatMessage, WebSocketMessage
+from app.agents.agent_factory import agent_registry
+from app.agents.base import Agent
 import asyncio
 import logging
-import json
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Optional
+from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -27,39 +34,81 @@ async def websocket_endpoint(
     websocket: WebSocket,
     session_id: str,
     participant_id: str = Query(...),
-    db: AsyncSession = Depends(get_db)
+    batch: bool = Query(False),
+    last_seq: Optional[int] = Query(None),
+    epoch: Optional[str] = Query(None),
+    session_factory: async_sessionmaker = Depends(get_session_factory)
 ):
-    """WebSocket endpoint for chat communication"""
+    """WebSocket endpoint for chat communication.
+    
+    Clients connecting with ?batch=true may receive several events as one
+    array frame. Clients offering the team-llm.msgpack.v1 subprotocol get
+    binary MessagePack frames; everyone else gets JSON text frames.
+    
+    session_info carries a resume token (epoch, event_seq). A client that
+    reconnects with ?epoch=...&last_seq=<last event_seq it saw> is sent only
+    the events it missed instead of the full message history, as long as
+    they are still in this worker's replay buffer.
+    
+    Only the most recent HISTORY_WINDOW_SIZE messages are sent in
+    session_info; older ones are fetched with history_request frames using
+    the returned history_cursor.
+    
+    Chat, typing and history_request events are rate limited per participant
+    and per session, frames over WS_MAX_FRAME_BYTES are rejected, and frames
+    that are not a JSON (or MessagePack) object get invalid_request; in every
+    case the client gets an error event and the socket stays open.
+    
+    No database session is held while the socket is idle: each inbound event
+    opens its own short unit of work, so open connections are not limited by
+    the pool size.
+    """
     try:
         # Verify session and participant
-        session = await db.get(Session, session_id)
+        async with session_factory() as db:
+            session = await db.get(Session, session_id)
+            participant = await db.get(Participant, participant_id) if session else None
         if not session:
             await websocket.close(code=4004, reason="Session not found")
             return
         
-        participant = await db.get(Participant, participant_id)
         if not participant or participant.session_id != session_id:
             await websocket.close(code=4004, reason="Invalid participant")
             return
         
         # Connect to session
-        await manager.connect(websocket, session_id, participant_id, participant.name)
-        
-        # Get message history
-        messages_query = select(Message).where(
-            Message.session_id == session.id
-        ).order_by(Message.sequence_number)
-        messages_result = await db.execute(messages_query)
-        messages = messages_result.scalars().all()
-        
-        # Get all participants
-        participants_query = select(Participant).where(
-            Participant.session_id == session.id
+        subprotocol, encoding = negotiate_encoding(websocket.scope.get("subprotocols", []))
+        resumed = await manager.connect(
+            websocket,
+            session_id,
+            participant_id,
+            participant.name,
+            batching=batch,
+            subprotocol=subprotocol,
+            encoding=encoding,
+            resume_from=(epoch, last_seq) if epoch is not None and last_seq is not None else None
         )
-        participants_result = await db.execute(participants_query)
-        all_participants = participants_result.scalars().all()
         
-        # Send session info and history to newly connected participant
+        # Get recent message history, unless the missed events were replayed
+        messages, history_cursor = [], None
+        if not resumed:
+            # Messages queued before this connection registered must be in the snapshot
+            await message_writer.flush()
+        async with session_factory() as db:
+            if not resumed:
+                messages, history_cursor = await get_message_page(db, session.id, settings.HISTORY_WINDOW_SIZE)
+            
+            # Get all participants
+            participants_query = select(Participant).where(
+                Participant.session_id == session.id
+            )
+            participants_result = await db.execute(participants_query)
+            all_participants = participants_result.scalars().all()
+        
+        # Send session info and history to newly connected participant. The
+        # resume token is read with no await before the send, so it covers
+        # every event already queued for this socket
+        replay_epoch, replay_seq = manager.replay_position(session_id)
         await manager.send_personal_message(
             {
                 "type": "session_info",
@@ -74,15 +123,11 @@ async def websocket_endpoint(
                     } for p in all_participants
                 ],
                 "status": session.status.value,
-                "message_history": [
-                    {
-                        "message_id": str(m.id),
-                        "participant_id": str(m.participant_id),
-                        "content": m.content,
-                        "timestamp": m.timestamp.isoformat(),
-                        "sequence_number": m.sequence_number
-                    } for m in messages
-                ]
+                "resumed": resumed,
+                "epoch": replay_epoch,
+                "event_seq": replay_seq,
+                "message_history": [history_item(m) for m in messages],
+                "history_cursor": history_cursor
             },
             websocket
         )
@@ -90,20 +135,62 @@ async def websocket_endpoint(
         # Handle messages
         while True:
             # Receive message
-            data = await websocket.receive_json()
-            message_type = data.get("type", "chat")
+            received = await websocket.receive()
+            if received["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(received.get("code", 1000))
+            manager.update_activity(websocket)
+            
+            size = frame_size(received.get("text"), received.get("bytes"))
+            if size > settings.WS_MAX_FRAME_BYTES:
+                await send_error(
+                    websocket, "frame_too_large",
+                    f"Frames may be at most {settings.WS_MAX_FRAME_BYTES} bytes",
+                    max_bytes=settings.WS_MAX_FRAME_BYTES
+                )
+                continue
+            
+            try:
+                data = decode_inbound(received.get("text"), received.get("bytes"))
+            except (ValueError, TypeError):
+                # Covers malformed JSON and MessagePack and undecodable text
+                data = None
+            message_type = data.get("type", "chat") if isinstance(data, dict) else None
+            if not isinstance(message_type, str):
+                await send_error(websocket, "invalid_request", "Frames must be an object with a string type")
+                continue
+            
+            if message_type == "pong":
+                # Reply to a liveness ping; receiving it is all that matters
+                continue
+            
+            limited = manager.rate_limits.check(session_id, participant_id, message_type)
+            if limited:
+                # The event is dropped; the client is told once per window,
+                # except for typing, which the TypingTracker coalesces anyway
+                if limited.notify and message_type != "typing":
+                    await send_error(
+                        websocket, "rate_limited",
+                        f"Too many {message_type} events, slow down",
+                        event=message_type,
+                        scope=limited.scope,
+                        retry_after=round(limited.retry_after, 3)
+                    )
+                continue
             
             if message_type == "chat":
-                # Create message in database
+                # Number the message and queue it for writing; it is broadcast
+                # straight away and committed by the writer in the background
+                async with session_factory() as db:
+                    sequence_number = await sequence_allocator.next(db, session_id)
+                    await db.commit()
                 message = Message(
                     session_id=session_id,
                     participant_id=participant_id,
                     content=data.get("content", ""),
-                    sequence_number=len(session.messages) + 1,
-                    metadata=data.get("metadata", {})
+                    sequence_number=sequence_number,
+                    extra_data=data.get("metadata", {})
                 )
-                db.add(message)
-                await db.commit()
+                message_writer.submit(message)
                 
                 # Broadcast to all participants in session
                 await manager.broadcast_to_session(
@@ -120,25 +207,27 @@ async def websocket_endpoint(
                     }
                 )
                 
-                # Trigger AI responses if needed
-                await trigger_ai_responses(session, message, db)
+                # Sending a message ends the participant's typing state. The AI
+                # turn is started by on_session_event as the chat is delivered
+                await manager.typing.update(session_id, participant_id, participant.name, False, source=websocket)
                 
             elif message_type == "typing":
-                # Broadcast typing indicator
-                await manager.broadcast_to_session(
+                # Only state changes are broadcast, throttled per participant
+                await manager.typing.update(
                     session_id,
-                    {
-                        "type": "typing",
-                        "participant_id": participant_id,
-                        "participant_name": participant.name,
-                        "is_typing": data.get("is_typing", False)
-                    },
-                    exclude=websocket
+                    participant_id,
+                    participant.name,
+                    bool(data.get("is_typing", False)),
+                    source=websocket
                 )
             
+            elif message_type == "history_request":
+                async with session_factory() as db:
+                    await send_history_page(websocket, session_id, data, db)
+            
             elif message_type == "task_complete":
                 # Handle task completion signal
-                await handle_task_completion(session, participant, db)
+                await handle_task_completion(session_id, participant, session_factory)
     
     except WebSocketDisconnect:
         await manager.disconnect(websocket)
@@ -148,129 +237,350 @@ async def websocket_endpoint(
         await websocket.close(code=4000, reason="Internal error")
 
 
-async def trigger_ai_responses(session: Session, human_message: Message, db: AsyncSession):
-    """Trigger AI agent responses to a human message"""
+def frame_size(text: Optional[str], data: Optional[bytes]) -> int:
+    """Size of a received frame in bytes"""
+    if text is None:
+        return len(data or b"")
+    # UTF-8 needs at most 4 bytes per character; encode only near the limit
+    if len(text) * 4 <= settings.WS_MAX_FRAME_BYTES:
+        return len(text)
+    return len(text.encode("utf-8"))
+
+
+async def send_error(websocket: WebSocket, code: str, message: str, **details):
+    """Tell one connection that its last frame was rejected"""
+    await manager.send_personal_message({"type": "error", "code": code, "message": message, **details}, websocket)
+
+
+def history_item(message: Message) -> dict:
+    """A stored message as it appears in message_history"""
+    return {
+        "message_id": str(message.id),
+        "participant_id": str(message.participant_id),
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+        "sequence_number": message.sequence_number
+    }
+
+
+async def send_history_page(websocket: WebSocket, session_id: str, data: dict, db: AsyncSession):
+    """Answer a history_request with the page of messages before its cursor"""
     try:
-        # Get AI participants in the session
-        ai_participants_query = select(Participant).where(
-            and_(
-                Participant.session_id == session.id,
-                Participant.type == ParticipantType.AI,
-                Participant.left_at.is_(None)
+        before = int(data["before"]) if data.get("before") is not None else None
+        limit = int(data.get("limit") or settings.HISTORY_WINDOW_SIZE)
+    except (TypeError, ValueError):
+        await send_error(websocket, "invalid_request", "Invalid history_request", event="history_request")
+        return
+    limit = max(1, min(limit, settings.HISTORY_MAX_PAGE_SIZE))
+    
+    messages, cursor = await get_message_page(db, session_id, limit, before=before)
+    await manager.send_personal_message(
+        {
+            "type": "history_page",
+            "before": before,
+            "messages": [history_item(m) for m in messages],
+            "history_cursor": cursor
+        },
+        websocket
+    )
+
+
+# Session factory for AI turns started by on_session_event; the app lifespan
+# sets it to the one the request handlers use
+_turn_session_factory: Optional[async_sessionmaker] = None
+
+
+def configure_ai_turns(session_factory: async_sessionmaker):
+    """Set the session factory AI turns run with"""
+    global _turn_session_factory
+    _turn_session_factory = session_factory
+
+
+def on_session_event(session_id: str, event: dict):
+    """Keep this worker's view of a session current as its events are delivered.
+    
+    Runs on every worker for every session broadcast, so chat from
+    participants connected to any worker reaches this worker's conversation
+    window. A human message schedules an AI turn on every worker, but only
+    the worker that owns the session (see ConnectionManager.owns_session)
+    goes on to generate replies, so each message is answered once.
+    """
+    event_type = event.get("type")
+    if event_type == "chat":
+        conversation_windows.observe(session_id, event)
+        if event.get("participant_type") == ParticipantType.HUMAN.value:
+            # Supersedes any turn still in flight for the session
+            ai_turns.schedule(session_id, lambda: run_owned_ai_turn(session_id))
+    elif event_type == "session_completed":
+        ai_turns.cancel(session_id)
+        agent_registry.evict(session_id)
+        conversation_windows.forget(session_id)
+        manager.release_session(session_id)
+
+
+async def run_owned_ai_turn(session_id: str):
+    """Run an AI turn if this worker owns the session"""
+    if not await manager.owns_session(session_id):
+        return
+    await trigger_ai_responses(session_id, _turn_session_factory or get_session_factory())
+
+
+manager.observe_sessions(on_session_event)
+
+
+async def trigger_ai_responses(session_id: str, session_factory: async_sessionmaker):
+    """Trigger AI agent responses to a human message.
+    
+    Runs as an AI turn (see ai_turns) and may be cancelled when newer human
+    input arrives; a reply that is already being delivered is completed.
+    All participating agents generate concurrently, so the last reply arrives
+    about one model round-trip after the message, and ReplyPacer staggers
+    the replies by length and typing speed instead of sending them at once.
+    Agents whose role streams show their reply as it is generated (see
+    relay_ai_stream); the full reply is still stored and sent once as chat,
+    and a stream that ends without one is closed with chat_delta_cancelled.
+    """
+    try:
+        async with session_factory() as db:
+            # Get AI participants in the session
+            ai_participants_query = select(Participant).where(
+                and_(
+                    Participant.session_id == session_id,
+                    Participant.type == ParticipantType.AI,
+                    Participant.left_at.is_(None)
+                )
             )
-        )
-        ai_participants_result = await db.execute(ai_participants_query)
-        ai_participants = ai_participants_result.scalars().all()
+            ai_participants_result = await db.execute(ai_participants_query)
+            ai_participants = ai_participants_result.scalars().all()
+            
+            if not ai_participants:
+                return
+            
+            # Get experiment configuration (cached after the session's first turn)
+            experiment = await experiment_configs.for_session(db, session_id)
+            if not experiment:
+                return
         
-        if not ai_participants:
-            return
+        # Recent messages come from the session's in-memory window; only the
+        # first turn of a session reads them from the database
+        conversation = await conversation_windows.get(session_id, experiment.context_window, session_factory)
         
-        # Get experiment configuration
-        experiment = await db.get(Experiment, session.condition.experiment_id)
-        if not experiment:
+        # Generation runs outside any unit of work; a model call can take seconds.
+        # Agents are built once per session and reused across turns
+        agents = agent_registry.activate(session_id, ai_participants, experiment)
+        if not agents:
             return
         
-        # Get recent message history for context
-        recent_messages_query = select(Message).where(
-            Message.session_id == session.id
-        ).order_by(Message.sequence_number.desc()).limit(20)
-        recent_messages_result = await db.execute(recent_messages_query)
-        recent_messages = list(reversed(recent_messages_result.scalars().all()))
+        last_message = conversation[-1] if conversation else None
+        task_instructions = experiment.instructions
         
-        # Process each AI participant
-        for ai_participant in ai_participants:
-            # Find AI configuration from experiment
-            ai_config = None
-            for role in experiment.config.get("roles", []):
-                if role.get("name") == ai_participant.name and role.get("type") == "AI":
-                    ai_config = role
-                    break
-            
-            if not ai_config:
-                continue
-            
-            # Create AI agent
+        # Every agent generates at once (up to the cap); the pacer spaces out delivery
+        generation_slots = asyncio.Semaphore(settings.AI_MAX_CONCURRENT_GENERATIONS)
+        pacer = ReplyPacer()
+        
+        async def respond(ai_participant: Participant, ai_config: dict, agent: Agent):
+            stream_id = None
+            delivered = False
             try:
-                agent = AgentFactory.create_agent(
-                    model=ai_config.get("model", ai_participant.ai_model),
-                    persona=ai_config.get("persona", ""),
-                    knowledge=ai_config.get("knowledge", {}),
-                    strategy=ai_config.get("strategy", "")
-                )
-                
-                # Generate response
-                response = await agent.generate_response(
-                    message_history=[{
-                        "role": "human" if m.participant.type == ParticipantType.HUMAN else "assistant",
-                        "content": m.content,
-                        "name": m.participant.name
-                    } for m in recent_messages],
-                    scenario_context=experiment.config.get("scenario", {})
-                )
-                
-                if response:
-                    # Create AI message
-                    ai_message = Message(
-                        session_id=session.id,
-                        participant_id=ai_participant.id,
-                        content=response,
-                        sequence_number=len(recent_messages) + 1,
-                        metadata={"generated_by": "ai"}
-                    )
-                    db.add(ai_message)
-                    await db.commit()
-                    
-                    # Broadcast AI message
-                    await manager.broadcast_to_session(
-                        str(session.id),
-                        {
-                            "type": "chat",
-                            "message_id": str(ai_message.id),
-                            "participant_id": str(ai_participant.id),
-                            "participant_name": ai_participant.name,
-                            "participant_type": "AI",
-                            "content": response,
-                            "timestamp": ai_message.timestamp.isoformat(),
-                            "sequence_number": ai_message.sequence_number
-                        }
+                typing_speed = ai_config.get("typingSpeed")
+                async with generation_slots:
+                    if not await agent.should_participate(conversation, last_message):
+                        return
+                if ai_config.get("stream", settings.AI_STREAM_REPLIES):
+                    stream_id = str(uuid4())
+                    # Only pulling from the model holds a slot; pacing the
+                    # deltas out to the session happens outside it
+                    deltas = hold_while_streaming(
+                        generation_slots,
+                        agent.stream_response(conversation, task_instructions, last_message)
                     )
-                    
-                    # Add small delay between AI responses
-                    await asyncio.sleep(1)
-                    
+                    content = await relay_ai_stream(session_id, ai_participant, stream_id, deltas, pacer, typing_speed)
+                else:
+                    async with generation_slots:
+                        response = await agent.generate_response(conversation, task_instructions, last_message)
+                    content = response.content if response.should_respond else ""
+                
+                if content:
+                    async with pacer.slot(content, typing_speed):
+                        # Once started, delivery finishes even if the turn is superseded
+                        delivered = True
+                        await asyncio.shield(
+                            deliver_ai_message(session_id, ai_participant, content, session_factory, stream_id)
+                        )
+            
             except Exception as e:
                 logger.error(f"Error generating AI response for {ai_participant.name}: {e}")
-                continue
-                
+            finally:
+                if stream_id and not delivered:
+                    # Superseded, failed or empty: clients must drop the draft
+                    await asyncio.shield(cancel_ai_stream(session_id, ai_participant, stream_id))
+        
+        await asyncio.gather(*[respond(*agent) for agent in agents])
+    
     except Exception as e:
         logger.error(f"Error in trigger_ai_responses: {e}")
 
 
-async def handle_task_completion(session: Session, participant: Participant, db: AsyncSession):
-    """Handle task completion signal"""
-    try:
-        # Update session status
-        session.status = SessionStatus.COMPLETED
-        session.completed_at = datetime.utcnow()
-        
-        # Get experiment configuration
-        experiment = await db.get(Experiment, session.condition.experiment_id)
-        completion_trigger = experiment.config.get("scenario", {}).get("completionTrigger", {})
-        
-        # Create completion message
-        completion_message = Message(
-            session_id=session.id,
-            participant_id=participant.id,
-            content=completion_trigger.get("value", "task-complete"),
-            message_type="system",
-            metadata={
-                "event": "task_completed",
-                "triggered_by": str(participant.id)
+async def relay_ai_stream(
+    session_id: str,
+    ai_participant: Participant,
+    stream_id: str,
+    deltas: AsyncIterator[str],
+    pacer: ReplyPacer,
+    typing_speed: Optional[float] = None
+) -> str:
+    """Broadcast a streamed reply as chat_delta events and return the full text.
+    
+    The AI participant is shown as typing from the first delta, and deltas
+    are released no faster than the persona could type them, so the text
+    appears at a human pace rather than in model-sized bursts.
+    """
+    participant_id = str(ai_participant.id)
+    parts = []
+    typed = 0
+    async for delta in deltas:
+        if not delta:
+            continue
+        await manager.typing.update(str(session_id), participant_id, ai_participant.name, True)
+        typed += len(delta)
+        await pacer.until_typed(typed, typing_speed)
+        await manager.broadcast_to_session(
+            str(session_id),
+            {
+                "type": "chat_delta",
+                "stream_id": stream_id,
+                "participant_id": participant_id,
+                "participant_name": ai_participant.name,
+                "index": len(parts),
+                "delta": delta
             }
         )
-        db.add(completion_message)
-        
+        parts.append(delta)
+    return "".join(parts).strip()
+
+
+async def hold_while_streaming(slots: asyncio.Semaphore, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Read a reply stream as fast as the model sends it while holding a slot.
+    
+    The slot is released as soon as generation ends, however long the
+    consumer takes to pace the buffered deltas out.
+    """
+    buffered: asyncio.Queue = asyncio.Queue()
+    end = object()
+    
+    async def pull():
+        try:
+            async with slots:
+                async for delta in deltas:
+                    buffered.put_nowait(delta)
+        except Exception as e:
+            buffered.put_nowait(e)
+        finally:
+            buffered.put_nowait(end)
+    
+    task = asyncio.create_task(pull())
+    try:
+        while True:
+            item = await buffered.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        task.cancel()
+
+
+async def cancel_ai_stream(session_id: str, ai_participant: Participant, stream_id: str):
+    """Tell the session a streamed reply will not be completed"""
+    await manager.broadcast_to_session(
+        str(session_id),
+        {
+            "type": "chat_delta_cancelled",
+            "stream_id": stream_id,
+            "participant_id": str(ai_participant.id),
+            "participant_name": ai_participant.name
+        }
+    )
+    await manager.typing.forget(str(session_id), str(ai_participant.id))
+
+
+async def deliver_ai_message(
+    session_id: str,
+    ai_participant: Participant,
+    content: str,
+    session_factory: async_sessionmaker,
+    stream_id: Optional[str] = None
+):
+    """Number, persist and broadcast an AI participant's reply"""
+    async with session_factory() as db:
+        sequence_number = await sequence_allocator.next(db, session_id)
         await db.commit()
+    ai_message = Message(
+        session_id=session_id,
+        participant_id=ai_participant.id,
+        content=content,
+        sequence_number=sequence_number,
+        extra_data={"generated_by": "ai"}
+    )
+    message_writer.submit(ai_message)
+    
+    await manager.broadcast_to_session(
+        str(session_id),
+        {
+            "type": "chat",
+            "message_id": str(ai_message.id),
+            "participant_id": str(ai_participant.id),
+            "participant_name": ai_participant.name,
+            "participant_type": "AI",
+            "content": content,
+            "timestamp": ai_message.timestamp.isoformat(),
+            "sequence_number": ai_message.sequence_number,
+            "stream_id": stream_id
+        }
+    )
+    if stream_id:
+        # The streamed draft is now a message; stop showing the AI as typing
+        await manager.typing.forget(str(session_id), str(ai_participant.id))
+
+
+async def handle_task_completion(session_id: str, participant: Participant, session_factory: async_sessionmaker):
+    """Handle task completion signal"""
+    try:
+        # No AI replies after completion
+        ai_turns.cancel(session_id)
+        agent_registry.evict(session_id)
+        
+        # The transcript must be durable before the session is reported complete
+        await message_writer.flush()
+        async with session_factory() as db:
+            session = await db.get(Session, session_id)
+            
+            # Update session status
+            session.status = SessionStatus.COMPLETED
+            session.completed_at = datetime.utcnow()
+            
+            # Get experiment configuration
+            experiment = await experiment_configs.for_session(db, session_id)
+            completion_trigger = experiment.completion_trigger
+            
+            # Create completion message
+            completion_message = Message(
+                session_id=session.id,
+                participant_id=participant.id,
+                content=completion_trigger.get("value", "task-complete"),
+                message_type="system",
+                sequence_number=await sequence_allocator.next(db, session.id),
+                extra_data={
+                    "event": "task_completed",
+                    "triggered_by": str(participant.id)
+                }
+            )
+            db.add(completion_message)
+            await db.commit()
+        sequence_allocator.forget(session.id)
+        experiment_configs.forget_session(session.id)
+        conversation_windows.forget(session.id)
         
         # Broadcast completion to all participants
         await manager.broadcast_to_session(
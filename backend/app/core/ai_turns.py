@@ -0,0 +1,131 @@
+"""
+Background scheduling of AI turns, one in flight per session
+"""
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+TurnFactory = Callable[[], Awaitable[None]]
+
+
+class AITurnScheduler:
+    """Runs AI turns as background tasks so receive loops never wait on them.
+    
+    schedule() starts a turn for a session and returns at once. If a turn for
+    that session is still running it is cancelled first: the AI should react
+    to the newest human input, not to a conversation that has moved on.
+    Parts of a turn that must not be interrupted (persisting and broadcasting
+    a reply) should be wrapped in asyncio.shield by the turn itself.
+    
+    Turns are tracked per worker. With several workers, exactly one of them
+    must run a session's turns or each would answer the same message; the
+    chat endpoint only generates replies on the worker that owns the session
+    (see ConnectionManager.owns_session).
+    """
+    
+    def __init__(self):
+        self._turns: Dict[str, asyncio.Task] = {}
+        self.started = 0
+        self.superseded = 0
+    
+    def is_running(self, session_id: str) -> bool:
+        """Whether a turn for the session is in flight"""
+        task = self._turns.get(str(session_id))
+        return bool(task and not task.done())
+    
+    def schedule(self, session_id: str, turn: TurnFactory) -> asyncio.Task:
+        """Start a turn for a session, superseding any turn still running"""
+        session_id = str(session_id)
+        previous = self._turns.get(session_id)
+        if previous and not previous.done():
+            previous.cancel()
+            self.superseded += 1
+        
+        task = asyncio.create_task(self._run(session_id, turn))
+        self._turns[session_id] = task
+        self.started += 1
+        return task
+    
+    async def _run(self, session_id: str, turn: TurnFactory):
+        try:
+            await turn()
+        except asyncio.CancelledError:
+            logger.debug(f"AI turn for session {session_id} superseded")
+            raise
+        except Exception as e:
+            logger.error(f"Error in AI turn for session {session_id}: {e}")
+        finally:
+            if self._turns.get(session_id) is asyncio.current_task():
+                del self._turns[session_id]
+    
+    def cancel(self, session_id: str):
+        """Cancel a session's running turn, e.g. when the session ends"""
+        task = self._turns.pop(str(session_id), None)
+        if task and not task.done():
+            task.cancel()
+    
+    async def shutdown(self):
+        """Cancel every running turn and wait for them to finish"""
+        tasks = list(self._turns.values())
+        self._turns.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class ReplyPacer:
+    """Staggers the replies of one AI turn the way people would send them.
+    
+    Agents generate concurrently, so their replies tend to be ready at about
+    the same moment. Each reply is held until it could plausibly have been
+    typed since the turn started (content length over the persona's typing
+    speed, at least min_delay), and consecutive replies are at least min_gap
+    apart. Generation time counts towards the typing time, so a slow model
+    adds no delay on top of it.
+    """
+    
+    def __init__(
+        self,
+        chars_per_second: Optional[float] = None,
+        min_delay: Optional[float] = None,
+        min_gap: Optional[float] = None
+    ):
+        self.chars_per_second = chars_per_second or settings.AI_TYPING_CHARS_PER_SECOND
+        self.min_delay = settings.AI_REPLY_MIN_DELAY if min_delay is None else min_delay
+        self.min_gap = settings.AI_REPLY_MIN_GAP if min_gap is None else min_gap
+        self._loop = asyncio.get_running_loop()
+        self.started = self._loop.time()
+        self._lock = asyncio.Lock()
+        self._last_sent: Optional[float] = None
+    
+    def typing_time(self, content: str, chars_per_second: Optional[float] = None) -> float:
+        """Seconds a person typing at the given speed would need for the content"""
+        return max(self.min_delay, len(content) / (chars_per_second or self.chars_per_second))
+    
+    async def until_typed(self, chars: int, chars_per_second: Optional[float] = None):
+        """Wait until the first chars of a streamed reply could have been typed"""
+        due = self.started + chars / (chars_per_second or self.chars_per_second)
+        await asyncio.sleep(max(0.0, due - self._loop.time()))
+    
+    @asynccontextmanager
+    async def slot(self, content: str, chars_per_second: Optional[float] = None):
+        """Wait until the reply is due, then hold the turn's send slot while it is delivered"""
+        due = self.started + self.typing_time(content, chars_per_second)
+        await asyncio.sleep(max(0.0, due - self._loop.time()))
+        async with self._lock:
+            if self._last_sent is not None:
+                await asyncio.sleep(max(0.0, self._last_sent + self.min_gap - self._loop.time()))
+            try:
+                yield
+            finally:
+                self._last_sent = self._loop.time()
+
+
+# Global AI turn scheduler instance
+ai_turns = AITurnScheduler()
@@ -0,0 +1,275 @@
+"""
+Pub/sub backplane that carries WebSocket broadcasts between worker processes
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+import asyncio
+import json
+import logging
+
+from app.core.config import settings
+from app.core.frames import OutboundFrame
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BackplaneEnvelope:
+    """A broadcast as it travels between workers"""
+    frame: OutboundFrame
+    session_id: Optional[str] = None
+    participant_ids: Optional[List[str]] = None
+    exclude: Optional[str] = None  # Connection id that must not receive the frame
+    
+    def to_json(self) -> str:
+        return json.dumps({
+            "session_id": self.session_id,
+            "participant_ids": self.participant_ids,
+            "exclude": self.exclude,
+            "event_type": self.frame.event_type,
+            "frame": self.frame.text
+        }, separators=(",", ":"))
+    
+    @classmethod
+    def from_json(cls, payload: str) -> "BackplaneEnvelope":
+        data = json.loads(payload)
+        return cls(
+            frame=OutboundFrame.from_text(data["frame"], data.get("event_type")),
+            session_id=data.get("session_id"),
+            participant_ids=data.get("participant_ids"),
+            exclude=data.get("exclude")
+        )
+
+
+EnvelopeHandler = Callable[[BackplaneEnvelope], None]
+
+
+class Backplane(ABC):
+    """Publishes broadcasts once and hands them to every subscribed worker.
+    
+    Handlers are plain callables; they must only enqueue and never block.
+    """
+    
+    def __init__(self):
+        self._handlers: List[EnvelopeHandler] = []
+    
+    def subscribe(self, handler: EnvelopeHandler):
+        """Register a local delivery handler"""
+        if handler not in self._handlers:
+            self._handlers.append(handler)
+    
+    def unsubscribe(self, handler: EnvelopeHandler):
+        """Remove a local delivery handler"""
+        if handler in self._handlers:
+            self._handlers.remove(handler)
+    
+    async def claim_session(self, session_id: str) -> bool:
+        """Whether this worker owns a session, claiming it if no worker does.
+        
+        Work that must happen once per session (AI turns) runs only on the
+        owner. A single process owns every session.
+        """
+        return True
+    
+    async def release_session(self, session_id: str):
+        """Give up ownership of a session"""
+    
+    async def start(self):
+        """Open any connections the backplane needs"""
+    
+    async def stop(self):
+        """Close connections opened by start()"""
+    
+    @abstractmethod
+    async def publish(self, envelope: BackplaneEnvelope):
+        """Deliver an envelope to every worker, including this one"""
+    
+    def _dispatch(self, envelope: BackplaneEnvelope):
+        """Hand an envelope to all local handlers"""
+        for handler in list(self._handlers):
+            try:
+                handler(envelope)
+            except Exception as e:
+                logger.error(f"Error delivering backplane envelope: {e}")
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane; managers sharing an instance behave like separate workers"""
+    
+    async def publish(self, envelope: BackplaneEnvelope):
+        self._dispatch(envelope)
+
+
+class PostgresBackplane(Backplane):
+    """Backplane built on Postgres LISTEN/NOTIFY.
+    
+    Envelopes too large for a NOTIFY payload are stored in an unlogged table
+    and the notification carries only the row id; listeners read the row
+    before dispatching. Notifications are dispatched in the order they were
+    received, so a large envelope is never overtaken by a later small one.
+    Stored envelopes are removed once they are PAYLOAD_RETENTION seconds old.
+    
+    Session ownership is an advisory lock held on the listener connection,
+    so it passes to another worker when the owner stops or loses its
+    connection.
+    """
+    
+    # NOTIFY payloads must be shorter than 8000 bytes
+    MAX_PAYLOAD_BYTES = 7999
+    PAYLOAD_RETENTION = 60
+    
+    def __init__(self, dsn: str, channel: str = "team_llm_ws"):
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.payload_table = '"' + f"{channel}_payloads".replace('"', '""') + '"'
+        self._listen_conn = None
+        self._pool = None
+        self._stopping = False
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self._inbox: Optional[asyncio.Queue] = None
+        self._inbox_task: Optional[asyncio.Task] = None
+        # Sessions whose advisory lock this worker holds
+        self._owned: Set[str] = set()
+        self._claim_lock = asyncio.Lock()
+    
+    async def start(self):
+        import asyncpg
+        
+        self._stopping = False
+        if not self._pool:
+            self._pool = await asyncpg.create_pool(self.dsn, min_size=1, max_size=4)
+            await self._pool.execute(
+                f"CREATE UNLOGGED TABLE IF NOT EXISTS {self.payload_table} ("
+                "id BIGSERIAL PRIMARY KEY, payload TEXT NOT NULL, "
+                "created_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+            )
+        await self._listen()
+    
+    async def _listen(self):
+        import asyncpg
+        
+        # Locks held on a previous listener connection went with it
+        self._owned.clear()
+        self._listen_conn = await asyncpg.connect(self.dsn)
+        self._listen_conn.add_termination_listener(self._on_terminated)
+        await self._listen_conn.add_listener(self.channel, self._on_notify)
+        logger.info(f"Listening for WebSocket broadcasts on Postgres channel '{self.channel}'")
+    
+    async def stop(self):
+        self._stopping = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._inbox_task:
+            self._inbox_task.cancel()
+            self._inbox_task = None
+            self._inbox = None
+        if self._listen_conn:
+            try:
+                await self._listen_conn.remove_listener(self.channel, self._on_notify)
+                await self._listen_conn.close()
+            except Exception as e:
+                logger.error(f"Error closing backplane listener: {e}")
+            self._listen_conn = None
+            self._owned.clear()
+        if self._pool:
+            await self._pool.close()
+            self._pool = None
+    
+    async def claim_session(self, session_id: str) -> bool:
+        if session_id in self._owned:
+            return True
+        if not self._listen_conn:
+            await self.start()
+        # The listener connection runs one query at a time
+        async with self._claim_lock:
+            claimed = await self._listen_conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtext($1))", f"{self.channel}:{session_id}"
+            )
+        if claimed:
+            self._owned.add(session_id)
+        return claimed
+    
+    async def release_session(self, session_id: str):
+        if session_id not in self._owned or not self._listen_conn:
+            return
+        self._owned.discard(session_id)
+        async with self._claim_lock:
+            await self._listen_conn.execute(
+                "SELECT pg_advisory_unlock(hashtext($1))", f"{self.channel}:{session_id}"
+            )
+    
+    async def publish(self, envelope: BackplaneEnvelope):
+        if not self._pool:
+            await self.start()
+        payload = envelope.to_json()
+        if len(payload.encode("utf-8")) > self.MAX_PAYLOAD_BYTES:
+            # Too large for NOTIFY; send a pointer to a stored copy instead
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        f"DELETE FROM {self.payload_table} "
+                        f"WHERE created_at < now() - interval '{int(self.PAYLOAD_RETENTION)} seconds'"
+                    )
+                    ref = await conn.fetchval(
+                        f"INSERT INTO {self.payload_table} (payload) VALUES ($1) RETURNING id", payload
+                    )
+            payload = json.dumps({"ref": ref})
+        await self._pool.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+    
+    def _on_notify(self, connection, pid, channel, payload):
+        if self._inbox_task is None or self._inbox_task.done():
+            self._inbox = asyncio.Queue()
+            self._inbox_task = asyncio.create_task(self._drain_inbox())
+        self._inbox.put_nowait(payload)
+    
+    async def _drain_inbox(self):
+        while True:
+            payload = await self._inbox.get()
+            try:
+                data = json.loads(payload)
+                if "ref" in data:
+                    payload = await self._fetch_payload(data["ref"])
+                    if payload is None:
+                        logger.error(f"Backplane payload {data['ref']} no longer stored")
+                        continue
+                envelope = BackplaneEnvelope.from_json(payload)
+            except Exception as e:
+                logger.error(f"Invalid backplane payload: {e}")
+                continue
+            self._dispatch(envelope)
+    
+    async def _fetch_payload(self, ref: int) -> Optional[str]:
+        return await self._pool.fetchval(f"SELECT payload FROM {self.payload_table} WHERE id = $1", ref)
+    
+    def _on_terminated(self, connection):
+        if self._stopping:
+            return
+        logger.warning("Backplane listener connection lost, reconnecting")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+    
+    async def _reconnect(self):
+        delay = 1
+        while not self._stopping:
+            try:
+                await self._listen()
+                return
+            except Exception as e:
+                logger.error(f"Backplane reconnect failed: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+def create_backplane() -> Backplane:
+    """Build the backplane selected by settings.WS_BACKPLANE"""
+    kind = settings.WS_BACKPLANE.lower()
+    if kind == "memory":
+        return InMemoryBackplane()
+    if kind == "postgres":
+        dsn = settings.WS_BACKPLANE_URL or settings.DATABASE_URL
+        # asyncpg expects a plain postgresql:// DSN
+        dsn = dsn.replace("postgresql+asyncpg://", "postgresql://")
+        return PostgresBackplane(dsn, channel=settings.WS_BACKPLANE_CHANNEL)
+    raise ValueError(f"Unknown WebSocket backplane: {settings.WS_BACKPLANE}")
@@ -1,7 +1,7 @@
 """
 Application configuration settings
 """
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -36,6 +36,23 @@ class Settings(BaseSettings):
     # AI/LLM API Keys
     OPENAI_API_KEY: Optional[str] = Field(default=None, env="OPENAI_API_KEY")
     ANTHROPIC_API_KEY: Optional[str] = Field(default=None, env="ANTHROPIC_API_KEY")
+    OPENAI_BASE_URL: str = Field(default="https://api.openai.com/v1", env="OPENAI_BASE_URL")
+    ANTHROPIC_BASE_URL: str = Field(default="https://api.anthropic.com", env="ANTHROPIC_BASE_URL")
+    # Shared provider connection pools (app/agents/clients.py): connections per
+    # base URL, idle keep-alive connections kept and for how long (seconds),
+    # timeouts in seconds, and HTTP/2 when the h2 package is installed
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5
+    LLM_HTTP_READ_TIMEOUT: float = 60
+    LLM_HTTP2: bool = True
+    # Record agent replies to, or replay them from, a cassette file instead of
+    # calling providers ("off", "record" or "replay"); replay waits the recorded
+    # latency unless LLM_CASSETTE_REPLAY_LATENCY is false
+    LLM_CASSETTE_MODE: str = Field(default="off", env="LLM_CASSETTE_MODE")
+    LLM_CASSETTE_PATH: str = Field(default="./cassettes/llm.jsonl", env="LLM_CASSETTE_PATH")
+    LLM_CASSETTE_REPLAY_LATENCY: bool = True
     
     # Experiment Settings
     MAX_PARTICIPANTS_PER_SESSION: int = 10
@@ -44,6 +61,80 @@ class Settings(BaseSettings):
     # WebSocket Settings
     WS_MESSAGE_QUEUE_SIZE: int = 1000
     WS_HEARTBEAT_INTERVAL: int = 30
+    # Seconds without an inbound frame before a ping is sent, and how long
+    # to wait for any frame back before the connection is dropped
+    WS_IDLE_TIMEOUT: float = 60
+    WS_PONG_TIMEOUT: float = 30
+    # Typing indicators: minimum seconds between started/stopped updates per
+    # participant, and seconds without a typing frame before "stopped" is sent
+    WS_TYPING_MIN_INTERVAL: float = 1.0
+    WS_TYPING_TIMEOUT: float = 5.0
+    # Inbound flood protection: largest frame accepted (bytes), and token-bucket
+    # budgets (events per second, burst) per participant and per session.
+    # Frames up to uvicorn's --ws-max-size (64 KiB in the Dockerfile) are
+    # refused with an error; larger ones close the connection before they are
+    # buffered. The client sends a typing frame per keystroke, so the typing
+    # budget sits above fast typing; typing over it is dropped without an error
+    WS_MAX_FRAME_BYTES: int = 16 * 1024
+    WS_CHAT_RATE_PER_PARTICIPANT: float = 0.5
+    WS_CHAT_BURST_PER_PARTICIPANT: int = 5
+    WS_CHAT_RATE_PER_SESSION: float = 2.0
+    WS_CHAT_BURST_PER_SESSION: int = 15
+    WS_TYPING_RATE_PER_PARTICIPANT: float = 15.0
+    WS_TYPING_BURST_PER_PARTICIPANT: int = 30
+    WS_TYPING_RATE_PER_SESSION: float = 60.0
+    WS_TYPING_BURST_PER_SESSION: int = 120
+    WS_HISTORY_RATE_PER_PARTICIPANT: float = 1.0
+    WS_HISTORY_BURST_PER_PARTICIPANT: int = 5
+    WS_HISTORY_RATE_PER_SESSION: float = 4.0
+    WS_HISTORY_BURST_PER_SESSION: int = 20
+    # Opt-in micro-batching: events queued within the window go out as one array frame
+    WS_BATCH_WINDOW_MS: float = 10
+    WS_BATCH_MAX_FRAMES: int = 50
+    # Recent events kept per session for clients resuming with last_seq, and
+    # seconds a session's buffer outlives its last connection on this worker
+    WS_REPLAY_BUFFER_SIZE: int = 500
+    WS_REPLAY_RETENTION: float = 300
+    # Messages included in session_info, and the largest page a client may
+    # request through history_request or the REST history endpoint
+    HISTORY_WINDOW_SIZE: int = 50
+    HISTORY_MAX_PAGE_SIZE: int = 200
+    # What to do when a connection's outbound queue is full:
+    # "drop_oldest", "drop_low_priority" or "disconnect"
+    WS_QUEUE_OVERFLOW_POLICY: str = Field(default="drop_low_priority", env="WS_QUEUE_OVERFLOW_POLICY")
+    # Cross-worker broadcast backplane: "memory" (single process) or "postgres"
+    WS_BACKPLANE: str = Field(default="memory", env="WS_BACKPLANE")
+    WS_BACKPLANE_URL: Optional[str] = Field(default=None, env="WS_BACKPLANE_URL")  # Defaults to DATABASE_URL
+    WS_BACKPLANE_CHANNEL: str = "team_llm_ws"
+    
+    # Message sequence numbers: "memory" (counter seeded once per session, single
+    # worker) or "database" (sessions.message_sequence row counter, any number of workers)
+    MESSAGE_SEQUENCE_ALLOCATOR: str = Field(default="memory", env="MESSAGE_SEQUENCE_ALLOCATOR")
+    # Write-behind message persistence: rows per INSERT/commit, and how long
+    # the writer waits for more messages before committing a partial batch
+    MESSAGE_WRITER_MAX_BATCH: int = 100
+    MESSAGE_WRITER_MAX_DELAY_MS: float = 5
+    
+    # AI turns: agents generating at once per turn, and reply pacing. A reply is
+    # sent no sooner than its length at the persona's typing speed (roles may set
+    # typingSpeed in characters per second) after the human message, never
+    # sooner than AI_REPLY_MIN_DELAY, and AI_REPLY_MIN_GAP after the previous one
+    AI_MAX_CONCURRENT_GENERATIONS: int = 4
+    AI_TYPING_CHARS_PER_SECOND: float = 40
+    AI_REPLY_MIN_DELAY: float = 1.0
+    AI_REPLY_MIN_GAP: float = 1.0
+    # Stream AI replies to clients as chat_delta events while they are generated;
+    # roles may set stream: true/false to override
+    AI_STREAM_REPLIES: bool = Field(default=False, env="AI_STREAM_REPLIES")
+    # Recent messages agents see as context, unless the experiment's scenario
+    # sets contextWindow
+    AI_CONTEXT_WINDOW: int = 20
+    # Of those, agents send the newest that fit a token budget: per model id in
+    # AI_CONTEXT_TOKEN_BUDGETS, else AI_CONTEXT_TOKEN_BUDGET. Replies are asked to
+    # stay under AI_REPLY_MAX_CHARS characters and max_tokens is derived from it
+    AI_CONTEXT_TOKEN_BUDGET: int = 1500
+    AI_CONTEXT_TOKEN_BUDGETS: Dict[str, int] = {}
+    AI_REPLY_MAX_CHARS: int = 250
     
     # File Storage
     UPLOAD_DIR: str = Field(default="./uploads", env="UPLOAD_DIR")
@@ -0,0 +1,120 @@
+"""
+Pre-encoded outbound WebSocket frames and wire encoding negotiation
+"""
+from typing import Any, List, Optional, Sequence, Tuple, Union
+import json
+import struct
+
+from app.schemas.websocket import SUBPROTOCOL_ENCODINGS, WireEncoding
+
+try:
+    import orjson
+except ImportError:  # Optional fast encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # Optional binary wire encoding
+    msgpack = None
+
+
+def encode_json(message: dict) -> str:
+    """Encode a message as compact JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(message).decode("utf-8")
+    # Same layout as Starlette's WebSocket.send_json
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+class OutboundFrame:
+    """An event that is serialized once and written to any number of sockets"""
+    
+    __slots__ = ("_message", "event_type", "_text", "_packed")
+    
+    def __init__(self, message: dict):
+        self._message: Optional[dict] = message
+        self.event_type: Optional[str] = message.get("type")
+        self._text: Optional[str] = None
+        self._packed: Optional[bytes] = None
+    
+    @classmethod
+    def from_text(cls, text: str, event_type: Optional[str] = None) -> "OutboundFrame":
+        """Rebuild a frame from JSON text that was encoded elsewhere"""
+        frame = cls.__new__(cls)
+        frame._message = None
+        frame.event_type = event_type
+        frame._text = text
+        frame._packed = None
+        return frame
+    
+    @property
+    def message(self) -> dict:
+        """The event as a dict, decoded on first use for frames built from text"""
+        if self._message is None:
+            self._message = json.loads(self._text)
+        return self._message
+    
+    @property
+    def text(self) -> str:
+        """JSON text of the frame, encoded on first use"""
+        if self._text is None:
+            self._text = encode_json(self._message)
+        return self._text
+    
+    @property
+    def packed(self) -> bytes:
+        """MessagePack encoding of the frame, encoded on first use"""
+        if self._packed is None:
+            self._packed = msgpack.packb(self.message, use_bin_type=True)
+        return self._packed
+    
+    def encoded(self, encoding: WireEncoding) -> Union[str, bytes]:
+        """The frame in the given wire encoding"""
+        if encoding == WireEncoding.MSGPACK:
+            return self.packed
+        return self.text
+
+
+def encode_batch(frames: Sequence[OutboundFrame], encoding: WireEncoding) -> Union[str, bytes]:
+    """Combine already-encoded frames into one array frame without re-serializing them"""
+    if encoding == WireEncoding.MSGPACK:
+        count = len(frames)
+        if count < 16:
+            header = bytes([0x90 | count])
+        elif count < 0x10000:
+            header = b"\xdc" + struct.pack(">H", count)
+        else:
+            header = b"\xdd" + struct.pack(">I", count)
+        return header + b"".join(frame.packed for frame in frames)
+    return "[" + ",".join(frame.text for frame in frames) + "]"
+
+
+def available_encodings() -> List[str]:
+    """Subprotocols this server can speak"""
+    return [
+        name for name, encoding in SUBPROTOCOL_ENCODINGS.items()
+        if encoding != WireEncoding.MSGPACK or msgpack is not None
+    ]
+
+
+def negotiate_encoding(requested: Sequence[str]) -> Tuple[Optional[str], WireEncoding]:
+    """Pick the subprotocol to accept from those a client offered.
+    
+    The client's order of preference wins. Returns (subprotocol, encoding);
+    subprotocol is None when the client asked for nothing we support, in
+    which case JSON is used.
+    """
+    supported = available_encodings()
+    for name in requested:
+        if name in supported:
+            return name, SUBPROTOCOL_ENCODINGS[name]
+    return None, WireEncoding.JSON
+
+
+def decode_inbound(text: Optional[str], data: Optional[bytes]) -> Any:
+    """Decode a received frame: text frames are JSON, binary frames MessagePack"""
+    if text is not None:
+        return json.loads(text)
+    if msgpack is not None:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data)
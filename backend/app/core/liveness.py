@@ -0,0 +1,161 @@
+"""
+Connection liveness tracking on a monotonic clock
+"""
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class _Liveness:
+    """Per-connection liveness state"""
+    
+    __slots__ = ("last_seen", "ping_sent_at", "deadline")
+    
+    def __init__(self, now: float):
+        self.last_seen = now
+        self.ping_sent_at: Optional[float] = None
+        self.deadline = 0.0
+
+
+class LivenessMonitor:
+    """Deadline heap that pings idle connections and expires silent ones.
+    
+    touch() only records the time of the last inbound frame, so it is O(1).
+    Each connection has one heap entry; the run loop sleeps until the earliest
+    deadline and only looks at entries that are due. A due entry whose
+    connection has been active since it was scheduled is pushed back to its
+    new idle deadline; otherwise the connection is pinged, and if nothing
+    arrives within pong_timeout it is expired.
+    """
+    
+    # Seconds to wait after a failed iteration, doubling up to the maximum
+    ERROR_BACKOFF = 0.1
+    ERROR_BACKOFF_MAX = 5.0
+    
+    def __init__(
+        self,
+        idle_timeout: float,
+        pong_timeout: float,
+        on_idle: Callable[[Hashable], None],
+        on_expired: Callable[[Hashable], None],
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.idle_timeout = idle_timeout
+        self.pong_timeout = pong_timeout
+        self._on_idle = on_idle
+        self._on_expired = on_expired
+        self._clock = clock
+        self._states: Dict[Hashable, _Liveness] = {}
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._counter = itertools.count()
+        # Created by start() so it belongs to the loop the monitor runs on
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def __len__(self) -> int:
+        return len(self._states)
+    
+    def register(self, key: Hashable):
+        """Start tracking a connection"""
+        state = _Liveness(self._clock())
+        self._states[key] = state
+        self._schedule(key, state, state.last_seen + self.idle_timeout)
+    
+    def unregister(self, key: Hashable):
+        """Stop tracking a connection; its heap entry is discarded lazily"""
+        self._states.pop(key, None)
+    
+    def touch(self, key: Hashable):
+        """Record inbound activity (any frame, including pong)"""
+        state = self._states.get(key)
+        if state:
+            state.last_seen = self._clock()
+    
+    def _schedule(self, key: Hashable, state: _Liveness, deadline: float):
+        is_earliest = not self._heap or deadline < self._heap[0][0]
+        state.deadline = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), key))
+        if is_earliest and self._wakeup is not None:
+            self._wakeup.set()
+    
+    def process_due(self, now: Optional[float] = None) -> int:
+        """Handle every entry whose deadline has passed; returns how many were examined"""
+        now = self._clock() if now is None else now
+        examined = 0
+        while self._heap and self._heap[0][0] <= now:
+            deadline, _, key = heapq.heappop(self._heap)
+            state = self._states.get(key)
+            if state is None or state.deadline != deadline:
+                continue  # Unregistered or superseded entry
+            examined += 1
+            
+            if state.ping_sent_at is not None and state.last_seen <= state.ping_sent_at:
+                # Pinged and heard nothing back
+                del self._states[key]
+                try:
+                    self._on_expired(key)
+                except Exception as e:
+                    logger.error(f"Error expiring connection: {e}")
+                continue
+            
+            idle_deadline = state.last_seen + self.idle_timeout
+            if idle_deadline > now:
+                # Active since this entry was scheduled
+                state.ping_sent_at = None
+                self._schedule(key, state, idle_deadline)
+                continue
+            
+            state.ping_sent_at = now
+            self._schedule(key, state, now + self.pong_timeout)
+            try:
+                self._on_idle(key)
+            except Exception as e:
+                logger.error(f"Error pinging idle connection: {e}")
+        return examined
+    
+    def start(self):
+        """Start the background loop if it is not running on the current event loop"""
+        if not self._task or self._task.done() or self._task.get_loop() is not asyncio.get_running_loop():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Stop the background loop"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        self._wakeup = None
+        self._states.clear()
+        self._heap.clear()
+    
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                self._wakeup.clear()
+                if self._heap:
+                    delay = max(0.0, self._heap[0][0] - self._clock())
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await self._wakeup.wait()
+                self.process_due()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Back off so a recurring error cannot spin and starve the event loop
+                failures += 1
+                logger.error(f"Error in liveness loop: {e}")
+                await asyncio.sleep(min(self.ERROR_BACKOFF_MAX, self.ERROR_BACKOFF * 2 ** (failures - 1)))
@@ -0,0 +1,114 @@
+"""
+Token-bucket limits on inbound WebSocket events
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+import time
+
+
+class TokenBucket:
+    """Allows rate events per second on average, with bursts of up to capacity"""
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+    
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = now
+    
+    def take(self, now: float, cost: float = 1.0) -> float:
+        """Spend cost tokens; returns 0 if allowed, else seconds until it would be"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+@dataclass
+class RateLimited:
+    """An inbound event that exceeded a budget"""
+    event_type: str
+    scope: str  # "participant" or "session"
+    retry_after: float
+    # Only the first violation per budget and window is reported, so a flood
+    # does not turn into a flood of error frames going the other way
+    notify: bool
+
+
+class InboundRateLimiter:
+    """Per-participant and per-session budgets for rate-limited event types.
+    
+    limits maps an event type to ((participant rate, burst), (session rate,
+    burst)), rates in events per second. Event types without an entry are
+    not limited. Both budgets must allow an event; the participant's is
+    checked first so one noisy participant does not use up the session's.
+    Buckets are kept per worker and dropped with forget_participant and
+    forget_session.
+    """
+    
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[Tuple[float, float], Tuple[float, float]]],
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.limits = limits
+        self._clock = clock
+        self._participants: Dict[Tuple[str, str, str], TokenBucket] = {}
+        self._sessions: Dict[Tuple[str, str], TokenBucket] = {}
+        # Until when each limited budget has already been reported
+        self._notified: Dict[Tuple, float] = {}
+        self.rejected = 0
+    
+    def check(self, session_id: str, participant_id: str, event_type: str) -> Optional[RateLimited]:
+        """Spend one event from the participant's and session's budgets; None if allowed"""
+        limit = self.limits.get(event_type)
+        if limit is None:
+            return None
+        (participant_rate, participant_burst), (session_rate, session_burst) = limit
+        now = self._clock()
+        
+        key = (str(session_id), str(participant_id), event_type)
+        bucket = self._participants.get(key)
+        if bucket is None:
+            bucket = self._participants[key] = TokenBucket(participant_rate, participant_burst, now)
+        retry_after = bucket.take(now)
+        if retry_after:
+            return self._reject(key, event_type, "participant", retry_after, now)
+        
+        session_key = (str(session_id), event_type)
+        bucket = self._sessions.get(session_key)
+        if bucket is None:
+            bucket = self._sessions[session_key] = TokenBucket(session_rate, session_burst, now)
+        retry_after = bucket.take(now)
+        if retry_after:
+            return self._reject(key, event_type, "session", retry_after, now)
+        return None
+    
+    def _reject(self, key: Tuple, event_type: str, scope: str, retry_after: float, now: float) -> RateLimited:
+        self.rejected += 1
+        notify = self._notified.get((key, scope), 0.0) <= now
+        if notify:
+            self._notified[(key, scope)] = now + retry_after
+        return RateLimited(event_type, scope, retry_after, notify)
+    
+    def forget_participant(self, session_id: str, participant_id: str):
+        """Drop a participant's buckets once their last connection has gone"""
+        prefix = (str(session_id), str(participant_id))
+        for key in [key for key in self._participants if key[:2] == prefix]:
+            del self._participants[key]
+        for key in [key for key in self._notified if key[0][:2] == prefix]:
+            del self._notified[key]
+    
+    def forget_session(self, session_id: str):
+        """Drop a session's shared buckets once nobody is connected"""
+        for key in [key for key in self._sessions if key[0] == str(session_id)]:
+            del self._sessions[key]
+    
+    def clear(self):
+        """Drop every bucket"""
+        self._participants.clear()
+        self._sessions.clear()
+        self._notified.clear()
@@ -0,0 +1,53 @@
+"""
+Per-session replay buffers for resuming WebSocket connections
+"""
+from collections import deque
+from typing import Deque, List, Optional
+import asyncio
+import itertools
+import uuid
+
+from app.core.frames import OutboundFrame
+
+
+class ReplayBuffer:
+    """Ring buffer of the most recent events broadcast to one session.
+    
+    Every event appended is stamped with the next event_seq. A client that
+    remembers the last event_seq it saw, together with the buffer's epoch, can
+    be sent just the events that came after it. The epoch changes whenever a
+    buffer is created, so sequence numbers from an evicted buffer or another
+    worker are never mistaken for ones from this buffer.
+    """
+    
+    __slots__ = ("epoch", "last_seq", "_frames", "evict_handle")
+    
+    def __init__(self, capacity: int):
+        self.epoch = uuid.uuid4().hex[:12]
+        self.last_seq = 0
+        self._frames: Deque[OutboundFrame] = deque(maxlen=capacity)
+        self.evict_handle: Optional[asyncio.TimerHandle] = None
+    
+    def __len__(self) -> int:
+        return len(self._frames)
+    
+    @property
+    def first_seq(self) -> int:
+        """Sequence number of the oldest event still buffered"""
+        return self.last_seq - len(self._frames) + 1
+    
+    def append(self, message: dict) -> OutboundFrame:
+        """Stamp a message with the next event_seq and buffer its frame"""
+        self.last_seq += 1
+        frame = OutboundFrame({**message, "event_seq": self.last_seq})
+        self._frames.append(frame)
+        return frame
+    
+    def since(self, epoch: str, last_seq: int) -> Optional[List[OutboundFrame]]:
+        """Frames after last_seq, or None when they can no longer all be replayed"""
+        if epoch != self.epoch or last_seq < 0 or last_seq > self.last_seq:
+            return None
+        if last_seq + 1 < self.first_seq:
+            # Part of the gap has already been overwritten
+            return None
+        return list(itertools.islice(self._frames, last_seq + 1 - self.first_seq, None))
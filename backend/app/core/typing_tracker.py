@@ -0,0 +1,153 @@
+"""
+Server-side typing indicator state
+"""
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+TypingEmitter = Callable[[str, str, str, bool, object], Awaitable[None]]
+
+
+class _TypingState:
+    """Typing state of one participant in one session"""
+    
+    __slots__ = (
+        "participant_name", "source", "desired", "emitted",
+        "last_emit_at", "last_refresh_at", "expiry_handle", "flush_handle"
+    )
+    
+    def __init__(self, participant_name: str, source):
+        self.participant_name = participant_name
+        self.source = source  # Connection the updates come from
+        self.desired = False
+        self.emitted = False
+        self.last_emit_at: Optional[float] = None
+        self.last_refresh_at = 0.0
+        self.expiry_handle: Optional[asyncio.TimerHandle] = None
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+
+class TypingTracker:
+    """Coalesces keystroke-driven typing frames into started/stopped transitions.
+    
+    Only changes of state are emitted, at most one per participant every
+    min_interval seconds; a change that arrives too soon is sent when the
+    interval is up, if it still holds. A participant who stops sending typing
+    frames for timeout seconds is reported as stopped. State is kept until
+    forget() is called for the participant's connection.
+    """
+    
+    def __init__(
+        self,
+        emit: TypingEmitter,
+        min_interval: float,
+        timeout: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self._emit = emit
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self._clock = clock
+        self._states: Dict[Tuple[str, str], _TypingState] = {}
+        self._tasks: Set[asyncio.Task] = set()
+    
+    def is_typing(self, session_id: str, participant_id: str) -> bool:
+        """Whether others currently see the participant as typing"""
+        state = self._states.get((session_id, participant_id))
+        return bool(state and state.emitted)
+    
+    async def update(self, session_id: str, participant_id: str, participant_name: str, is_typing: bool, source=None):
+        """Handle a typing frame from a participant"""
+        key = (session_id, participant_id)
+        state = self._states.get(key)
+        if state is None:
+            if not is_typing:
+                return
+            state = self._states[key] = _TypingState(participant_name, source)
+        if source is not None:
+            state.source = source
+        
+        now = self._clock()
+        state.desired = is_typing
+        if is_typing:
+            state.last_refresh_at = now
+            if state.expiry_handle is None:
+                self._arm_expiry(key, state, self.timeout)
+        
+        await self._sync(key, state, now)
+    
+    async def forget(self, session_id: str, participant_id: str):
+        """Drop a participant's state, reporting them as stopped if needed"""
+        state = self._states.pop((session_id, participant_id), None)
+        if state is None:
+            return
+        self._cancel_timers(state)
+        if state.emitted:
+            await self._emit(session_id, participant_id, state.participant_name, False, state.source)
+    
+    def clear(self):
+        """Cancel all timers and forget every participant"""
+        for state in self._states.values():
+            self._cancel_timers(state)
+        self._states.clear()
+        for task in list(self._tasks):
+            task.cancel()
+    
+    async def _sync(self, key: Tuple[str, str], state: _TypingState, now: float):
+        """Emit the desired state if it differs from what was last sent"""
+        if state.desired == state.emitted:
+            return
+        
+        if state.last_emit_at is not None and now - state.last_emit_at < self.min_interval:
+            # Throttled: send whatever holds once the interval is up
+            if state.flush_handle is None:
+                delay = self.min_interval - (now - state.last_emit_at)
+                state.flush_handle = asyncio.get_running_loop().call_later(delay, self._on_flush, key)
+            return
+        
+        state.emitted = state.desired
+        state.last_emit_at = now
+        session_id, participant_id = key
+        await self._emit(session_id, participant_id, state.participant_name, state.emitted, state.source)
+    
+    def _arm_expiry(self, key: Tuple[str, str], state: _TypingState, delay: float):
+        state.expiry_handle = asyncio.get_running_loop().call_later(delay, self._on_expiry, key)
+    
+    def _on_expiry(self, key: Tuple[str, str]):
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.expiry_handle = None
+        if not state.desired:
+            return
+        remaining = state.last_refresh_at + self.timeout - self._clock()
+        if remaining > 0:
+            # Refreshed since the timer was armed
+            self._arm_expiry(key, state, remaining)
+            return
+        state.desired = False
+        self._spawn(self._sync(key, state, self._clock()))
+    
+    def _on_flush(self, key: Tuple[str, str]):
+        state = self._states.get(key)
+        if state is None:
+            return
+        state.flush_handle = None
+        self._spawn(self._sync(key, state, self._clock()))
+    
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    @staticmethod
+    def _cancel_timers(state: _TypingState):
+        for handle in (state.expiry_handle, state.flush_handle):
+            if handle:
+                handle.cancel()
+        state.expiry_handle = None
+        state.flush_handle = None
@@ -1,32 +1,301 @@
 """
 WebSocket connection manager for real-time communication
 """
-from typing import Dict, Set, Optional, List
+from typing import Callable, Deque, Dict, Set, Optional, List, Tuple
 from fastapi import WebSocket
-from datetime import datetime, timedelta
+from datetime import datetime
+from collections import deque
+from enum import Enum
 import asyncio
 import json
 import logging
+import uuid
+
+from app.core.backplane import Backplane, BackplaneEnvelope, create_backplane
+from app.core.config import settings
+from app.core.frames import OutboundFrame, encode_batch
+from app.core.liveness import LivenessMonitor
+from app.core.rate_limit import InboundRateLimiter
+from app.core.replay import ReplayBuffer
+from app.core.typing_tracker import TypingTracker
+from app.schemas.websocket import WireEncoding
 
 logger = logging.getLogger(__name__)
 
 
+class QueueOverflowPolicy(str, Enum):
+    """What to do when a connection's outbound queue is full"""
+    DROP_OLDEST = "drop_oldest"
+    DROP_LOW_PRIORITY = "drop_low_priority"
+    DISCONNECT = "disconnect"
+
+
+# Event types that can be dropped for a slow consumer without losing state
+LOW_PRIORITY_EVENTS = {"typing", "ping", "chat_delta"}
+
+# Session events that are not stamped with an event_seq or kept for replay
+EPHEMERAL_EVENTS = LOW_PRIORITY_EVENTS
+
+# Event types that flush a pending batch immediately instead of waiting for the window
+URGENT_EVENTS = {"chat", "session_completed", "session_timeout"}
+
+
+class ClientConnection:
+    """Outbound side of a single WebSocket: a bounded queue drained by a writer task.
+    
+    With a batch_window, frames queued within the window are written as one
+    JSON array frame. An urgent event (chat, completion) flushes the batch
+    at once, together with anything queued before it, so ordering is kept
+    and those events are never held back.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        queue_size: int,
+        overflow_policy: QueueOverflowPolicy,
+        on_failure: Callable[["ClientConnection"], None],
+        batch_window: Optional[float] = None,
+        batch_max_frames: int = 50,
+        encoding: WireEncoding = WireEncoding.JSON
+    ):
+        self.websocket = websocket
+        self.encoding = encoding
+        self.connection_id = uuid.uuid4().hex
+        self.queue_size = max(1, queue_size)
+        self.overflow_policy = overflow_policy
+        self.batch_window = batch_window
+        self.batch_max_frames = max(1, batch_max_frames)
+        self.dropped_count = 0
+        self.frames_written = 0
+        self.events_written = 0
+        self.closed = False
+        self._on_failure = on_failure
+        self._queue: Deque[OutboundFrame] = deque()
+        self._ready = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start the writer task"""
+        if not self._writer_task:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+    
+    async def close(self):
+        """Stop the writer task and discard anything still queued"""
+        self.closed = True
+        self._queue.clear()
+        if self._writer_task and self._writer_task is not asyncio.current_task():
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except (asyncio.CancelledError, Exception):
+                pass
+    
+    @property
+    def queue_length(self) -> int:
+        """Number of messages waiting to be written"""
+        return len(self._queue)
+    
+    def enqueue(self, frame: OutboundFrame) -> bool:
+        """Queue a frame without blocking.
+        
+        Returns False when the queue is full and the overflow policy says the
+        consumer has to be disconnected.
+        """
+        if self.closed:
+            return True
+        
+        if len(self._queue) >= self.queue_size:
+            if self.overflow_policy == QueueOverflowPolicy.DISCONNECT:
+                return False
+            
+            if self.overflow_policy == QueueOverflowPolicy.DROP_OLDEST:
+                self._queue.popleft()
+            else:
+                if not self._drop_low_priority():
+                    if frame.event_type in LOW_PRIORITY_EVENTS:
+                        # Nothing cheaper to drop than the new event itself
+                        self.dropped_count += 1
+                        return True
+                    # Queue is full of events we must not lose
+                    return False
+            self.dropped_count += 1
+        
+        self._queue.append(frame)
+        self._ready.set()
+        return True
+    
+    async def _send(self, payload):
+        """Write an encoded payload as a text or binary frame"""
+        if self.encoding == WireEncoding.MSGPACK:
+            await self.websocket.send_bytes(payload)
+        else:
+            await self.websocket.send_text(payload)
+    
+    async def _collect_batch(self) -> List[OutboundFrame]:
+        """Gather frames until the window closes, the batch is full or an urgent event arrives"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window
+        batch: List[OutboundFrame] = []
+        while True:
+            while self._queue and len(batch) < self.batch_max_frames:
+                frame = self._queue.popleft()
+                batch.append(frame)
+                if frame.event_type in URGENT_EVENTS:
+                    return batch
+            if len(batch) >= self.batch_max_frames:
+                return batch
+            
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return batch
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                pass
+    
+    def _drop_low_priority(self) -> bool:
+        """Remove the oldest low-priority frame, if there is one"""
+        for index, queued in enumerate(self._queue):
+            if queued.event_type in LOW_PRIORITY_EVENTS:
+                del self._queue[index]
+                return True
+        return False
+    
+    async def _writer_loop(self):
+        """Drain the queue onto the socket"""
+        try:
+            while True:
+                while not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                
+                if not self.batch_window:
+                    frame = self._queue.popleft()
+                    await self._send(frame.encoded(self.encoding))
+                    self.frames_written += 1
+                    self.events_written += 1
+                    continue
+                
+                batch = await self._collect_batch()
+                if len(batch) == 1:
+                    await self._send(batch[0].encoded(self.encoding))
+                else:
+                    # Items are already encoded; joining them avoids re-serializing
+                    await self._send(encode_batch(batch, self.encoding))
+                self.frames_written += 1
+                self.events_written += len(batch)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error writing to connection: {e}")
+            self.closed = True
+            self._queue.clear()
+            self._on_failure(self)
+
+
 class ConnectionManager:
-    """Manages WebSocket connections for all sessions"""
+    """Manages WebSocket connections for all sessions.
+    
+    Broadcasts are published through a backplane so that every worker process
+    delivers them to the sockets it holds; lookups such as
+    get_session_participants only see this worker's connections.
+    
+    Session broadcasts other than ephemeral ones are stamped with an event_seq
+    as they are delivered and kept in a per-session ReplayBuffer, so a client
+    that reconnects to the same worker can be sent only what it missed.
+    """
     
-    def __init__(self):
+    def __init__(
+        self,
+        queue_size: Optional[int] = None,
+        overflow_policy: Optional[str] = None,
+        backplane: Optional[Backplane] = None
+    ):
         # Maps session_id to set of connections
         self._connections: Dict[str, Set[WebSocket]] = {}
         # Maps connection to participant info
         self._participant_info: Dict[WebSocket, Dict] = {}
-        # Maps connection to last activity time
-        self._last_activity: Dict[WebSocket, datetime] = {}
-        # Background task for health checks
-        self._health_check_task: Optional[asyncio.Task] = None
+        # Maps participant_id to that participant's connections (one per open tab)
+        self._participant_connections: Dict[str, Set[WebSocket]] = {}
+        # Maps connection to its outbound queue and writer
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        # Ping/expiry deadlines for every connection, on a monotonic clock
+        self._liveness = LivenessMonitor(
+            idle_timeout=settings.WS_IDLE_TIMEOUT,
+            pong_timeout=settings.WS_PONG_TIMEOUT,
+            on_idle=self._send_ping,
+            on_expired=self._on_liveness_expired
+        )
+        # Disconnects scheduled from non-async code paths
+        self._pending_disconnects: Set[asyncio.Task] = set()
+        self._pending_releases: Set[asyncio.Task] = set()
+        # Maps session_id to its recent events, kept for resuming clients
+        self._replay: Dict[str, ReplayBuffer] = {}
+        self.replay_buffer_size = settings.WS_REPLAY_BUFFER_SIZE
+        self.replay_retention = settings.WS_REPLAY_RETENTION
+        
+        self.queue_size = queue_size or settings.WS_MESSAGE_QUEUE_SIZE
+        self.overflow_policy = QueueOverflowPolicy(overflow_policy or settings.WS_QUEUE_OVERFLOW_POLICY)
+        
+        # Coalesces typing frames into throttled started/stopped transitions
+        self.typing = TypingTracker(
+            self._emit_typing,
+            min_interval=settings.WS_TYPING_MIN_INTERVAL,
+            timeout=settings.WS_TYPING_TIMEOUT
+        )
+        
+        # Budgets for inbound chat and typing events
+        self.rate_limits = InboundRateLimiter({
+            "chat": (
+                (settings.WS_CHAT_RATE_PER_PARTICIPANT, settings.WS_CHAT_BURST_PER_PARTICIPANT),
+                (settings.WS_CHAT_RATE_PER_SESSION, settings.WS_CHAT_BURST_PER_SESSION)
+            ),
+            "typing": (
+                (settings.WS_TYPING_RATE_PER_PARTICIPANT, settings.WS_TYPING_BURST_PER_PARTICIPANT),
+                (settings.WS_TYPING_RATE_PER_SESSION, settings.WS_TYPING_BURST_PER_SESSION)
+            ),
+            # Each history page is a database query
+            "history_request": (
+                (settings.WS_HISTORY_RATE_PER_PARTICIPANT, settings.WS_HISTORY_BURST_PER_PARTICIPANT),
+                (settings.WS_HISTORY_RATE_PER_SESSION, settings.WS_HISTORY_BURST_PER_SESSION)
+            ),
+        })
+        
+        # Broadcasts go out through the backplane and come back via _deliver
+        self.backplane = backplane or create_backplane()
+        self.backplane.subscribe(self._deliver)
+        # Called with every non-ephemeral session broadcast this worker receives
+        self._session_observers: List[Callable[[str, dict], None]] = []
     
-    async def connect(self, websocket: WebSocket, session_id: str, participant_id: str, participant_name: str):
-        """Accept a new WebSocket connection"""
-        await websocket.accept()
+    async def start(self):
+        """Start the backplane"""
+        await self.backplane.start()
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        participant_id: str,
+        participant_name: str,
+        batching: bool = False,
+        subprotocol: Optional[str] = None,
+        encoding: WireEncoding = WireEncoding.JSON,
+        resume_from: Optional[Tuple[str, int]] = None
+    ) -> bool:
+        """Accept a new WebSocket connection.
+        
+        Clients that opt into batching may receive an array of events in a
+        single frame as well as single event objects. subprotocol is echoed
+        back in the handshake and encoding selects how frames are written.
+        
+        resume_from is the (epoch, event_seq) a reconnecting client last saw.
+        Returns True if every event it missed was queued for it, in which case
+        no snapshot needs to be sent.
+        """
+        await websocket.accept(subprotocol=subprotocol)
+        session_id = str(session_id)
         
         # Add to session connections
         if session_id not in self._connections:
@@ -39,13 +308,34 @@ class ConnectionManager:
             "participant_id": participant_id,
             "participant_name": participant_name
         }
+        self._participant_connections.setdefault(str(participant_id), set()).add(websocket)
         
-        # Track last activity
-        self._last_activity[websocket] = datetime.utcnow()
+        # Give the connection its own writer so slow sockets don't block others
+        client = ClientConnection(
+            websocket,
+            queue_size=self.queue_size,
+            overflow_policy=self.overflow_policy,
+            on_failure=self._on_client_failure,
+            batch_window=settings.WS_BATCH_WINDOW_MS / 1000 if batching else None,
+            batch_max_frames=settings.WS_BATCH_MAX_FRAMES,
+            encoding=encoding
+        )
+        self._clients[websocket] = client
+        client.start()
+        
+        # Queue missed events before anything delivered from here on
+        resumed = False
+        buffer = self._replay_buffer(session_id)
+        if resume_from is not None:
+            missed = buffer.since(*resume_from)
+            if missed is not None:
+                for frame in missed:
+                    self._enqueue(websocket, frame)
+                resumed = True
         
-        # Start health check task if not running
-        if not self._health_check_task or self._health_check_task.done():
-            self._health_check_task = asyncio.create_task(self._health_check_loop())
+        # Track liveness
+        self._liveness.register(websocket)
+        self._liveness.start()
         
         logger.info(f"Participant {participant_name} ({participant_id}) connected to session {session_id}")
         
@@ -59,6 +349,7 @@ class ConnectionManager:
             },
             exclude=websocket
         )
+        return resumed
     
     async def disconnect(self, websocket: WebSocket):
         """Remove a WebSocket connection"""
@@ -74,11 +365,24 @@ class ConnectionManager:
                 self._connections[session_id].discard(websocket)
                 if not self._connections[session_id]:
                     del self._connections[session_id]
+                    self._schedule_replay_eviction(session_id)
+                    self.rate_limits.forget_session(session_id)
             
             # Remove participant info and activity tracking
             del self._participant_info[websocket]
-            if websocket in self._last_activity:
-                del self._last_activity[websocket]
+            participant_connections = self._participant_connections.get(str(participant_id))
+            if participant_connections is not None:
+                participant_connections.discard(websocket)
+                if not participant_connections:
+                    del self._participant_connections[str(participant_id)]
+                    self.rate_limits.forget_participant(session_id, participant_id)
+            self._liveness.unregister(websocket)
+            await self.typing.forget(session_id, participant_id)
+            
+            # Stop the writer
+            client = self._clients.pop(websocket, None)
+            if client:
+                await client.close()
             
             logger.info(f"Participant {participant_name} ({participant_id}) disconnected from session {session_id}")
             
@@ -92,28 +396,160 @@ class ConnectionManager:
                 }
             )
     
+    @staticmethod
+    def encode(message: dict) -> OutboundFrame:
+        """Wrap a message so it is serialized once for all recipients"""
+        return OutboundFrame(message)
+    
+    def _enqueue(self, websocket: WebSocket, frame: OutboundFrame):
+        """Queue a frame for a connection, applying the overflow policy"""
+        client = self._clients.get(websocket)
+        if not client:
+            return
+        if not client.enqueue(frame):
+            info = self._participant_info.get(websocket, {})
+            logger.warning(
+                f"Outbound queue full for participant {info.get('participant_id')}, disconnecting slow consumer"
+            )
+            self._schedule_disconnect(websocket, close_code=1013, reason="Slow consumer")
+    
+    def _on_client_failure(self, client: ClientConnection):
+        """Called by a writer task when its socket can no longer be written to"""
+        self._schedule_disconnect(client.websocket)
+    
+    def _schedule_disconnect(self, websocket: WebSocket, close_code: Optional[int] = None, reason: str = ""):
+        """Disconnect a connection from code that must not block"""
+        async def _run():
+            await self.disconnect(websocket)
+            if close_code is not None:
+                try:
+                    await websocket.close(code=close_code, reason=reason)
+                except Exception:
+                    pass
+        
+        task = asyncio.create_task(_run())
+        self._pending_disconnects.add(task)
+        task.add_done_callback(self._pending_disconnects.discard)
+    
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send a message to a specific connection"""
+        if websocket in self._clients:
+            self._enqueue(websocket, OutboundFrame(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
             logger.error(f"Error sending personal message: {e}")
     
     async def broadcast_to_session(self, session_id: str, message: dict, exclude: WebSocket = None):
-        """Broadcast a message to all connections in a session"""
-        if session_id in self._connections:
-            disconnected = set()
-            for connection in self._connections[session_id]:
-                if connection != exclude:
-                    try:
-                        await connection.send_json(message)
-                    except Exception as e:
-                        logger.error(f"Error broadcasting to connection: {e}")
-                        disconnected.add(connection)
-            
-            # Clean up disconnected connections
-            for connection in disconnected:
-                await self.disconnect(connection)
+        """Broadcast a message to all connections in a session.
+        
+        Messages are queued per connection and written by each connection's
+        writer task, so this never waits on a slow socket.
+        """
+        await self.broadcast_frame_to_session(session_id, OutboundFrame(message), exclude=exclude)
+    
+    async def broadcast_frame_to_session(self, session_id: str, frame: OutboundFrame, exclude: WebSocket = None):
+        """Broadcast a pre-encoded frame to all connections in a session, on every worker"""
+        excluded_client = self._clients.get(exclude) if exclude is not None else None
+        await self.backplane.publish(BackplaneEnvelope(
+            frame=frame,
+            session_id=str(session_id),
+            exclude=excluded_client.connection_id if excluded_client else None
+        ))
+    
+    def observe_sessions(self, observer: Callable[[str, dict], None]):
+        """Register a callable to see every non-ephemeral session broadcast, from any worker.
+        
+        Observers run as envelopes are delivered, whether or not this worker
+        has connections in the session; like backplane handlers they must
+        not block.
+        """
+        if observer not in self._session_observers:
+            self._session_observers.append(observer)
+    
+    async def owns_session(self, session_id: str) -> bool:
+        """Whether once-per-session work (AI turns) for a session runs on this worker"""
+        return await self.backplane.claim_session(str(session_id))
+    
+    def release_session(self, session_id: str):
+        """Let another worker take a finished session; released in the background"""
+        task = asyncio.create_task(self.backplane.release_session(str(session_id)))
+        self._pending_releases.add(task)
+        task.add_done_callback(self._pending_releases.discard)
+    
+    def _deliver(self, envelope: BackplaneEnvelope):
+        """Queue a backplane envelope for the matching local connections"""
+        if envelope.participant_ids is not None:
+            targets = []
+            for participant_id in envelope.participant_ids:
+                for websocket in self._participant_connections.get(participant_id, ()):
+                    info = self._participant_info[websocket]
+                    if envelope.session_id is None or info["session_id"] == envelope.session_id:
+                        targets.append(websocket)
+        else:
+            targets = list(self._connections.get(envelope.session_id, ()))
+        
+        frame = envelope.frame
+        if envelope.participant_ids is None and frame.event_type not in EPHEMERAL_EVENTS:
+            buffer = self._replay.get(envelope.session_id)
+            if buffer is not None:
+                frame = buffer.append(frame.message)
+        
+        for websocket in targets:
+            client = self._clients.get(websocket)
+            if client and client.connection_id != envelope.exclude:
+                self._enqueue(websocket, frame)
+        
+        if envelope.participant_ids is None and frame.event_type not in EPHEMERAL_EVENTS:
+            for observer in list(self._session_observers):
+                try:
+                    observer(envelope.session_id, frame.message)
+                except Exception as e:
+                    logger.error(f"Error in session observer: {e}")
+    
+    def _replay_buffer(self, session_id: str) -> ReplayBuffer:
+        """Get or create a session's replay buffer, cancelling any pending eviction"""
+        buffer = self._replay.get(session_id)
+        if buffer is None:
+            buffer = self._replay[session_id] = ReplayBuffer(self.replay_buffer_size)
+        elif buffer.evict_handle:
+            buffer.evict_handle.cancel()
+            buffer.evict_handle = None
+        return buffer
+    
+    def _schedule_replay_eviction(self, session_id: str):
+        """Drop a session's replay buffer once it has had no connections for a while"""
+        buffer = self._replay.get(session_id)
+        if buffer is None or buffer.evict_handle:
+            return
+        buffer.evict_handle = asyncio.get_running_loop().call_later(
+            self.replay_retention, self._evict_replay, session_id
+        )
+    
+    def _evict_replay(self, session_id: str):
+        if session_id not in self._connections:
+            self._replay.pop(session_id, None)
+    
+    def replay_position(self, session_id: str) -> Tuple[Optional[str], int]:
+        """The (epoch, event_seq) of the last event stamped for a session on this worker"""
+        buffer = self._replay.get(str(session_id))
+        if buffer is None:
+            return None, 0
+        return buffer.epoch, buffer.last_seq
+    
+    async def _emit_typing(self, session_id: str, participant_id: str, participant_name: str, is_typing: bool, source):
+        """Broadcast a typing state change to everyone but the typist's connection"""
+        await self.broadcast_to_session(
+            session_id,
+            {
+                "type": "typing",
+                "participant_id": participant_id,
+                "participant_name": participant_name,
+                "is_typing": is_typing
+            },
+            exclude=source
+        )
     
     def get_session_participants(self, session_id: str) -> list:
         """Get list of participants in a session"""
@@ -129,43 +565,57 @@ class ConnectionManager:
         return len(self._connections.get(session_id, set()))
     
     def update_activity(self, websocket: WebSocket):
-        """Update last activity time for a connection"""
-        if websocket in self._last_activity:
-            self._last_activity[websocket] = datetime.utcnow()
+        """Record inbound activity for a connection; call on every received frame"""
+        self._liveness.touch(websocket)
+    
+    def _send_ping(self, websocket: WebSocket):
+        """Queue an application-level ping; the client answers with a pong frame"""
+        self._enqueue(websocket, OutboundFrame({"type": "ping", "timestamp": datetime.utcnow().isoformat()}))
     
     async def send_ping(self, websocket: WebSocket):
-        """Send a ping message to check connection health"""
-        try:
-            await websocket.send_json({"type": "ping", "timestamp": datetime.utcnow().isoformat()})
-            return True
-        except Exception:
+        """Queue a ping message to check connection health"""
+        client = self._clients.get(websocket)
+        if not client or client.closed:
             return False
+        self._send_ping(websocket)
+        return True
     
-    async def _health_check_loop(self):
-        """Background task to check connection health"""
-        while True:
-            try:
-                await asyncio.sleep(30)  # Check every 30 seconds
-                
-                # Check all connections
-                disconnected = set()
-                for websocket in list(self._participant_info.keys()):
-                    last_activity = self._last_activity.get(websocket)
-                    if last_activity:
-                        # If no activity for 60 seconds, send ping
-                        if datetime.utcnow() - last_activity > timedelta(seconds=60):
-                            if not await self.send_ping(websocket):
-                                disconnected.add(websocket)
-                        # If no activity for 120 seconds, consider disconnected
-                        elif datetime.utcnow() - last_activity > timedelta(seconds=120):
-                            disconnected.add(websocket)
-                
-                # Clean up disconnected connections
-                for websocket in disconnected:
-                    await self.disconnect(websocket)
-                    
-            except Exception as e:
-                logger.error(f"Error in health check loop: {e}")
+    def _on_liveness_expired(self, websocket: WebSocket):
+        """Drop a connection that did not answer a ping in time"""
+        info = self._participant_info.get(websocket, {})
+        logger.info(f"Connection for participant {info.get('participant_id')} timed out")
+        self._schedule_disconnect(websocket, close_code=4408, reason="Ping timeout")
+    
+    async def shutdown(self):
+        """Stop all writer tasks, background loops and the backplane"""
+        await self._liveness.stop()
+        for client in list(self._clients.values()):
+            await client.close()
+        self.reset()
+        await self.backplane.stop()
+    
+    def reset(self):
+        """Forget every connection, timer and budget.
+        
+        Leaves the manager as freshly constructed, so it can be started again
+        on another event loop (each TestClient lifespan runs on its own).
+        """
+        self.typing.clear()
+        for task in list(self._pending_disconnects):
+            task.cancel()
+        self._pending_disconnects.clear()
+        for task in list(self._pending_releases):
+            task.cancel()
+        self._pending_releases.clear()
+        self._clients.clear()
+        self._connections.clear()
+        self._participant_info.clear()
+        self._participant_connections.clear()
+        for buffer in self._replay.values():
+            if buffer.evict_handle:
+                buffer.evict_handle.cancel()
+        self._replay.clear()
+        self.rate_limits.clear()
     
     def get_session_stats(self, session_id: str) -> Dict:
         """Get detailed statistics for a session"""
@@ -177,15 +627,35 @@ class ConnectionManager:
             "created_at": datetime.utcnow().isoformat()
         }
     
-    async def broadcast_to_participants(self, participant_ids: List[str], message: dict):
+    async def broadcast_to_participants(self, participant_ids: List[str], message: dict, session_id: Optional[str] = None):
         """Broadcast a message to specific participants"""
-        for websocket, info in self._participant_info.items():
-            if info["participant_id"] in participant_ids:
-                try:
-                    await websocket.send_json(message)
-                except Exception as e:
-                    logger.error(f"Error broadcasting to participant {info['participant_id']}: {e}")
+        await self.broadcast_frame_to_participants(participant_ids, OutboundFrame(message), session_id=session_id)
+    
+    async def broadcast_frame_to_participants(
+        self,
+        participant_ids: List[str],
+        frame: OutboundFrame,
+        session_id: Optional[str] = None
+    ):
+        """Broadcast a pre-encoded frame to specific participants, on every worker.
+        
+        Every open connection (tab) of each participant receives the frame. When
+        session_id is given, only connections in that session are targeted.
+        """
+        await self.backplane.publish(BackplaneEnvelope(
+            frame=frame,
+            session_id=str(session_id) if session_id is not None else None,
+            participant_ids=[str(participant_id) for participant_id in participant_ids]
+        ))
+    
+    async def send_to_participant(self, session_id: str, participant_id: str, message: dict):
+        """Send a message to all of a participant's connections within a session"""
+        await self.broadcast_frame_to_participants([participant_id], OutboundFrame(message), session_id=session_id)
+    
+    def get_participant_connection_count(self, participant_id: str) -> int:
+        """Get number of open connections for a participant on this worker"""
+        return len(self._participant_connections.get(str(participant_id), ()))
 
 
 # Global connection manager instance
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -0,0 +1,149 @@
+"""
+In-memory rolling conversation windows that AI agents read their context from
+"""
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional, Tuple
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.agents.base import ConversationMessage
+from app.db.database import AsyncSessionLocal
+from app.db.message_writer import message_writer
+from app.models.message import Message
+from app.models.participant import Participant
+
+
+class _Window:
+    def __init__(self, size: int):
+        self.size = size
+        self.messages: Deque[Tuple[int, ConversationMessage]] = deque(maxlen=size)
+        self.hydrated = False
+        # Messages appended while the window is being read from the database
+        self.pending: List[Tuple[int, ConversationMessage]] = []
+        self.lock = asyncio.Lock()
+
+
+class ConversationWindows:
+    """The last few chat messages of each session, kept in memory.
+    
+    A session's window is read from the database once, the first time an
+    agent needs it, with one query joining each message to its sender. After
+    that every chat message is appended as it is delivered (see observe), so
+    AI turns build their context without a query. Messages delivered while
+    the window is being read are merged in by sequence number. Chat events
+    reach every worker through the backplane, so each worker's window sees
+    messages from participants connected anywhere.
+    """
+    
+    def __init__(self, session_factory: async_sessionmaker = AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._windows: Dict[str, _Window] = {}
+    
+    async def get(
+        self,
+        session_id: str,
+        size: int,
+        session_factory: Optional[async_sessionmaker] = None
+    ) -> List[ConversationMessage]:
+        """The session's last size messages, oldest first"""
+        session_id = str(session_id)
+        window = self._windows.get(session_id)
+        if window is None or (window.size < size and window.hydrated):
+            # A larger window than the one held needs a fresh read
+            window = _Window(size)
+            self._windows[session_id] = window
+        
+        if not window.hydrated:
+            async with window.lock:
+                if not window.hydrated:
+                    await self._hydrate(session_id, window, session_factory or self._session_factory)
+        
+        messages = [message for _, message in window.messages]
+        return messages[-size:]
+    
+    def append(
+        self,
+        session_id: str,
+        sequence_number: int,
+        participant_name: str,
+        participant_type: str,
+        content: str,
+        timestamp: datetime
+    ):
+        """Record a chat message that was just sent to the session"""
+        window = self._windows.get(str(session_id))
+        if window is None:
+            return  # Nothing cached yet; the first read picks the message up
+        entry = (sequence_number, ConversationMessage(
+            participant_name=participant_name,
+            participant_type=participant_type,
+            content=content,
+            timestamp=timestamp
+        ))
+        if window.hydrated:
+            window.messages.append(entry)
+        else:
+            window.pending.append(entry)
+    
+    def observe(self, session_id: str, event: dict):
+        """Append a chat event delivered to the session"""
+        if event.get("type") != "chat":
+            return
+        self.append(
+            session_id,
+            event["sequence_number"],
+            event["participant_name"],
+            event["participant_type"].lower(),
+            event["content"],
+            datetime.fromisoformat(event["timestamp"])
+        )
+    
+    def forget(self, session_id: str):
+        """Drop a finished session's window"""
+        self._windows.pop(str(session_id), None)
+    
+    def is_cached(self, session_id: str) -> bool:
+        """Whether the session's window has been read from the database"""
+        window = self._windows.get(str(session_id))
+        return bool(window and window.hydrated)
+    
+    async def _hydrate(self, session_id: str, window: _Window, session_factory: async_sessionmaker):
+        # Messages still queued for writing must be in the table first
+        await message_writer.flush()
+        async with session_factory() as db:
+            result = await db.execute(
+                select(
+                    Message.sequence_number,
+                    Message.content,
+                    Message.timestamp,
+                    Participant.name,
+                    Participant.type
+                )
+                .join(Participant, Participant.id == Message.participant_id)
+                .where(Message.session_id == session_id, Message.message_type == "chat")
+                .order_by(Message.sequence_number.desc())
+                .limit(window.size)
+            )
+            rows = result.all()
+        
+        entries = {
+            row.sequence_number: ConversationMessage(
+                participant_name=row.name,
+                participant_type=row.type.value,
+                content=row.content,
+                timestamp=row.timestamp
+            )
+            for row in rows
+        }
+        for sequence_number, message in window.pending:
+            entries.setdefault(sequence_number, message)
+        window.messages.extend(sorted(entries.items(), key=lambda entry: entry[0]))
+        window.pending = []
+        window.hydrated = True
+
+
+# Global conversation window store
+conversation_windows = ConversationWindows()
@@ -1,7 +1,9 @@
 """
 Database configuration and session management
 """
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from typing import Dict
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
 
@@ -21,6 +23,40 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+class PoolMonitor:
+    """Counts connections checked out of an engine's pool"""
+    
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts = 0
+        event.listen(engine.sync_engine, "checkout", self._on_checkout)
+        event.listen(engine.sync_engine, "checkin", self._on_checkin)
+    
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out += 1
+        self.checkouts += 1
+        self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+    
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out -= 1
+    
+    def snapshot(self) -> Dict:
+        """Current pool usage, for health checks and load tests"""
+        pool = self.engine.pool
+        return {
+            "pool": pool.__class__.__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": self.checked_out,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts
+        }
+
+
+pool_monitor = PoolMonitor(engine)
+
+
 # Create declarative base
 class Base(DeclarativeBase):
     pass
@@ -39,6 +75,15 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+def get_session_factory() -> async_sessionmaker:
+    """Dependency for code that opens its own short units of work.
+    
+    Long-lived handlers such as WebSocket endpoints use this instead of
+    get_db so they only hold a connection while handling an event.
+    """
+    return AsyncSessionLocal
+
+
 async def create_db_and_tables():
     """Create database tables"""
     async with engine.begin() as conn:
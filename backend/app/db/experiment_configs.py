@@ -0,0 +1,126 @@
+"""
+Process-wide cache of compiled experiment configurations
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+import hashlib
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.experiment import Condition, Experiment
+from app.models.session import Session
+
+
+def role_config_hash(role: Dict[str, Any]) -> str:
+    """Stable fingerprint of a role configuration"""
+    encoded = json.dumps(role, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+@dataclass
+class CompiledExperiment:
+    """The parts of an experiment's config the chat path needs, parsed once"""
+    experiment_id: str
+    version: int
+    config: Dict[str, Any]
+    roles: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    role_hashes: Dict[str, str] = field(default_factory=dict)
+    scenario: Dict[str, Any] = field(default_factory=dict)
+    instructions: str = ""
+    completion_trigger: Dict[str, Any] = field(default_factory=dict)
+    time_limit_minutes: Optional[float] = None
+    context_window: int = 20
+    
+    def ai_role(self, name: str) -> Optional[Dict[str, Any]]:
+        """The AI role with the given participant name"""
+        role = self.roles.get(name)
+        if role and role.get("type") == "AI":
+            return role
+        return None
+
+
+def compile_experiment(experiment_id: str, version: Optional[int], config: Dict[str, Any]) -> CompiledExperiment:
+    """Index an experiment config's roles by name and pull out its scenario settings"""
+    roles = {}
+    for role in config.get("roles", []):
+        # The first role with a name wins, as with the linear scan this replaces
+        roles.setdefault(role.get("name"), role)
+    scenario = config.get("scenario", {}) or {}
+    return CompiledExperiment(
+        experiment_id=str(experiment_id),
+        version=version or 1,
+        config=config,
+        roles=roles,
+        role_hashes={name: role_config_hash(role) for name, role in roles.items()},
+        scenario=scenario,
+        instructions=scenario.get("instructions", ""),
+        completion_trigger=scenario.get("completionTrigger", {}) or {},
+        time_limit_minutes=scenario.get("timeLimit"),
+        context_window=scenario.get("contextWindow") or settings.AI_CONTEXT_WINDOW
+    )
+
+
+class ExperimentConfigCache:
+    """Compiled configs keyed by (experiment id, version), looked up by session.
+    
+    A session's condition, and so its experiment, never changes, so after the
+    first lookup a session resolves to its compiled config without touching
+    the database. update_experiment and delete_experiment invalidate the
+    experiment's entries. Each worker has its own cache.
+    """
+    
+    def __init__(self):
+        self._compiled: Dict[Tuple[str, int], CompiledExperiment] = {}
+        self._sessions: Dict[str, Tuple[str, int]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, experiment: Experiment) -> CompiledExperiment:
+        """Compiled config for an experiment row that has already been loaded"""
+        key = (str(experiment.id), experiment.version or 1)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = compile_experiment(experiment.id, experiment.version, experiment.config)
+            self._compiled[key] = compiled
+        return compiled
+    
+    async def for_session(self, db: AsyncSession, session_id: str) -> Optional[CompiledExperiment]:
+        """Compiled config of the experiment a session belongs to"""
+        session_id = str(session_id)
+        key = self._sessions.get(session_id)
+        if key is not None and key in self._compiled:
+            self.hits += 1
+            return self._compiled[key]
+        
+        self.misses += 1
+        result = await db.execute(
+            select(Experiment)
+            .join(Condition, Condition.experiment_id == Experiment.id)
+            .join(Session, Session.condition_id == Condition.id)
+            .where(Session.id == session_id)
+        )
+        experiment = result.scalar_one_or_none()
+        if experiment is None:
+            return None
+        compiled = self.get(experiment)
+        self._sessions[session_id] = (compiled.experiment_id, compiled.version)
+        return compiled
+    
+    def invalidate(self, experiment_id: str):
+        """Drop every compiled version of an experiment"""
+        experiment_id = str(experiment_id)
+        for key in [key for key in self._compiled if key[0] == experiment_id]:
+            del self._compiled[key]
+        for session_id in [s for s, key in self._sessions.items() if key[0] == experiment_id]:
+            del self._sessions[session_id]
+    
+    def forget_session(self, session_id: str):
+        """Drop a finished session's lookup entry"""
+        self._sessions.pop(str(session_id), None)
+
+
+# Global experiment config cache instance
+experiment_configs = ExperimentConfigCache()
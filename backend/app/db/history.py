@@ -0,0 +1,36 @@
+"""
+Keyset-paginated reads of a session's message history
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.message import Message
+
+
+async def get_message_page(
+    db: AsyncSession,
+    session_id: str,
+    limit: int,
+    before: Optional[int] = None
+) -> Tuple[List[Message], Optional[int]]:
+    """Get up to limit messages with sequence_number below before, oldest first.
+    
+    Without before the most recent messages are returned. The second value is
+    the cursor to pass as before for the next (older) page, or None when
+    there is nothing older. Uses the unique (session_id, sequence_number) index, so
+    the cost does not depend on how far back the page is.
+    """
+    query = select(Message).where(Message.session_id == str(session_id))
+    if before is not None:
+        query = query.where(Message.sequence_number < before)
+    # One extra row tells us whether an older page exists
+    query = query.order_by(Message.sequence_number.desc()).limit(limit + 1)
+    
+    result = await db.execute(query)
+    messages = list(result.scalars().all())
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    messages.reverse()
+    
+    cursor = messages[0].sequence_number if has_more else None
+    return messages, cursor
@@ -0,0 +1,184 @@
+"""
+Write-behind persistence of chat messages with group commit
+"""
+from datetime import datetime, timezone
+from typing import List, Optional, Tuple
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.db.database import AsyncSessionLocal
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+# Message columns written by the writer; everything a caller can set
+_COLUMNS = [column.key for column in Message.__table__.columns]
+
+
+class MessageWriter:
+    """Queues messages and persists them in batches, off the chat path.
+    
+    submit() gives the message its id and timestamp so it can be broadcast
+    right away, and returns a future that resolves once the message is
+    committed. The writer task takes everything queued within max_delay (up
+    to max_batch rows), writes it with one multi-row INSERT and commits once.
+    flush() waits until everything submitted so far is durable; use it
+    before acting on the transcript, e.g. when a session completes.
+    """
+    
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        max_batch: Optional[int] = None,
+        max_delay: Optional[float] = None
+    ):
+        self._session_factory = session_factory
+        self.max_batch = max_batch or settings.MESSAGE_WRITER_MAX_BATCH
+        self.max_delay = settings.MESSAGE_WRITER_MAX_DELAY_MS / 1000 if max_delay is None else max_delay
+        # Created by start() so it belongs to the loop the writer task runs on
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight = False
+        self.batches_written = 0
+        self.messages_written = 0
+    
+    @property
+    def pending(self) -> int:
+        """Items waiting to be picked up by the writer task"""
+        return self._queue.qsize() if self._queue is not None else 0
+    
+    def configure(self, session_factory: async_sessionmaker):
+        """Write through a different session factory, e.g. the one get_session_factory resolves to"""
+        self._session_factory = session_factory
+    
+    def _running(self) -> bool:
+        return bool(self._task and not self._task.done() and self._task.get_loop() is asyncio.get_running_loop())
+    
+    def start(self):
+        """Start the writer task on the current event loop if it is not running there"""
+        if self._running():
+            return
+        # A queue that was waited on from another loop cannot be used from
+        # this one; carry anything still queued over to a fresh queue
+        queue = asyncio.Queue()
+        while self._queue is not None and not self._queue.empty():
+            queue.put_nowait(self._queue.get_nowait())
+        self._queue = queue
+        self._in_flight = False
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Write everything still queued, then stop the writer task"""
+        if self._task:
+            if self._running():
+                await self.flush()
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+    
+    def submit(self, message: Message) -> asyncio.Future:
+        """Queue a message for writing; the future resolves when it is committed"""
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+        if message.timestamp is None:
+            message.timestamp = datetime.now(timezone.utc)
+        if message.message_type is None:
+            message.message_type = "chat"
+        
+        self.start()
+        ack = asyncio.get_running_loop().create_future()
+        # Failures are logged here; callers that don't wait on the ack needn't see them
+        ack.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._queue.put_nowait((message, ack))
+        return ack
+    
+    async def flush(self):
+        """Wait until every message submitted so far has been committed (or failed)"""
+        if (self._queue is None or self._queue.empty()) and not self._in_flight:
+            return
+        marker = asyncio.get_running_loop().create_future()
+        self.start()
+        self._queue.put_nowait((None, marker))
+        await marker
+    
+    async def _collect(self) -> List[Tuple[Optional[Message], asyncio.Future]]:
+        """Wait for one item, then take whatever else arrives within max_delay"""
+        batch = [await self._queue.get()]
+        # flush() must wait for items held here as well as those still queued
+        self._in_flight = True
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(batch) < self.max_batch:
+            if self._queue.empty():
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            else:
+                batch.append(self._queue.get_nowait())
+        return batch
+    
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                messages = [(message, ack) for message, ack in batch if message is not None]
+                if messages:
+                    await self._write(messages)
+            except Exception as e:
+                logger.error(f"Error in message writer: {e}")
+            finally:
+                self._in_flight = False
+                for message, ack in batch:
+                    if message is None and not ack.done():
+                        ack.set_result(None)
+    
+    async def _write(self, messages: List[Tuple[Message, asyncio.Future]]):
+        rows = [self._row(message) for message, _ in messages]
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(Message), rows)
+                await db.commit()
+        except Exception as e:
+            if len(messages) == 1:
+                logger.error(f"Failed to persist message {rows[0]['id']}: {e}")
+                _resolve(messages[0][1], error=e)
+                return
+            # Retry one by one so a bad row does not take the batch down with it
+            logger.warning(f"Batch insert of {len(messages)} messages failed, retrying individually: {e}")
+            for item in messages:
+                await self._write([item])
+            return
+        
+        self.batches_written += 1
+        self.messages_written += len(messages)
+        for _, ack in messages:
+            _resolve(ack)
+    
+    @staticmethod
+    def _row(message: Message) -> dict:
+        return {key: getattr(message, key) for key in _COLUMNS}
+
+
+def _resolve(ack: asyncio.Future, error: Optional[Exception] = None):
+    if ack.done():
+        return
+    if error is None:
+        ack.set_result(None)
+    else:
+        ack.set_exception(error)
+
+
+# Global message writer instance
+message_writer = MessageWriter()
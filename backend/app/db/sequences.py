@@ -0,0 +1,111 @@
+"""
+Per-session allocation of message sequence numbers
+"""
+from abc import ABC, abstractmethod
+from typing import Dict
+import asyncio
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.message import Message
+from app.models.session import Session
+
+
+class SequenceAllocator(ABC):
+    """Hands out the next sequence_number for a session's messages.
+    
+    The unique (session_id, sequence_number) constraint on messages is the
+    backstop: a number handed out twice fails the insert instead of silently
+    producing two messages in the same position.
+    """
+    
+    @abstractmethod
+    async def next(self, db: AsyncSession, session_id: str) -> int:
+        """Allocate the next sequence number for a session"""
+    
+    def forget(self, session_id: str):
+        """Release any state kept for a session that has ended"""
+
+
+class InMemorySequenceAllocator(SequenceAllocator):
+    """Counters seeded once per session from MAX(sequence_number).
+    
+    After the first message only a dict increment is needed, with no
+    awaits in between, so allocation is atomic on the event loop. Only
+    correct when a single worker writes a session's messages.
+    """
+    
+    def __init__(self):
+        self._last: Dict[str, int] = {}
+        self._seeding: Dict[str, asyncio.Lock] = {}
+    
+    async def next(self, db: AsyncSession, session_id: str) -> int:
+        session_id = str(session_id)
+        if session_id not in self._last:
+            await self._seed(db, session_id)
+        self._last[session_id] += 1
+        return self._last[session_id]
+    
+    async def _seed(self, db: AsyncSession, session_id: str):
+        lock = self._seeding.setdefault(session_id, asyncio.Lock())
+        async with lock:
+            if session_id in self._last:
+                return  # Seeded by a concurrent caller
+            current = await db.scalar(
+                select(func.max(Message.sequence_number)).where(Message.session_id == session_id)
+            )
+            self._last[session_id] = current or 0
+        self._seeding.pop(session_id, None)
+    
+    def forget(self, session_id: str):
+        self._last.pop(str(session_id), None)
+
+
+class DatabaseSequenceAllocator(SequenceAllocator):
+    """Counter kept in sessions.message_sequence, safe across workers.
+    
+    The increment is a single UPDATE that locks the session row, so
+    concurrent writers to one session queue up and never receive the same
+    number. The chat path commits it on its own, before the message is handed
+    to the writer, so the lock is held only briefly; a message that then
+    fails to be written leaves a gap rather than a duplicate. Sessions that
+    predate the counter (message_sequence still 0) are seeded from
+    MAX(sequence_number) by the first increment.
+    """
+    
+    async def next(self, db: AsyncSession, session_id: str) -> int:
+        session_id = str(session_id)
+        highest_stored = (
+            select(func.coalesce(func.max(Message.sequence_number), 0))
+            .where(Message.session_id == session_id)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            update(Session)
+            .where(Session.id == session_id)
+            .values(message_sequence=case(
+                (Session.message_sequence == 0, highest_stored),
+                else_=Session.message_sequence
+            ) + 1)
+            .returning(Session.message_sequence)
+        )
+        value = result.scalar_one_or_none()
+        if value is None:
+            raise ValueError(f"Session {session_id} not found")
+        return value
+
+
+def create_sequence_allocator() -> SequenceAllocator:
+    """Build the allocator selected by settings.MESSAGE_SEQUENCE_ALLOCATOR"""
+    kind = settings.MESSAGE_SEQUENCE_ALLOCATOR.lower()
+    if kind == "memory":
+        return InMemorySequenceAllocator()
+    if kind == "database":
+        return DatabaseSequenceAllocator()
+    raise ValueError(f"Unknown message sequence allocator: {settings.MESSAGE_SEQUENCE_ALLOCATOR}")
+
+
+# Global allocator instance
+sequence_allocator = create_sequence_allocator()
@@ -8,7 +8,13 @@ import logging
 
 from app.api import experiments, sessions, participants, websocket
 from app.core.config import settings
-from app.db.database import create_db_and_tables
+from app.core.websocket_manager import manager
+from app.core.ai_turns import ai_turns
+from app.agents.agent_factory import agent_registry
+from app.agents.base import prompt_cache_stats
+from app.agents.clients import provider_clients
+from app.db.database import create_db_and_tables, get_session_factory, pool_monitor
+from app.db.message_writer import message_writer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,9 +27,21 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Team-LLM platform...")
     await create_db_and_tables()
+    await manager.start()
+    # Write where the request handlers read, including when the dependency is overridden
+    session_factory = app.dependency_overrides.get(get_session_factory, get_session_factory)()
+    message_writer.configure(session_factory)
+    websocket.configure_ai_turns(session_factory)
+    message_writer.start()
+    provider_clients.open()
     yield
     # Shutdown
     logger.info("Shutting down Team-LLM platform...")
+    await ai_turns.shutdown()
+    agent_registry.shutdown()
+    await provider_clients.close()
+    await manager.shutdown()
+    await message_writer.stop()
 
 
 # Create FastAPI app
@@ -64,4 +82,10 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "team-llm-backend"}
\ No newline at end of file
+    return {
+        "status": "healthy",
+        "service": "team-llm-backend",
+        "db_pool": pool_monitor.snapshot(),
+        "llm_pools": provider_clients.stats(),
+        "prompt_cache": prompt_cache_stats.snapshot()
+    }
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Message model for chat communications
 """
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Integer, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Integer, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.database import Base
@@ -11,6 +11,10 @@ import uuid
 class Message(Base):
     """Message model for chat communications"""
     __tablename__ = "messages"
+    __table_args__ = (
+        # One message per position; also serves ordered history reads and keyset pagination
+        UniqueConstraint("session_id", "sequence_number", name="uq_messages_session_sequence"),
+    )
     
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     session_id = Column(String, ForeignKey("sessions.id"), nullable=False)
@@ -40,6 +40,9 @@ class Session(Base):
     completion_code = Column(String, unique=True)
     final_outcome = Column(JSON)  # Task outcome data
     
+    # Last sequence_number handed out to a message (DatabaseSequenceAllocator)
+    message_sequence = Column(Integer, nullable=False, default=0, server_default="0")
+    
     # Relationships
     condition = relationship("Condition", back_populates="sessions")
     participants = relationship("Participant", back_populates="session", cascade="all, delete-orphan")
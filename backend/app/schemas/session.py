@@ -100,6 +100,24 @@ class SessionCompleteRequest(BaseModel):
     final_outcome: Optional[Dict[str, Any]] = Field(None, description="Task outcome data")
 
 
+class MessageResponse(BaseModel):
+    """Schema for a stored chat message"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: str
+    participant_id: str
+    content: str
+    message_type: Optional[str] = None
+    sequence_number: int
+    timestamp: datetime
+
+
+class MessagePageResponse(BaseModel):
+    """Schema for a page of session history, oldest message first"""
+    messages: List[MessageResponse]
+    next_cursor: Optional[int] = Field(None, description="Pass as 'before' to get the preceding page")
+
+
 class SessionStatsResponse(BaseModel):
     """Schema for session statistics"""
     total_sessions: int
@@ -1,11 +1,67 @@
 """
 WebSocket message schemas
+
+Wire format
+-----------
+Clients pick an encoding with the WebSocket subprotocol header:
+
+- ``team-llm.json.v1`` (or no subprotocol): every frame is a text frame
+  holding one JSON object.
+- ``team-llm.msgpack.v1``: every frame is a binary frame holding one
+  MessagePack map.
+
+Both encodings carry the same logical event: a map whose ``type`` key names
+the event, with the remaining keys as documented by the models below.
+Timestamps are ISO 8601 strings in both encodings. Clients that connect with
+``?batch=true`` may also receive an array (JSON array / MessagePack array) of
+such maps in a single frame.
+
+Session events other than typing, chat_delta and ping carry an ``event_seq`` that
+increases by one per event in the session. ``session_info`` reports the
+current ``epoch`` and ``event_seq``; reconnecting with ``?epoch=...&last_seq=N``
+replays the events after N and sends ``session_info`` with ``resumed`` set and
+an empty ``message_history``. When the gap can no longer be replayed a full
+snapshot is sent instead.
+
+``session_info`` holds only the most recent messages. When older ones exist
+its ``history_cursor`` is set; sending ``{"type": "history_request",
+"before": <cursor>}`` returns a ``history_page`` with the preceding messages
+and the cursor for the page before that (None at the start of the session).
+
+AI replies may be streamed: ``chat_delta`` events with the same ``stream_id``
+carry the reply piece by piece (``index`` counts from 0) while the AI
+participant is shown as typing, followed by the ``chat`` event with the full
+content and that ``stream_id``. Only the ``chat`` event is stored and
+replayed; deltas may be dropped under backpressure, so clients should treat
+the text built from them as a draft that the ``chat`` event replaces. If the
+reply is abandoned instead (newer input superseded the turn, or generation
+failed) a ``chat_delta_cancelled`` event with the ``stream_id`` follows and
+the draft should be dropped.
+
+Inbound ``chat``, ``typing`` and ``history_request`` events are rate limited
+per participant and per session, and oversized or undecodable frames are
+refused. Rejected frames are answered with an ``error`` event (see
+``ErrorEvent``) rather than dropped silently.
 """
+from enum import Enum
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 
+class WireEncoding(str, Enum):
+    """Frame encodings a client can negotiate"""
+    JSON = "json"
+    MSGPACK = "msgpack"
+
+
+# Subprotocol names the server understands
+SUBPROTOCOL_ENCODINGS: Dict[str, WireEncoding] = {
+    "team-llm.msgpack.v1": WireEncoding.MSGPACK,
+    "team-llm.json.v1": WireEncoding.JSON,
+}
+
+
 class ChatMessage(BaseModel):
     """Chat message schema"""
     type: str = "chat"
@@ -28,4 +84,87 @@ class TypingIndicator(BaseModel):
 class TaskCompleteSignal(BaseModel):
     """Task completion signal schema"""
     type: str = "task_complete"
-    outcome: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    outcome: Optional[Dict[str, Any]] = None
+
+
+class HistoryRequest(BaseModel):
+    """Request for messages older than a cursor"""
+    type: str = "history_request"
+    before: Optional[int] = None
+    limit: Optional[int] = None
+
+
+class ChatEvent(BaseModel):
+    """Chat message as broadcast to the session"""
+    type: str = "chat"
+    message_id: str
+    participant_id: str
+    participant_name: str
+    participant_type: str
+    content: str
+    timestamp: str
+    sequence_number: int
+    stream_id: Optional[str] = None
+    event_seq: Optional[int] = None
+
+
+class ChatDeltaEvent(BaseModel):
+    """Piece of an AI reply that is still being generated"""
+    type: str = "chat_delta"
+    stream_id: str
+    participant_id: str
+    participant_name: str
+    index: int
+    delta: str
+
+
+class ChatDeltaCancelledEvent(BaseModel):
+    """A streamed AI reply that will not be completed"""
+    type: str = "chat_delta_cancelled"
+    stream_id: str
+    participant_id: str
+    participant_name: str
+
+
+class TypingEvent(BaseModel):
+    """Typing state change of another participant"""
+    type: str = "typing"
+    participant_id: str
+    participant_name: str
+    is_typing: bool
+
+
+class SessionInfoEvent(BaseModel):
+    """Snapshot sent to a participant right after connecting"""
+    type: str = "session_info"
+    session_id: str
+    participants: List[Dict[str, Any]]
+    status: str
+    resumed: bool = False
+    epoch: Optional[str] = None
+    event_seq: int = 0
+    message_history: List[Dict[str, Any]]
+    history_cursor: Optional[int] = None
+
+
+class ErrorEvent(BaseModel):
+    """Sent to one connection when a frame it sent was rejected.
+    
+    code is one of rate_limited (with event, scope and retry_after in
+    seconds), frame_too_large (with max_bytes) or invalid_request.
+    """
+    type: str = "error"
+    code: str
+    message: str
+    event: Optional[str] = None
+    scope: Optional[str] = None
+    retry_after: Optional[float] = None
+    max_bytes: Optional[int] = None
+
+
+class HistoryPageEvent(BaseModel):
+    """Reply to a history_request, oldest message first"""
+    type: str = "history_page"
+    before: Optional[int] = None
+    messages: List[Dict[str, Any]]
+    history_cursor: Optional[int] = None
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-recipient send_json vs. serialize-once broadcast frames
+
+Usage (from the backend directory):
+    python benchmarks/bench_broadcast_encoding.py [--recipients 8] [--events 20000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core import frames  # noqa: E402
+from app.core.frames import OutboundFrame  # noqa: E402
+
+
+def chat_event() -> dict:
+    """A chat event shaped like the ones websocket_endpoint broadcasts"""
+    return {
+        "type": "chat",
+        "message_id": str(uuid.uuid4()),
+        "participant_id": str(uuid.uuid4()),
+        "participant_name": "Sophia",
+        "participant_type": "ai",
+        "content": "I think Starlight Valley is the best option because the rent is low and it is over 2000 sqft",
+        "timestamp": datetime.utcnow().isoformat(),
+        "sequence_number": 42
+    }
+
+
+def old_path(events, recipients: int) -> float:
+    """What Starlette's send_json does once per recipient"""
+    start = time.perf_counter()
+    for event in events:
+        for _ in range(recipients):
+            json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+    return time.perf_counter() - start
+
+
+def new_path(events, recipients: int) -> float:
+    """Encode once, hand the same text to every recipient"""
+    start = time.perf_counter()
+    for event in events:
+        frame = OutboundFrame(event)
+        for _ in range(recipients):
+            frame.text
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipients", type=int, default=8)
+    parser.add_argument("--events", type=int, default=20000)
+    args = parser.parse_args()
+    
+    events = [chat_event() for _ in range(args.events)]
+    frames_sent = args.events * args.recipients
+    
+    old = old_path(events, args.recipients)
+    new = new_path(events, args.recipients)
+    
+    encoder = "orjson" if frames.orjson is not None else "json"
+    print(f"{args.events} events x {args.recipients} recipients ({encoder} encoder)")
+    print(f"  per-recipient send_json: {old * 1000:8.1f} ms  ({frames_sent / old:,.0f} frames/s)")
+    print(f"  serialize-once frames:   {new * 1000:8.1f} ms  ({frames_sent / new:,.0f} frames/s)")
+    print(f"  speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: targeted delivery cost as the number of connections grows
+
+Compares the old full scan of _participant_info with the participant-id
+index, for 1k and 10k open connections.
+
+Usage (from the backend directory):
+    python benchmarks/bench_targeted_send.py [--sends 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.backplane import BackplaneEnvelope  # noqa: E402
+from app.core.frames import OutboundFrame  # noqa: E402
+from app.core.websocket_manager import ConnectionManager  # noqa: E402
+
+
+class NullWebSocket:
+    """Socket that accepts everything and writes nothing"""
+    
+    async def accept(self, subprotocol=None):
+        pass
+    
+    async def send_text(self, text):
+        pass
+    
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+def scan_targets(manager: ConnectionManager, participant_ids):
+    """The pre-index lookup: walk every connection on the worker"""
+    return [
+        websocket for websocket, info in manager._participant_info.items()
+        if info["participant_id"] in participant_ids
+    ]
+
+
+async def run(connections: int, sends: int):
+    manager = ConnectionManager(queue_size=sends + 10)
+    sessions = connections // 8
+    for i in range(connections):
+        await manager.connect(NullWebSocket(), f"s{i % sessions}", f"p{i}", f"P{i}")
+    
+    targets = [f"p{i}" for i in range(0, connections, connections // 4)][:2]
+    frame = OutboundFrame({"type": "notice", "content": "hello"})
+    
+    start = time.perf_counter()
+    for _ in range(sends):
+        scan_targets(manager, targets)
+    scanned = time.perf_counter() - start
+    
+    envelope = BackplaneEnvelope(frame=frame, participant_ids=targets)
+    start = time.perf_counter()
+    for _ in range(sends):
+        manager._deliver(envelope)
+    indexed = time.perf_counter() - start
+    
+    await manager.shutdown()
+    return scanned, indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sends", type=int, default=2000)
+    args = parser.parse_args()
+    
+    print(f"{args.sends} targeted sends to 2 participants")
+    for connections in (1_000, 10_000):
+        scanned, indexed = asyncio.run(run(connections, args.sends))
+        print(
+            f"  {connections:>6} connections: scan {scanned / args.sends * 1e6:8.1f} us/send, "
+            f"index {indexed / args.sends * 1e6:6.1f} us/send"
+        )
+
+
+if __name__ == "__main__":
+    main()
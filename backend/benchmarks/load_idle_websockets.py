@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Load test: many idle chat WebSockets and the database connections they hold
+
+Opens --connections WebSockets against the ASGI app in-process (no server or
+sockets needed), spread over sessions of --team-size participants, waits for
+every session_info, lets them sit idle, then reports pool usage. With
+short-lived units of work the idle sockets hold zero connections.
+
+Usage (from the backend directory):
+    python benchmarks/load_idle_websockets.py [--connections 2000] [--team-size 4]
+        [--concurrency 50] [--idle 2]
+"""
+import argparse
+import asyncio
+import atexit
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app's engine is created at import time; point it at a scratch database first
+_scratch = tempfile.mkdtemp()
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_scratch, 'load.db')}"
+
+from app.db.database import AsyncSessionLocal, pool_monitor  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.experiment import Condition, Experiment  # noqa: E402
+from app.models.participant import Participant, ParticipantType  # noqa: E402
+from app.models.session import Session  # noqa: E402
+
+# Per-connection join/leave logging would drown the report
+logging.getLogger("app").setLevel(logging.WARNING)
+
+
+class IdleClient:
+    """One ASGI WebSocket connection that waits for session_info and then stays quiet"""
+    
+    def __init__(self, session_id: str, participant_id: str):
+        self.session_id = session_id
+        self.participant_id = participant_id
+        self.ready = asyncio.Event()
+        self.closed_with = None
+        self._inbox: asyncio.Queue = asyncio.Queue()
+        self._inbox.put_nowait({"type": "websocket.connect"})
+    
+    @property
+    def scope(self) -> dict:
+        return {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "path": f"/ws/session/{self.session_id}",
+            "raw_path": f"/ws/session/{self.session_id}".encode(),
+            "root_path": "",
+            "query_string": f"participant_id={self.participant_id}".encode(),
+            "headers": [],
+            "subprotocols": [],
+            "client": ("127.0.0.1", 0),
+            "server": ("load-test", 80),
+        }
+    
+    async def receive(self) -> dict:
+        return await self._inbox.get()
+    
+    async def send(self, message: dict):
+        if message["type"] == "websocket.send" and '"session_info"' in (message.get("text") or ""):
+            self.ready.set()
+        elif message["type"] == "websocket.close":
+            self.closed_with = message.get("code")
+            self.ready.set()
+    
+    def disconnect(self):
+        self._inbox.put_nowait({"type": "websocket.disconnect", "code": 1000})
+    
+    async def run(self):
+        await app(self.scope, self.receive, self.send)
+
+
+async def seed(connections: int, team_size: int):
+    """Create sessions and participants for every connection"""
+    async with AsyncSessionLocal() as db:
+        experiment = Experiment(name="Idle WebSocket load test", config={})
+        db.add(experiment)
+        await db.flush()
+        condition = Condition(experiment_id=experiment.id, name="load", parameters={})
+        db.add(condition)
+        await db.flush()
+        
+        seats = []
+        for _ in range(0, connections, team_size):
+            session = Session(condition_id=condition.id, team_size=team_size, required_humans=team_size)
+            db.add(session)
+            await db.flush()
+            participants = [
+                Participant(session_id=session.id, type=ParticipantType.HUMAN, name=f"Human {i}")
+                for i in range(team_size)
+            ]
+            db.add_all(participants)
+            await db.flush()
+            seats.extend((session.id, participant.id) for participant in participants)
+        await db.commit()
+    return seats[:connections]
+
+
+async def run(connections: int, team_size: int, concurrency: int, idle: float):
+    async with app.router.lifespan_context(app):
+        seats = await seed(connections, team_size)
+        clients = [IdleClient(session_id, participant_id) for session_id, participant_id in seats]
+        
+        # Participants trickle in; at most `concurrency` handshakes are in progress at once
+        handshakes = asyncio.Semaphore(concurrency)
+        tasks = []
+        
+        async def open_connection(client: IdleClient):
+            async with handshakes:
+                tasks.append(asyncio.create_task(client.run()))
+                await client.ready.wait()
+        
+        start = time.perf_counter()
+        await asyncio.gather(*[open_connection(client) for client in clients])
+        connected = time.perf_counter() - start
+        rejected = sum(1 for client in clients if client.closed_with is not None)
+        
+        await asyncio.sleep(idle)
+        idle_stats = pool_monitor.snapshot()
+        
+        for client in clients:
+            client.disconnect()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    print(f"{connections} WebSockets in {len(seats) // team_size} sessions of {team_size}")
+    print(f"  connected in {connected:.2f}s ({connections - rejected} ok, {rejected} rejected)")
+    print(f"  pool: {idle_stats['pool']}, size {idle_stats['size']}")
+    print(f"  connections held while idle: {idle_stats['checked_out']}")
+    print(f"  peak connections during connect: {idle_stats['peak_checked_out']}")
+    print(f"  total checkouts: {idle_stats['checkouts']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--team-size", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50, help="Handshakes in progress at once")
+    parser.add_argument("--idle", type=float, default=2.0, help="Seconds to stay idle before sampling the pool")
+    args = parser.parse_args()
+    asyncio.run(run(args.connections, args.team_size, args.concurrency, args.idle))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,9 +4,10 @@ Test configuration and fixtures
 import asyncio
 import pytest
 import pytest_asyncio
+from dataclasses import dataclass
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from typing import AsyncGenerator, Generator
+from typing import Any, AsyncGenerator, Dict, Generator, List, Optional, Sequence
 from app.db.database import Base
 from app.main import app
 from fastapi.testclient import TestClient
@@ -50,20 +51,110 @@ async def async_session(async_engine) -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+@dataclass
+class SeededSession:
+    """Rows created by seed_session"""
+    experiment: Any
+    condition: Any
+    session: Any
+    humans: List[Any]
+    ais: List[Any]
+
+
 @pytest.fixture
-def client(async_session) -> TestClient:
+def seed_session(async_session):
+    """Create an experiment, a condition and a session directly in the database.
+    
+    Returns an async function. Its arguments choose the experiment config, how
+    many human participants join, the names of the AI participants, and chat
+    messages to store. Messages are sent by the participants in turn, humans
+    first.
+    """
+    from app.models.experiment import Condition, Experiment
+    from app.models.message import Message
+    from app.models.participant import Participant, ParticipantType
+    from app.models.session import Session
+    
+    async def seed(
+        config: Optional[Dict[str, Any]] = None,
+        humans: int = 1,
+        ai_names: Sequence[str] = (),
+        messages: Sequence[str] = (),
+        ai_model: str = "mock/test"
+    ) -> SeededSession:
+        experiment = Experiment(name="Test experiment", version=1, config=config or {})
+        async_session.add(experiment)
+        await async_session.flush()
+        condition = Condition(experiment_id=experiment.id, name="control", parameters={})
+        async_session.add(condition)
+        await async_session.flush()
+        session = Session(
+            condition_id=condition.id,
+            team_size=max(1, humans + len(ai_names)),
+            required_humans=humans,
+            message_sequence=len(messages)
+        )
+        async_session.add(session)
+        await async_session.flush()
+        
+        human_rows = [
+            Participant(session_id=session.id, type=ParticipantType.HUMAN, name="Human" if humans == 1 else f"Human {i}")
+            for i in range(humans)
+        ]
+        ai_rows = [
+            Participant(session_id=session.id, type=ParticipantType.AI, name=name, ai_model=ai_model)
+            for name in ai_names
+        ]
+        async_session.add_all(human_rows + ai_rows)
+        await async_session.flush()
+        
+        senders = human_rows + ai_rows
+        for i, content in enumerate(messages):
+            async_session.add(Message(
+                session_id=session.id,
+                participant_id=senders[i % len(senders)].id,
+                content=content,
+                sequence_number=i + 1
+            ))
+        await async_session.commit()
+        return SeededSession(experiment, condition, session, human_rows, ai_rows)
+    
+    return seed
+
+
+@pytest_asyncio.fixture
+async def writer_on_test_db(async_engine):
+    """The global message writer, writing to the test database and stopped afterwards"""
+    from app.db.database import AsyncSessionLocal
+    from app.db.message_writer import message_writer
+    
+    message_writer.configure(async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False))
+    yield message_writer
+    await message_writer.stop()
+    message_writer.configure(AsyncSessionLocal)
+
+
+@pytest.fixture
+def client(async_engine, async_session) -> TestClient:
     """Create a test client"""
-    from app.db.database import get_db
+    from app.core.websocket_manager import manager
+    from app.db.database import get_db, get_session_factory
     
     async def override_get_db():
         yield async_session
     
+    def override_get_session_factory():
+        return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = override_get_session_factory
     
     with TestClient(app) as test_client:
         yield test_client
     
     app.dependency_overrides.clear()
+    # The next TestClient runs its lifespan on a new event loop
+    manager.reset()
 
 
 @pytest.fixture
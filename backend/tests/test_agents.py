@@ -0,0 +1,418 @@
+"""
+Tests for AI agents and the agent registry
+"""
+import asyncio
+import json
+import threading
+import pytest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from app.agents.agent_factory import AgentRegistry
+from app.agents.anthropic_agent import AnthropicAgent
+from app.agents.base import AgentResponse, ConversationMessage
+from app.agents.clients import provider_clients
+from app.agents.mock_agent import MockAgent
+from app.agents.openai_agent import OpenAIAgent
+from app.core.config import settings
+from app.db.experiment_configs import CompiledExperiment, compile_experiment, role_config_hash
+
+
+def make_config(persona: str = "Friendly") -> CompiledExperiment:
+    return compile_experiment("e1", 1, {
+        "roles": [
+            {"name": "Participant", "type": "HUMAN"},
+            {"name": "James", "type": "AI", "model": "mock/test", "persona": persona, "knowledge": {}},
+        ]
+    })
+
+
+class TestAgentRegistry:
+    """Test cases for per-session agent reuse"""
+    
+    def test_agents_are_reused_across_turns(self):
+        """The second turn gets the same agent instance"""
+        registry = AgentRegistry()
+        james = SimpleNamespace(id="p1", name="James", ai_model=None)
+        
+        [(participant, role, first)] = registry.activate("s1", [james], make_config())
+        [(_, _, second)] = registry.activate("s1", [james], make_config())
+        
+        assert isinstance(first, MockAgent) and first.name == "James"
+        assert second is first
+        assert participant is james and role["model"] == "mock/test"
+        assert registry.built == 1 and registry.reused == 1
+    
+    def test_participants_without_a_role_are_skipped(self):
+        """Only AI participants matching an AI role get agents"""
+        registry = AgentRegistry()
+        stranger = SimpleNamespace(id="p2", name="Stranger", ai_model=None)
+        
+        assert registry.activate("s1", [stranger], make_config()) == []
+        assert registry.session_agents("s1") == 0
+    
+    def test_changed_role_config_rebuilds_agent(self):
+        """Editing a role replaces the agent instead of keeping both"""
+        registry = AgentRegistry()
+        james = SimpleNamespace(id="p1", name="James", ai_model=None)
+        
+        [(_, _, before)] = registry.activate("s1", [james], make_config("Friendly"))
+        [(_, _, after)] = registry.activate("s1", [james], make_config("Grumpy"))
+        
+        assert after is not before and after.persona == "Grumpy"
+        assert registry.session_agents("s1") == 1
+        assert role_config_hash({"a": 1, "b": 2}) == role_config_hash({"b": 2, "a": 1})
+    
+    def test_evict_drops_only_that_session(self):
+        """Ending one session leaves other sessions' agents in place"""
+        registry = AgentRegistry()
+        james = SimpleNamespace(id="p1", name="James", ai_model=None)
+        registry.activate("s1", [james], make_config())
+        registry.activate("s2", [james], make_config())
+        
+        assert registry.evict("s1") == 1
+        assert registry.session_agents("s1") == 0
+        assert registry.session_agents("s2") == 1
+        assert registry.evict("s1") == 0
+
+
+class TestStreaming:
+    """Test cases for streamed agent responses"""
+    
+    async def test_default_stream_yields_whole_response(self):
+        """Agents without native streaming yield their response in one piece"""
+        from app.agents.base import Agent, AgentResponse
+        
+        class WholeAgent(Agent):
+            async def generate_response(self, conversation_history, task_instructions, last_message=None):
+                return AgentResponse(content="All at once")
+            
+            async def should_participate(self, conversation_history, last_message=None):
+                return True
+        
+        agent = WholeAgent(name="James", model="test", persona="", knowledge={})
+        assert [piece async for piece in agent.stream_response([], "")] == ["All at once"]
+    
+    async def test_mock_agent_streams_words(self):
+        """The mock agent streams its reply word by word"""
+        agent = MockAgent(name="James", model="mock/test", persona="", knowledge={"East Point Mall": {"parking": "Yes"}})
+        
+        pieces = [piece async for piece in agent.stream_response([], "")]
+        
+        assert len(pieces) > 1
+        assert "".join(pieces).split(" ") == [piece.strip() for piece in pieces]
+
+
+class TestProviderClients:
+    """Test cases for the shared provider connection pools"""
+    
+    @pytest.mark.asyncio
+    async def test_agents_share_one_pool_per_base_url(self, monkeypatch):
+        """OpenAI agents borrow the same SDK client and connection pool"""
+        from app.agents.clients import ProviderClients
+        from app.agents import openai_agent
+        
+        clients = ProviderClients(max_connections=8, connect_timeout=2, read_timeout=20)
+        monkeypatch.setattr(openai_agent, "provider_clients", clients)
+        monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+        first = OpenAIAgent(name="A", model="openai/gpt-4", persona="", knowledge={})
+        second = OpenAIAgent(name="B", model="openai/gpt-4", persona="", knowledge={})
+        try:
+            assert first.client is second.client
+            pool = clients.http(settings.OPENAI_BASE_URL)
+            assert first.client._client is pool
+            assert pool.timeout.connect == 2 and pool.timeout.read == 20
+            
+            other = OpenAIAgent(
+                name="C", model="openai/gpt-4", persona="", knowledge={}, config={"base_url": "http://localhost:9/v1"}
+            )
+            assert other.client is not first.client
+            assert clients.stats()["pools"] == 2
+        finally:
+            await clients.close()
+    
+    @pytest.mark.asyncio
+    async def test_pools_are_recreated_after_close(self):
+        """Clients borrowed after close() come from a fresh pool"""
+        from app.agents.clients import ProviderClients
+        
+        clients = ProviderClients()
+        before = clients.http("http://localhost:9")
+        await clients.close()
+        
+        assert before.is_closed
+        after = clients.http("http://localhost:9")
+        assert after is not before and not after.is_closed
+        await clients.close()
+
+
+class StandInAnthropic(BaseHTTPRequestHandler):
+    """Answers /v1/messages like the Anthropic API and records each request"""
+    
+    requests = []
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+        type(self).requests.append((dict(self.headers), body))
+        usage = {"input_tokens": 12, "output_tokens": 1, "cache_read_input_tokens": 900}
+        if not body.get("stream"):
+            payload = json.dumps({
+                "content": [{"type": "text", "text": " Hotel A is closest."}],
+                "stop_reason": "end_turn",
+                "usage": {**usage, "output_tokens": 6}
+            }).encode()
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        
+        events = [{"type": "message_start", "message": {"usage": usage}}]
+        events += [
+            {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}
+            for piece in [" Hotel", " A is", " closest."]
+        ]
+        events += [{"type": "message_delta", "usage": {"output_tokens": 6}}, {"type": "message_stop"}]
+        payload = "".join(f"event: {e['type']}\ndata: {json.dumps(e)}\n\n" for e in events).encode()
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("content-length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def anthropic_server():
+    """Local stand-in for the Anthropic API; yields its base URL"""
+    StandInAnthropic.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInAnthropic)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+class TestAnthropicAgent:
+    """Test cases for the Messages API integration"""
+    
+    def _agent(self, base_url: str) -> AnthropicAgent:
+        return AnthropicAgent(
+            name="James",
+            model="anthropic/claude-test",
+            persona="You are James",
+            knowledge={"Hotel A": {"distance": "1 km"}},
+            config={"base_url": base_url}
+        )
+    
+    def _conversation(self):
+        return [
+            ConversationMessage(participant_name=name, participant_type="human", content=content, timestamp=datetime.utcnow())
+            for name, content in [("Ana", "Hi"), ("Ben", "Which hotel?")]
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_reply_reports_usage_and_caches_system_prompt(self, anthropic_server):
+        """The system prompt is a cached block and usage lands in the metadata"""
+        agent = self._agent(anthropic_server)
+        try:
+            response = await agent.generate_response(self._conversation(), "Pick a hotel")
+        finally:
+            await provider_clients.close()
+        
+        assert response.content == "Hotel A is closest."
+        assert response.metadata["input_tokens"] == 12
+        assert response.metadata["output_tokens"] == 6
+        assert response.metadata["cache_read_input_tokens"] == 900
+        
+        [(headers, body)] = StandInAnthropic.requests
+        assert headers["anthropic-version"] == AnthropicAgent.API_VERSION
+        assert body["model"] == "claude-test"
+        assert [block["cache_control"] for block in body["system"]] == [{"type": "ephemeral"}] * 2
+        assert body["system"][0]["text"].startswith("TASK INSTRUCTIONS:\nPick a hotel")
+        assert "Hotel A" in body["system"][1]["text"]
+        # Consecutive messages from others are one user turn
+        assert body["messages"] == [{"role": "user", "content": "Ana: Hi\nBen: Which hotel?"}]
+    
+    @pytest.mark.asyncio
+    async def test_stream_yields_text_deltas(self, anthropic_server):
+        """Server-sent text deltas are yielded as they arrive, with usage kept afterwards"""
+        agent = self._agent(anthropic_server)
+        try:
+            pieces = [piece async for piece in agent.stream_response(self._conversation(), "Pick a hotel")]
+        finally:
+            await provider_clients.close()
+        
+        assert pieces == ["Hotel", " A is", " closest."]
+        assert agent.last_usage["output_tokens"] == 6
+        assert StandInAnthropic.requests[0][1]["stream"] is True
+
+
+class TestCassettes:
+    """Test cases for recording and replaying agent replies"""
+    
+    class CountingAgent(MockAgent):
+        calls = 0
+        
+        async def generate_response(self, conversation_history, task_instructions, last_message=None):
+            type(self).calls += 1
+            await asyncio.sleep(0.05)
+            return AgentResponse(content=f"reply {self.calls}", metadata={"tokens_used": 10})
+    
+    def _conversation(self, *contents):
+        now = datetime.utcnow()
+        return [
+            ConversationMessage(participant_name="Ana", participant_type="human", content=content, timestamp=now)
+            for content in contents
+        ]
+    
+    @pytest.mark.asyncio
+    async def test_recorded_session_replays_offline(self, tmp_path):
+        """Replies recorded to disk come back for the same requests without calling the agent"""
+        from app.agents.cassettes import CassetteAgent, CassetteStore
+        
+        path = str(tmp_path / "llm.jsonl")
+        inner = self.CountingAgent(name="James", model="mock/test", persona="Helpful", knowledge={})
+        recorder = CassetteAgent(inner, CassetteStore(path), "record")
+        first = await recorder.generate_response(self._conversation("Hi"), "Rank")
+        second = await recorder.generate_response(self._conversation("Hi", "Which one?"), "Rank")
+        assert self.CountingAgent.calls == 2
+        
+        store = CassetteStore(path)
+        player = CassetteAgent(inner, store, "replay", replay_latency=False)
+        replayed = await player.generate_response(self._conversation("Hi", "Which one?"), "Rank")
+        
+        assert self.CountingAgent.calls == 2
+        assert replayed.content == second.content
+        assert replayed.metadata["replayed"] and replayed.metadata["tokens_used"] == 10
+        assert (await player.generate_response(self._conversation("Hi"), "Rank")).content == first.content
+        assert store.hits == 2 and len(store) == 2
+    
+    @pytest.mark.asyncio
+    async def test_replay_keeps_latency_and_refuses_unknown_requests(self, tmp_path):
+        """Recorded latency is waited out; a request never recorded raises CassetteMiss"""
+        from app.agents.cassettes import CassetteAgent, CassetteMiss, CassetteStore
+        
+        path = str(tmp_path / "llm.jsonl")
+        inner = self.CountingAgent(name="James", model="mock/test", persona="Helpful", knowledge={})
+        await CassetteAgent(inner, CassetteStore(path), "record").generate_response(self._conversation("Hi"), "Rank")
+        player = CassetteAgent(inner, CassetteStore(path), "replay")
+        
+        started = asyncio.get_running_loop().time()
+        await player.generate_response(self._conversation("Hi"), "Rank")
+        assert asyncio.get_running_loop().time() - started >= 0.04
+        
+        with pytest.raises(CassetteMiss):
+            await player.generate_response(self._conversation("Something else"), "Rank")
+    
+    def test_factory_wraps_agents_when_a_cassette_is_configured(self, tmp_path, monkeypatch):
+        """LLM_CASSETTE_MODE puts every agent the factory builds behind the cassette"""
+        from app.agents.agent_factory import AgentFactory
+        from app.agents.cassettes import CassetteAgent
+        
+        monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", "replay")
+        monkeypatch.setattr(settings, "LLM_CASSETTE_PATH", str(tmp_path / "llm.jsonl"))
+        agent = AgentFactory.create_agent(name="James", model="mock/test", persona="", knowledge={})
+        
+        assert isinstance(agent, CassetteAgent) and isinstance(agent.inner, MockAgent)
+
+
+class TestSystemPrompt:
+    """Test cases for compiled system prompts"""
+    
+    def test_prompt_is_compiled_once_and_counted(self, monkeypatch):
+        """Later turns reuse the compiled prompt and count as cache hits"""
+        from app.agents import base
+        
+        stats = base.PromptCacheStats()
+        monkeypatch.setattr(base, "prompt_cache_stats", stats)
+        agent = MockAgent(name="James", model="mock/test", persona="You are James", knowledge={"A": {"cost": "low"}})
+        
+        prompts = [agent.build_system_prompt("Pick a hotel") for _ in range(10)]
+        
+        assert len(set(prompts)) == 1
+        assert stats.snapshot() == {"hits": 9, "misses": 1, "hit_rate": 0.9}
+    
+    def test_shared_instructions_lead_the_prompt(self):
+        """Agents in one experiment share a byte-identical prefix; their own text follows"""
+        ana = MockAgent(name="Ana", model="mock/test", persona="You are Ana", knowledge={"A": {"cost": "low"}})
+        ben = MockAgent(name="Ben", model="mock/test", persona="You are Ben", knowledge={"B": {"cost": "high"}})
+        
+        ana_shared, ana_own = ana.system_prompt_parts("Pick a hotel")
+        ben_shared, ben_own = ben.system_prompt_parts("Pick a hotel")
+        
+        assert ana_shared == ben_shared
+        assert ana.build_system_prompt("Pick a hotel").startswith(ana_shared)
+        assert ana_own.startswith("You are Ana") and "A:\n  - cost: low" in ana_own
+
+
+class TestContextBudget:
+    """Test cases for token-budgeted context"""
+    
+    @staticmethod
+    def history(count: int, length: int = 40):
+        return [
+            ConversationMessage(
+                participant_name=f"P{i % 3}",
+                participant_type="human",
+                content=f"{i:03d} " + "x" * length,
+                timestamp=datetime.utcnow()
+            )
+            for i in range(count)
+        ]
+    
+    def test_newest_messages_fill_the_budget(self):
+        """Messages are kept from newest to oldest until the budget is spent"""
+        from app.agents.context import count_tokens, fit_context, render_message, MESSAGE_OVERHEAD_TOKENS
+        
+        history = self.history(30)
+        per_message = count_tokens(render_message(history[-1]), "mock/test") + MESSAGE_OVERHEAD_TOKENS
+        
+        kept = fit_context(history, "mock/test", budget=per_message * 5)
+        
+        assert kept == history[-5:]
+    
+    def test_newest_message_is_always_kept(self):
+        """A message longer than the whole budget is still sent on its own"""
+        from app.agents.context import fit_context
+        
+        history = self.history(3, length=4000)
+        
+        assert fit_context(history, "mock/test", budget=10) == history[-1:]
+    
+    def test_budget_per_model(self, monkeypatch):
+        """Per-model budgets match the full identifier or the bare model name"""
+        from app.agents.context import context_budget
+        
+        monkeypatch.setattr(settings, "AI_CONTEXT_TOKEN_BUDGETS", {"gpt-4o-mini": 400})
+        
+        assert context_budget("openai/gpt-4o-mini") == 400
+        assert context_budget("anthropic/claude-3-haiku") == settings.AI_CONTEXT_TOKEN_BUDGET
+    
+    def test_reply_limit_sets_max_tokens(self):
+        """max_tokens follows the reply character limit, as does the prompt rule"""
+        agent = MockAgent(name="James", model="mock/test", persona="", knowledge={})
+        short = MockAgent(name="Ana", model="mock/test", persona="", knowledge={}, config={"max_reply_chars": 90})
+        
+        assert agent.max_reply_tokens == 84
+        assert short.max_reply_tokens == 30
+        assert "- Keep messages under 90 characters" in short.build_system_prompt("Pick a hotel")
+    
+    def test_requests_use_the_budget(self):
+        """Provider requests carry only the messages that fit and the derived max_tokens"""
+        agent = AnthropicAgent(
+            name="James", model="anthropic/claude-3-haiku", persona="", knowledge={},
+            config={"context_tokens": 60}
+        )
+        history = self.history(30)
+        
+        body = agent.build_request(history, "Pick a hotel")
+        sent = "\n".join(message["content"] for message in body["messages"])
+        
+        assert body["max_tokens"] == 84
+        assert history[-1].content in sent
+        assert history[0].content not in sent
@@ -301,4 +301,73 @@ conditions:
         assert response.status_code == 201
         data = response.json()
         assert len(data["config"]["roles"]) == 3
-        assert sum(1 for r in data["config"]["roles"] if r["type"] == "AI") == 2
\ No newline at end of file
+        assert sum(1 for r in data["config"]["roles"] if r["type"] == "AI") == 2
+
+class TestExperimentConfigCache:
+    """Test cases for compiled experiment configs"""
+    
+    @pytest.fixture
+    async def session_with_experiment(self, seed_session):
+        """An experiment with one condition and one session"""
+        seeded = await seed_session(config={
+            "roles": [
+                {"name": "Participant", "type": "HUMAN"},
+                {"name": "James", "type": "AI", "model": "mock/test"},
+            ],
+            "scenario": {
+                "instructions": "Rank the locations",
+                "completionTrigger": {"type": "keyword", "value": "task-complete"},
+                "timeLimit": 30,
+            },
+        })
+        return seeded.experiment.id, seeded.session.id
+    
+    def test_compile_indexes_roles_and_scenario(self):
+        """Roles are looked up by name and scenario settings are pulled out"""
+        from app.db.experiment_configs import compile_experiment
+        
+        compiled = compile_experiment("e1", None, {
+            "roles": [{"name": "Participant", "type": "HUMAN"}, {"name": "James", "type": "AI"}],
+            "scenario": {"instructions": "Go", "timeLimit": 15},
+        })
+        
+        assert compiled.version == 1
+        assert compiled.ai_role("James") == {"name": "James", "type": "AI"}
+        assert compiled.ai_role("Participant") is None
+        assert compiled.ai_role("Nobody") is None
+        assert compiled.instructions == "Go" and compiled.time_limit_minutes == 15
+        assert compiled.completion_trigger == {}
+    
+    @pytest.mark.asyncio
+    async def test_session_lookup_is_cached(self, async_session, session_with_experiment):
+        """The second lookup for a session does not query the database"""
+        from app.db.experiment_configs import ExperimentConfigCache
+        
+        cache = ExperimentConfigCache()
+        _, session_id = session_with_experiment
+        
+        first = await cache.for_session(async_session, session_id)
+        second = await cache.for_session(None, session_id)
+        
+        assert second is first
+        assert first.completion_trigger["value"] == "task-complete"
+        assert (cache.misses, cache.hits) == (1, 1)
+        assert await cache.for_session(async_session, "missing") is None
+    
+    @pytest.mark.asyncio
+    async def test_update_and_delete_invalidate(self, async_session, session_with_experiment):
+        """Editing or deleting an experiment drops its compiled config"""
+        from app.api.experiments import delete_experiment, update_experiment
+        from app.db.experiment_configs import experiment_configs
+        from app.schemas.experiment import ExperimentUpdate
+        
+        experiment_id, session_id = session_with_experiment
+        before = await experiment_configs.for_session(async_session, session_id)
+        
+        await update_experiment(experiment_id, ExperimentUpdate(config={"scenario": {"instructions": "New"}}), db=async_session)
+        after = await experiment_configs.for_session(async_session, session_id)
+        assert after is not before and after.instructions == "New"
+        
+        await delete_experiment(experiment_id, db=async_session)
+        assert (experiment_id, 1) not in experiment_configs._compiled
+        experiment_configs.forget_session(session_id)
@@ -0,0 +1,147 @@
+"""
+Tests for write-behind message persistence
+"""
+import asyncio
+import pytest
+from uuid import uuid4
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from app.db.message_writer import MessageWriter
+from app.models.message import Message
+
+
+@pytest.fixture
+async def writer(async_engine):
+    """Message writer on the test database, stopped after each test"""
+    created = []
+    
+    def factory(**kwargs):
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        created.append(MessageWriter(session_factory, **kwargs))
+        return created[-1]
+    
+    yield factory
+    for instance in created:
+        await instance.stop()
+
+
+def chat(session_id: str, sequence_number: int) -> Message:
+    return Message(
+        session_id=session_id,
+        participant_id="p1",
+        content=f"message {sequence_number}",
+        sequence_number=sequence_number
+    )
+
+
+class RecordingSession:
+    """Async session stand-in that records inserted rows"""
+    
+    def __init__(self, rows):
+        self.rows = rows
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        return False
+    
+    async def execute(self, statement, rows):
+        self.rows.extend(rows)
+    
+    async def commit(self):
+        pass
+
+
+async def stored_sequence(async_engine, session_id: str):
+    session_factory = async_sessionmaker(async_engine, class_=AsyncSession)
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Message.sequence_number).where(Message.session_id == session_id).order_by(Message.sequence_number)
+        )
+        return list(result.scalars().all())
+
+
+class TestMessageWriter:
+    """Test cases for batching, acknowledgement and flush"""
+    
+    @pytest.mark.asyncio
+    async def test_submit_assigns_identity_before_writing(self, writer):
+        """Messages can be broadcast as soon as they are submitted"""
+        writer = writer()
+        message = chat(str(uuid4()), 1)
+        
+        ack = writer.submit(message)
+        
+        assert message.id and message.timestamp
+        assert not ack.done()
+        await ack
+    
+    @pytest.mark.asyncio
+    async def test_burst_is_written_in_few_commits(self, async_engine, writer):
+        """Messages queued together share one INSERT and commit"""
+        writer = writer(max_batch=50, max_delay=0.01)
+        session_id = str(uuid4())
+        
+        acks = [writer.submit(chat(session_id, i)) for i in range(1, 101)]
+        await asyncio.gather(*acks)
+        
+        assert writer.messages_written == 100
+        assert writer.batches_written == 2
+        assert await stored_sequence(async_engine, session_id) == list(range(1, 101))
+    
+    @pytest.mark.asyncio
+    async def test_flush_waits_for_queued_messages(self, async_engine, writer):
+        """After flush() every earlier submission is committed"""
+        writer = writer(max_delay=0.05)
+        session_id = str(uuid4())
+        for i in range(1, 6):
+            writer.submit(chat(session_id, i))
+        
+        await writer.flush()
+        
+        assert await stored_sequence(async_engine, session_id) == [1, 2, 3, 4, 5]
+    
+    @pytest.mark.asyncio
+    async def test_flush_waits_for_batch_being_collected(self, async_engine, writer):
+        """A message already taken by the writer but not yet written is flushed too"""
+        writer = writer(max_delay=0.1)
+        session_id = str(uuid4())
+        writer.submit(chat(session_id, 1))
+        await asyncio.sleep(0.01)  # The writer task is now waiting for more
+        
+        await writer.flush()
+        
+        assert await stored_sequence(async_engine, session_id) == [1]
+    
+    @pytest.mark.asyncio
+    async def test_bad_row_fails_alone(self, async_engine, writer):
+        """A duplicate position fails its own ack without losing the rest of the batch"""
+        writer = writer(max_delay=0.01)
+        session_id = str(uuid4())
+        await writer.submit(chat(session_id, 1))
+        
+        good = writer.submit(chat(session_id, 2))
+        duplicate = writer.submit(chat(session_id, 1))
+        later = writer.submit(chat(session_id, 3))
+        results = await asyncio.gather(good, duplicate, later, return_exceptions=True)
+        
+        assert results[0] is None and results[2] is None
+        assert isinstance(results[1], Exception)
+        assert await stored_sequence(async_engine, session_id) == [1, 2, 3]
+    
+    def test_restarts_on_a_new_event_loop(self):
+        """A writer stopped with one loop keeps working on the next"""
+        rows = []
+        writer = MessageWriter(lambda: RecordingSession(rows), max_delay=0.01)
+        session_id = str(uuid4())
+        
+        async def lifespan(sequence_number):
+            writer.start()
+            await writer.submit(chat(session_id, sequence_number))
+            await writer.stop()
+        
+        asyncio.run(lifespan(1))
+        asyncio.run(lifespan(2))
+        
+        assert [row["sequence_number"] for row in rows] == [1, 2]
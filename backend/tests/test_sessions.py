@@ -1,6 +1,7 @@
 """
 Tests for Session API endpoints
 """
+import asyncio
 import pytest
 from uuid import uuid4
 from datetime import datetime, timedelta
@@ -402,4 +403,229 @@ conditions:
         assert response.status_code == 200
         data = join_response.json()
         assert len(data["ai_participants"]) == 2
-        assert {p["name"] for p in data["ai_participants"]} == {"Agent Alpha", "Agent Beta"}
\ No newline at end of file
+        assert {p["name"] for p in data["ai_participants"]} == {"Agent Alpha", "Agent Beta"}
+
+class TestMessageHistory:
+    """Test cases for keyset-paginated message history"""
+    
+    @pytest.fixture
+    async def long_session(self, async_session):
+        """A session with 120 messages"""
+        from app.models.message import Message
+        from app.models.session import Session
+        
+        session = Session(condition_id=str(uuid4()), team_size=2, required_humans=1)
+        async_session.add(session)
+        await async_session.flush()
+        for i in range(1, 121):
+            async_session.add(Message(
+                session_id=session.id,
+                participant_id=str(uuid4()),
+                content=f"message {i}",
+                sequence_number=i
+            ))
+        await async_session.commit()
+        return session
+    
+    @pytest.mark.asyncio
+    async def test_pages_walk_back_to_the_start(self, async_session, long_session):
+        """Following the cursor returns every message exactly once, in order"""
+        from app.db.history import get_message_page
+        
+        messages, cursor = await get_message_page(async_session, long_session.id, 50)
+        assert [m.sequence_number for m in messages] == list(range(71, 121))
+        assert cursor == 71
+        
+        seen = [m.sequence_number for m in messages]
+        while cursor is not None:
+            messages, cursor = await get_message_page(async_session, long_session.id, 50, before=cursor)
+            seen = [m.sequence_number for m in messages] + seen
+        
+        assert seen == list(range(1, 121))
+    
+    @pytest.mark.asyncio
+    async def test_messages_endpoint(self, client, long_session):
+        """The REST endpoint pages with before/limit"""
+        response = client.get(f"/api/sessions/{long_session.id}/messages", params={"before": 21, "limit": 10})
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert [m["sequence_number"] for m in data["messages"]] == list(range(11, 21))
+        assert data["next_cursor"] == 11
+
+
+class TestSequenceAllocator:
+    """Test cases for per-session message sequence numbers"""
+    
+    @pytest.fixture
+    async def session_with_messages(self, seed_session):
+        """A session that already has 5 messages"""
+        seeded = await seed_session(messages=[f"message {i}" for i in range(1, 6)])
+        return seeded.session
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_allocations_are_unique_and_gap_free(self, async_session, session_with_messages):
+        """Concurrent callers continue after the existing messages without duplicates"""
+        from app.db.sequences import InMemorySequenceAllocator
+        
+        allocator = InMemorySequenceAllocator()
+        numbers = await asyncio.gather(*[
+            allocator.next(async_session, session_with_messages.id) for _ in range(20)
+        ])
+        
+        assert sorted(numbers) == list(range(6, 26))
+    
+    @pytest.mark.asyncio
+    async def test_database_counter_rolls_back_with_the_message(self, async_session, session_with_messages):
+        """A number allocated in a rolled-back transaction is handed out again"""
+        from app.db.sequences import DatabaseSequenceAllocator
+        
+        allocator = DatabaseSequenceAllocator()
+        session_id = session_with_messages.id
+        assert await allocator.next(async_session, session_id) == 6
+        await async_session.rollback()
+        
+        assert await allocator.next(async_session, session_id) == 6
+        assert await allocator.next(async_session, session_id) == 7
+        await async_session.commit()
+    
+    @pytest.mark.asyncio
+    async def test_database_counter_seeds_existing_sessions(self, async_session, session_with_messages):
+        """A session whose counter was never set continues after its stored messages"""
+        from sqlalchemy import update
+        from app.db.sequences import DatabaseSequenceAllocator
+        from app.models.session import Session
+        
+        session_id = session_with_messages.id
+        await async_session.execute(update(Session).where(Session.id == session_id).values(message_sequence=0))
+        await async_session.commit()
+        
+        allocator = DatabaseSequenceAllocator()
+        assert await allocator.next(async_session, session_id) == 6
+        assert await allocator.next(async_session, session_id) == 7
+        await async_session.commit()
+    
+    @pytest.mark.asyncio
+    async def test_memory_allocator_seeds_once(self, async_session, session_with_messages, monkeypatch):
+        """Only the first allocation for a session reads MAX(sequence_number)"""
+        from app.db.sequences import InMemorySequenceAllocator
+        
+        allocator = InMemorySequenceAllocator()
+        calls = []
+        original_scalar = async_session.scalar
+        
+        async def counting_scalar(*args, **kwargs):
+            calls.append(args)
+            return await original_scalar(*args, **kwargs)
+        
+        monkeypatch.setattr(async_session, "scalar", counting_scalar)
+        for _ in range(10):
+            await allocator.next(async_session, session_with_messages.id)
+        
+        assert len(calls) == 1
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_position_is_rejected(self, async_session, session_with_messages):
+        """The unique constraint refuses a second message at the same position"""
+        from sqlalchemy.exc import IntegrityError
+        from app.models.message import Message
+        
+        async_session.add(Message(
+            session_id=session_with_messages.id,
+            participant_id=str(uuid4()),
+            content="duplicate",
+            sequence_number=5
+        ))
+        with pytest.raises(IntegrityError):
+            await async_session.commit()
+        await async_session.rollback()
+
+
+class TestConversationWindows:
+    """Test cases for the in-memory conversation context of AI turns"""
+    
+    @pytest.fixture
+    async def chat_session(self, seed_session):
+        """A session with a human and an AI participant and 30 chat messages"""
+        seeded = await seed_session(ai_names=["James"], messages=[f"message {i}" for i in range(1, 31)])
+        return seeded.session.id
+    
+    @pytest.fixture
+    def session_factory(self, async_engine):
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        return async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    
+    @pytest.mark.asyncio
+    async def test_window_is_read_once_then_appended(self, async_engine, session_factory, chat_session):
+        """Only the first read queries the database; later messages come from appends"""
+        from sqlalchemy import event
+        from app.db.conversations import ConversationWindows
+        
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+        try:
+            windows = ConversationWindows(session_factory)
+            first = await windows.get(chat_session, 10)
+            assert len(statements) == 1
+            assert [m.content for m in first] == [f"message {i}" for i in range(21, 31)]
+            assert (first[-1].participant_name, first[-1].participant_type) == ("James", "ai")
+            
+            windows.append(chat_session, 31, "Human", "human", "message 31", datetime.utcnow())
+            second = await windows.get(chat_session, 10)
+            assert len(statements) == 1
+            assert [m.content for m in second] == [f"message {i}" for i in range(22, 32)]
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    
+    @pytest.mark.asyncio
+    async def test_messages_sent_during_the_read_are_kept(self, session_factory, chat_session, monkeypatch):
+        """A message appended while the window is being read is merged in order"""
+        from app.db import conversations
+        from app.db.conversations import ConversationWindows
+        
+        windows = ConversationWindows(session_factory)
+        
+        async def flush_and_send():
+            # Stands in for a chat message arriving while the first read waits
+            windows.append(chat_session, 31, "Human", "human", "message 31", datetime.utcnow())
+        
+        monkeypatch.setattr(conversations.message_writer, "flush", flush_and_send)
+        window = await windows.get(chat_session, 5)
+        
+        assert [m.content for m in window] == [f"message {i}" for i in range(27, 32)]
+    
+    @pytest.mark.asyncio
+    async def test_delivered_chat_events_are_appended(self, session_factory, chat_session):
+        """Chat events delivered from any worker extend the window; other events are ignored"""
+        from app.db.conversations import ConversationWindows
+        
+        windows = ConversationWindows(session_factory)
+        await windows.get(chat_session, 5)
+        event = {
+            "type": "chat",
+            "participant_name": "James",
+            "participant_type": "AI",
+            "content": "message 31",
+            "timestamp": datetime.utcnow().isoformat(),
+            "sequence_number": 31
+        }
+        windows.observe(str(chat_session), event)
+        windows.observe(str(chat_session), {"type": "participant_joined", "participant_id": "p1"})
+        
+        window = await windows.get(chat_session, 5)
+        assert [m.content for m in window] == [f"message {i}" for i in range(27, 32)]
+        assert window[-1].participant_type == "ai"
+    
+    @pytest.mark.asyncio
+    async def test_forget_drops_the_window(self, session_factory, chat_session):
+        """A finished session's window is released and appends are ignored"""
+        from app.db.conversations import ConversationWindows
+        
+        windows = ConversationWindows(session_factory)
+        await windows.get(chat_session, 5)
+        assert windows.is_cached(chat_session)
+        
+        windows.forget(chat_session)
+        windows.append(chat_session, 31, "Human", "human", "ignored", datetime.utcnow())
+        assert not windows.is_cached(chat_session)
@@ -240,4 +240,445 @@ class TestWebSocket:
             
             data = websocket.receive_json()
             assert data["type"] == "chat"
-            assert data["content"] == "Still connected"
\ No newline at end of file
+            assert data["content"] == "Still connected"
+
+class TestWebSocketDatabaseUsage:
+    """Test cases for how WebSocket connections use the database pool"""
+    
+    @pytest.fixture
+    async def seeded_session(self, seed_session):
+        """A session with two human participants, created directly in the database"""
+        seeded = await seed_session(humans=2)
+        return seeded.session.id, [p.id for p in seeded.humans]
+    
+    def test_idle_sockets_hold_no_connections(self, client, async_engine, seeded_session):
+        """Once session_info has been sent, open sockets have returned their connections"""
+        from app.db.database import PoolMonitor
+        
+        monitor = PoolMonitor(async_engine)
+        session_id, participant_ids = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_ids[0]}") as first:
+            assert first.receive_json()["type"] == "session_info"
+            with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_ids[1]}") as second:
+                assert second.receive_json()["type"] == "session_info"
+                
+                assert monitor.checkouts > 0
+                assert monitor.checked_out == 0
+
+
+class TestAIResponses:
+    """Test cases for AI turns with several AI teammates"""
+    
+    @pytest.fixture
+    async def ai_session(self, seed_session):
+        """A session with one human and three AI participants"""
+        names = ["Alex", "Blair", "Casey"]
+        seeded = await seed_session(
+            config={
+                "scenario": {"instructions": "Pick a location"},
+                "roles": [{"name": name, "type": "AI", "model": "mock/test", "persona": ""} for name in names]
+            },
+            ai_names=names,
+            messages=["Hi all"]
+        )
+        return seeded.session.id
+    
+    @pytest.mark.asyncio
+    async def test_agents_generate_concurrently(self, async_engine, ai_session, writer_on_test_db, monkeypatch):
+        """Three agents generate at once, within the concurrency cap"""
+        import asyncio
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.agents.base import AgentResponse
+        from app.api import websocket as ws_api
+        from app.core.config import settings
+        
+        generation_time = 0.2
+        running = []
+        peak = []
+        seen = []
+        broadcasts = []
+        
+        class SlowAgent:
+            async def should_participate(self, conversation, last_message):
+                return True
+            
+            async def generate_response(self, conversation, task_instructions, last_message=None):
+                assert task_instructions == "Pick a location"
+                seen.append(last_message.content)
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(generation_time)
+                running.pop()
+                return AgentResponse(content="Sounds good")
+        
+        broadcast = ws_api.manager.broadcast_to_session
+        
+        async def record_broadcast(session_id, message, **kwargs):
+            broadcasts.append(message)
+            # Delivered chat events feed the conversation window
+            await broadcast(session_id, message, **kwargs)
+        
+        from app.agents.agent_factory import AgentFactory
+        
+        monkeypatch.setattr(AgentFactory, "create_agent", staticmethod(lambda **kwargs: SlowAgent()))
+        monkeypatch.setattr(ws_api.manager, "broadcast_to_session", record_broadcast)
+        monkeypatch.setattr(settings, "AI_MAX_CONCURRENT_GENERATIONS", 3)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_DELAY", 0)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_GAP", 0.01)
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        await ws_api.trigger_ai_responses(ai_session, session_factory)
+        
+        assert len(broadcasts) == 3
+        # All three generations were in flight at once
+        assert max(peak) == 3
+        assert len({message["sequence_number"] for message in broadcasts}) == 3
+        assert seen == ["Hi all"] * 3
+        
+        # With a cap of one the same turn is serial again
+        running.clear()
+        peak.clear()
+        monkeypatch.setattr(settings, "AI_MAX_CONCURRENT_GENERATIONS", 1)
+        await ws_api.trigger_ai_responses(ai_session, session_factory)
+        assert max(peak) == 1
+        
+        # The replies of the first turn are already in the second turn's context
+        assert seen[-1] == "Sounds good"
+        ws_api.agent_registry.evict(ai_session)
+        ws_api.conversation_windows.forget(ai_session)
+    
+    @pytest.mark.asyncio
+    async def test_streamed_reply_is_relayed_then_stored_once(self, async_engine, ai_session, writer_on_test_db, monkeypatch):
+        """Deltas go out as chat_delta events; the full reply is one chat event and one stored message"""
+        import asyncio
+        from datetime import datetime
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.agents.agent_factory import AgentFactory
+        from app.api import websocket as ws_api
+        from app.core.config import settings
+        
+        broadcasts = []
+        stored = []
+        
+        class StreamingAgent:
+            async def should_participate(self, conversation, last_message):
+                return True
+            
+            async def stream_response(self, conversation, task_instructions, last_message=None):
+                for piece in ["Sounds", " good", " to", " me"]:
+                    await asyncio.sleep(0.01)
+                    yield piece
+        
+        async def record_broadcast(session_id, message, **kwargs):
+            broadcasts.append(message)
+        
+        def record_submit(message):
+            message.id, message.timestamp = str(uuid4()), datetime.utcnow()
+            stored.append(message)
+            return asyncio.get_running_loop().create_future()
+        
+        monkeypatch.setattr(AgentFactory, "create_agent", staticmethod(lambda **kwargs: StreamingAgent()))
+        monkeypatch.setattr(ws_api.manager, "broadcast_to_session", record_broadcast)
+        monkeypatch.setattr(ws_api.message_writer, "submit", record_submit)
+        monkeypatch.setattr(settings, "AI_STREAM_REPLIES", True)
+        monkeypatch.setattr(settings, "AI_TYPING_CHARS_PER_SECOND", 10000)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_DELAY", 0)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_GAP", 0)
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        try:
+            await ws_api.trigger_ai_responses(ai_session, session_factory)
+        finally:
+            ws_api.agent_registry.evict(ai_session)
+            ws_api.conversation_windows.forget(ai_session)
+        
+        chats = [m for m in broadcasts if m["type"] == "chat"]
+        assert len(chats) == 3 and len(stored) == 3
+        for chat in chats:
+            deltas = [m for m in broadcasts if m["type"] == "chat_delta" and m["stream_id"] == chat["stream_id"]]
+            assert [d["index"] for d in deltas] == [0, 1, 2, 3]
+            assert "".join(d["delta"] for d in deltas) == chat["content"] == "Sounds good to me"
+            # Every delta precedes the final chat event
+            assert broadcasts.index(deltas[-1]) < broadcasts.index(chat)
+        assert {m.content for m in stored} == {"Sounds good to me"}
+    
+    @pytest.mark.asyncio
+    async def test_superseded_stream_is_cancelled(self, async_engine, ai_session, writer_on_test_db, monkeypatch):
+        """Cancelling a turn mid-stream tells clients to drop each draft"""
+        import asyncio
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.agents.agent_factory import AgentFactory
+        from app.api import websocket as ws_api
+        from app.core.config import settings
+        
+        broadcasts = []
+        
+        class StallingAgent:
+            async def should_participate(self, conversation, last_message):
+                return True
+            
+            async def stream_response(self, conversation, task_instructions, last_message=None):
+                yield "Let me think"
+                await asyncio.sleep(60)
+                yield " about it"
+        
+        async def record_broadcast(session_id, message, **kwargs):
+            broadcasts.append(message)
+        
+        monkeypatch.setattr(AgentFactory, "create_agent", staticmethod(lambda **kwargs: StallingAgent()))
+        monkeypatch.setattr(ws_api.manager, "broadcast_to_session", record_broadcast)
+        monkeypatch.setattr(settings, "AI_STREAM_REPLIES", True)
+        monkeypatch.setattr(settings, "AI_TYPING_CHARS_PER_SECOND", 10000)
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        turn = asyncio.create_task(ws_api.trigger_ai_responses(ai_session, session_factory))
+        try:
+            for _ in range(100):
+                if len([m for m in broadcasts if m["type"] == "chat_delta"]) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            turn.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await turn
+        finally:
+            ws_api.agent_registry.evict(ai_session)
+            ws_api.conversation_windows.forget(ai_session)
+        
+        streams = {m["stream_id"] for m in broadcasts if m["type"] == "chat_delta"}
+        cancelled = {m["stream_id"] for m in broadcasts if m["type"] == "chat_delta_cancelled"}
+        assert len(streams) == 3
+        assert cancelled == streams
+        assert not [m for m in broadcasts if m["type"] == "chat"]
+    
+    @pytest.mark.asyncio
+    async def test_recorded_session_replays_turn_for_turn(self, async_engine, seed_session, writer_on_test_db, tmp_path, monkeypatch):
+        """A multi-turn session replayed from a cassette takes the same turns with the same replies"""
+        import random
+        from datetime import datetime
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+        from app.agents import agent_factory
+        from app.agents.base import AgentResponse
+        from app.agents.cassettes import cassette_store
+        from app.agents.mock_agent import MockAgent
+        from app.api import websocket as ws_api
+        from app.core.config import settings
+        
+        class QuickAgent(MockAgent):
+            async def generate_response(self, conversation_history, task_instructions, last_message=None):
+                return AgentResponse(content=self._generate_contextual_response(conversation_history))
+        
+        names = ["Alex", "Blair", "Casey"]
+        config = {
+            "scenario": {"instructions": "Pick a location"},
+            "roles": [{"name": name, "type": "AI", "model": "mock/test", "persona": ""} for name in names]
+        }
+        path = str(tmp_path / "session.jsonl")
+        monkeypatch.setattr(agent_factory, "MockAgent", QuickAgent)
+        monkeypatch.setattr(settings, "LLM_CASSETTE_PATH", path)
+        monkeypatch.setattr(settings, "LLM_CASSETTE_REPLAY_LATENCY", False)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_DELAY", 0)
+        monkeypatch.setattr(settings, "AI_REPLY_MIN_GAP", 0)
+        # Typing time, not generation time, decides the order replies are sent in
+        monkeypatch.setattr(settings, "AI_TYPING_CHARS_PER_SECOND", 500)
+        session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        # Two identical sessions: one is recorded, the other replayed
+        sessions = [await seed_session(config=config, ai_names=names, messages=["Hi all"]) for _ in range(2)]
+        
+        async def play(seeded, mode: str, seed: int):
+            monkeypatch.setattr(settings, "LLM_CASSETTE_MODE", mode)
+            random.seed(seed)
+            session_id = str(seeded.session.id)
+            try:
+                for turn in range(5):
+                    if turn:
+                        ws_api.conversation_windows.observe(session_id, {
+                            "type": "chat",
+                            "participant_name": "Human",
+                            "participant_type": "human",
+                            "content": f"Any other ideas? ({turn})",
+                            "timestamp": datetime.utcnow().isoformat(),
+                            "sequence_number": 100 + turn
+                        })
+                    await ws_api.trigger_ai_responses(session_id, session_factory)
+                window = await ws_api.conversation_windows.get(session_id, settings.AI_CONTEXT_WINDOW, session_factory)
+                return [(m.participant_name, m.content) for m in window]
+            finally:
+                ws_api.agent_registry.evict(session_id)
+                ws_api.conversation_windows.forget(session_id)
+        
+        recorded = await play(sessions[0], "record", seed=1)
+        replayed = await play(sessions[1], "replay", seed=2)
+        
+        assert [name for name, _ in recorded if name in names]
+        assert replayed == recorded
+        assert cassette_store(path).misses == 0
+    
+    @pytest.mark.asyncio
+    async def test_only_the_owning_worker_runs_the_turn(self, monkeypatch):
+        """A delivered human message starts a turn; it generates only where the session is owned"""
+        import asyncio
+        from datetime import datetime
+        from app.api import websocket as ws_api
+        
+        triggered = []
+        owned = {"s1": True, "s2": False}
+        
+        async def record_trigger(session_id, session_factory):
+            triggered.append(session_id)
+        
+        async def owns_session(session_id):
+            return owned[session_id]
+        
+        monkeypatch.setattr(ws_api, "trigger_ai_responses", record_trigger)
+        monkeypatch.setattr(ws_api.manager, "owns_session", owns_session)
+        
+        for session_id in owned:
+            ws_api.on_session_event(session_id, {
+                "type": "chat",
+                "participant_name": "Ana",
+                "participant_type": "human",
+                "content": "Hi",
+                "timestamp": datetime.utcnow().isoformat(),
+                "sequence_number": 1
+            })
+        # AI replies do not start another turn
+        ws_api.on_session_event("s1", {
+            "type": "chat",
+            "participant_name": "James",
+            "participant_type": "AI",
+            "content": "Hello",
+            "timestamp": datetime.utcnow().isoformat(),
+            "sequence_number": 2
+        })
+        while any(ws_api.ai_turns.is_running(session_id) for session_id in owned):
+            await asyncio.sleep(0)
+        
+        assert triggered == ["s1"]
+
+
+class TestInboundLimits:
+    """Test cases for flood protection on the chat socket"""
+    
+    @pytest.fixture
+    async def seeded_session(self, seed_session):
+        """A session with one human participant"""
+        seeded = await seed_session()
+        return seeded.session.id, seeded.humans[0].id
+    
+    def test_chat_flood_gets_an_error_frame(self, client, seeded_session, monkeypatch):
+        """Chats over the budget are refused with one rate_limited error"""
+        from app.core.websocket_manager import manager
+        
+        monkeypatch.setitem(manager.rate_limits.limits, "chat", ((0.01, 2), (100.0, 100)))
+        session_id, participant_id = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            assert websocket.receive_json()["type"] == "session_info"
+            for i in range(4):
+                websocket.send_json({"type": "chat", "content": f"message {i}"})
+            
+            received = [websocket.receive_json() for _ in range(3)]
+            assert [event["type"] for event in received] == ["chat", "chat", "error"]
+            error = received[2]
+            assert error["code"] == "rate_limited"
+            assert error["event"] == "chat" and error["scope"] == "participant"
+            assert error["retry_after"] > 0
+            
+            # The fourth chat was dropped without a second error
+            websocket.send_json({"type": "history_request", "before": "not a number"})
+            assert websocket.receive_json()["code"] == "invalid_request"
+    
+    def test_typing_over_budget_is_dropped_quietly(self, client, seeded_session, monkeypatch):
+        """Typing frames over the budget get no error frame; the tracker coalesces typing anyway"""
+        from app.core.websocket_manager import manager
+        
+        monkeypatch.setitem(manager.rate_limits.limits, "typing", ((0.01, 2), (100.0, 100)))
+        session_id, participant_id = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            assert websocket.receive_json()["type"] == "session_info"
+            for _ in range(5):
+                websocket.send_json({"type": "typing", "is_typing": True})
+            
+            websocket.send_json({"type": "history_request", "before": "not a number"})
+            assert websocket.receive_json()["code"] == "invalid_request"
+    
+    def test_oversized_frame_is_refused(self, client, seeded_session):
+        """A frame over the size limit is answered with frame_too_large and the socket stays open"""
+        from app.core.config import settings
+        
+        session_id, participant_id = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            assert websocket.receive_json()["type"] == "session_info"
+            websocket.send_json({"type": "chat", "content": "x" * settings.WS_MAX_FRAME_BYTES})
+            
+            error = websocket.receive_json()
+            assert error["type"] == "error" and error["code"] == "frame_too_large"
+            
+            websocket.send_json({"type": "chat", "content": "Still connected"})
+            assert websocket.receive_json()["content"] == "Still connected"
+    
+    def test_malformed_frames_get_invalid_request(self, client, seeded_session):
+        """Undecodable or non-object frames are answered with an error instead of closing the socket"""
+        session_id, participant_id = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            assert websocket.receive_json()["type"] == "session_info"
+            for frame in ["not json", "[1, 2]", '{"type": ["chat"]}']:
+                websocket.send_text(frame)
+                error = websocket.receive_json()
+                assert error["type"] == "error" and error["code"] == "invalid_request"
+            
+            websocket.send_json({"type": "chat", "content": "Still connected"})
+            assert websocket.receive_json()["content"] == "Still connected"
+    
+    def test_history_requests_are_budgeted(self, client, seeded_session, monkeypatch):
+        """Paging through history faster than the budget allows is refused"""
+        from app.core.websocket_manager import manager
+        
+        monkeypatch.setitem(manager.rate_limits.limits, "history_request", ((0.01, 2), (100.0, 100)))
+        session_id, participant_id = seeded_session
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            assert websocket.receive_json()["type"] == "session_info"
+            for _ in range(3):
+                websocket.send_json({"type": "history_request", "before": 1})
+            
+            received = [websocket.receive_json() for _ in range(3)]
+            assert [event["type"] for event in received] == ["history_page", "history_page", "error"]
+            assert received[2]["code"] == "rate_limited" and received[2]["event"] == "history_request"
+
+
+class TestSessionInfo:
+    """Test cases for the snapshot sent on connect"""
+    
+    @pytest.fixture
+    async def seeded_session(self, seed_session):
+        """A session with one human participant"""
+        seeded = await seed_session()
+        return seeded.session.id, seeded.humans[0].id
+    
+    def test_resume_token_covers_events_sent_before_it(self, client, seeded_session, monkeypatch):
+        """A broadcast while the snapshot is built is not newer than the session_info token"""
+        from app.core.websocket_manager import manager
+        from app.db.message_writer import message_writer
+        
+        session_id, participant_id = seeded_session
+        flush = message_writer.flush
+        
+        async def flush_with_broadcast():
+            await manager.broadcast_to_session(str(session_id), {"type": "chat", "content": "In the gap"})
+            await flush()
+        
+        monkeypatch.setattr(message_writer, "flush", flush_with_broadcast)
+        
+        with client.websocket_connect(f"/ws/session/{session_id}?participant_id={participant_id}") as websocket:
+            chat = websocket.receive_json()
+            info = websocket.receive_json()
+        
+        assert chat["content"] == "In the gap"
+        assert info["type"] == "session_info"
+        assert info["event_seq"] >= chat["event_seq"]
@@ -0,0 +1,875 @@
+"""
+Tests for the WebSocket connection manager
+"""
+import asyncio
+import json
+import os
+import pytest
+from app.core.ai_turns import AITurnScheduler, ReplyPacer
+from app.core.backplane import BackplaneEnvelope, InMemoryBackplane, PostgresBackplane
+from app.core.frames import OutboundFrame, decode_inbound, negotiate_encoding
+from app.core.liveness import LivenessMonitor
+from app.core.rate_limit import InboundRateLimiter
+from app.core.replay import ReplayBuffer
+from app.core.typing_tracker import TypingTracker
+from app.core.websocket_manager import ConnectionManager, ClientConnection, QueueOverflowPolicy
+from app.schemas.websocket import WireEncoding
+
+
+class FakeWebSocket:
+    """Minimal stand-in for a Starlette WebSocket.
+    
+    event_seq stamps are moved from each received event into seqs, so
+    assertions on sent can compare payloads only.
+    """
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = []
+        self.seqs = []
+        self.accepted = False
+        self.closed_with = None
+        self.gate = None
+        self.subprotocol = None
+        self.binary_frames = 0
+    
+    async def accept(self, subprotocol=None):
+        self.accepted = True
+        self.subprotocol = subprotocol
+    
+    async def send_text(self, text):
+        if self.gate:
+            await self.gate.wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self._record(json.loads(text))
+    
+    async def send_bytes(self, data):
+        self.binary_frames += 1
+        self._record(decode_inbound(None, data))
+    
+    def _record(self, payload):
+        for event in payload if isinstance(payload, list) else [payload]:
+            if "event_seq" in event:
+                self.seqs.append(event.pop("event_seq"))
+        self.sent.append(payload)
+    
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+async def drain():
+    """Let writer tasks run"""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+async def manager():
+    """Connection manager that is shut down after each test"""
+    created = []
+    
+    def factory(**kwargs):
+        created.append(ConnectionManager(**kwargs))
+        return created[-1]
+    
+    yield factory
+    for instance in created:
+        await instance.shutdown()
+
+
+class TestConnectionManager:
+    """Test cases for connection fan-out"""
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_all_connections(self, manager):
+        """Every connection in the session receives a broadcast"""
+        manager = manager()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        for i, ws in enumerate(sockets):
+            await manager.connect(ws, "s1", f"p{i}", f"P{i}")
+        await drain()
+        
+        await manager.broadcast_to_session("s1", {"type": "chat", "content": "hi"})
+        await drain()
+        
+        for ws in sockets:
+            assert ws.sent[-1] == {"type": "chat", "content": "hi"}
+    
+    @pytest.mark.asyncio
+    async def test_slow_socket_does_not_block_broadcast(self, manager):
+        """A stalled socket does not delay delivery to the rest of the session"""
+        manager = manager()
+        slow = FakeWebSocket()
+        slow.gate = asyncio.Event()
+        fast = FakeWebSocket()
+        await manager.connect(slow, "s1", "slow", "Slow")
+        await manager.connect(fast, "s1", "fast", "Fast")
+        await drain()
+        
+        await asyncio.wait_for(
+            manager.broadcast_to_session("s1", {"type": "chat", "content": "hi"}),
+            timeout=0.1
+        )
+        await drain()
+        
+        assert {"type": "chat", "content": "hi"} in fast.sent
+        assert slow.sent == []
+        slow.gate.set()
+        await drain()
+        assert {"type": "chat", "content": "hi"} in slow.sent
+    
+    @pytest.mark.asyncio
+    async def test_disconnect_policy_drops_slow_consumer(self, manager):
+        """A full queue disconnects the consumer under the disconnect policy"""
+        manager = manager(queue_size=2, overflow_policy="disconnect")
+        slow = FakeWebSocket()
+        slow.gate = asyncio.Event()
+        await manager.connect(slow, "s1", "slow", "Slow")
+        await drain()
+        
+        for i in range(5):
+            await manager.broadcast_to_session("s1", {"type": "chat", "content": str(i)})
+        await drain()
+        
+        assert manager.get_session_count("s1") == 0
+        assert slow.closed_with == 1013
+    
+    @pytest.mark.asyncio
+    async def test_frame_is_encoded_once(self, manager, monkeypatch):
+        """A broadcast serializes the event once regardless of recipient count"""
+        import app.core.frames as frames
+        
+        calls = []
+        original = frames.encode_json
+        monkeypatch.setattr(frames, "encode_json", lambda m: calls.append(m) or original(m))
+        
+        manager = manager()
+        sockets = [FakeWebSocket() for _ in range(8)]
+        for i, ws in enumerate(sockets):
+            await manager.connect(ws, "s1", f"p{i}", f"P{i}")
+        await drain()
+        calls.clear()
+        
+        await manager.broadcast_to_session("s1", {"type": "chat", "content": "hi"})
+        await drain()
+        
+        assert len(calls) == 1
+        assert all(ws.sent[-1] == {"type": "chat", "content": "hi"} for ws in sockets)
+    
+    
+    @pytest.mark.asyncio
+    async def test_targeted_send_reaches_every_tab(self, manager):
+        """A participant with several tabs gets targeted messages on each"""
+        manager = manager()
+        tab1, tab2, other = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+        await manager.connect(tab1, "s1", "p1", "P1")
+        await manager.connect(tab2, "s1", "p1", "P1")
+        await manager.connect(other, "s1", "p2", "P2")
+        await drain()
+        
+        await manager.send_to_participant("s1", "p1", {"type": "notice"})
+        await manager.send_to_participant("s2", "p1", {"type": "wrong_session"})
+        await drain()
+        
+        assert {"type": "notice"} in tab1.sent and {"type": "notice"} in tab2.sent
+        assert {"type": "notice"} not in other.sent
+        assert all(m["type"] != "wrong_session" for m in tab1.sent + tab2.sent)
+    
+    @pytest.mark.asyncio
+    async def test_participant_index_follows_disconnects(self, manager):
+        """Disconnecting one tab keeps the participant's other tabs indexed"""
+        manager = manager()
+        tab1, tab2 = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(tab1, "s1", "p1", "P1")
+        await manager.connect(tab2, "s1", "p1", "P1")
+        assert manager.get_participant_connection_count("p1") == 2
+        
+        await manager.disconnect(tab1)
+        assert manager.get_participant_connection_count("p1") == 1
+        
+        await manager.disconnect(tab2)
+        assert manager.get_participant_connection_count("p1") == 0
+        assert "p1" not in manager._participant_connections
+
+
+class TestClientConnection:
+    """Test cases for per-connection overflow policies"""
+    
+    def _client(self, policy):
+        return ClientConnection(FakeWebSocket(), queue_size=3, overflow_policy=policy, on_failure=lambda c: None)
+    
+    def _queued(self, client):
+        return [f.message["content"] for f in client._queue]
+    
+    def test_drop_oldest(self):
+        """The oldest queued message is discarded first"""
+        client = self._client(QueueOverflowPolicy.DROP_OLDEST)
+        for i in range(5):
+            assert client.enqueue(OutboundFrame({"type": "chat", "content": i}))
+        assert self._queued(client) == [2, 3, 4]
+        assert client.dropped_count == 2
+    
+    def test_drop_low_priority(self):
+        """Typing events are sacrificed before chat messages"""
+        client = self._client(QueueOverflowPolicy.DROP_LOW_PRIORITY)
+        client.enqueue(OutboundFrame({"type": "chat", "content": 0}))
+        client.enqueue(OutboundFrame({"type": "typing", "content": 1}))
+        client.enqueue(OutboundFrame({"type": "chat", "content": 2}))
+        assert client.enqueue(OutboundFrame({"type": "chat", "content": 3}))
+        assert self._queued(client) == [0, 2, 3]
+        
+        # New low-priority events are dropped when only chat is queued
+        assert client.enqueue(OutboundFrame({"type": "typing", "content": 4}))
+        assert self._queued(client) == [0, 2, 3]
+        
+        # A chat message that cannot fit forces a disconnect
+        assert not client.enqueue(OutboundFrame({"type": "chat", "content": 5}))
+
+    
+    @pytest.mark.asyncio
+    async def test_batching_combines_events_within_window(self):
+        """Events queued inside the window are written as one array frame"""
+        ws = FakeWebSocket()
+        client = ClientConnection(
+            ws, queue_size=100, overflow_policy=QueueOverflowPolicy.DROP_OLDEST,
+            on_failure=lambda c: None, batch_window=0.02
+        )
+        client.start()
+        for i in range(5):
+            client.enqueue(OutboundFrame({"type": "participant_joined", "content": i}))
+        await asyncio.sleep(0.05)
+        
+        assert ws.sent == [[{"type": "participant_joined", "content": i} for i in range(5)]]
+        assert client.frames_written == 1 and client.events_written == 5
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_urgent_event_flushes_batch(self):
+        """A chat event is written immediately, after the events queued before it"""
+        ws = FakeWebSocket()
+        client = ClientConnection(
+            ws, queue_size=100, overflow_policy=QueueOverflowPolicy.DROP_OLDEST,
+            on_failure=lambda c: None, batch_window=5
+        )
+        client.start()
+        client.enqueue(OutboundFrame({"type": "typing", "content": 0}))
+        client.enqueue(OutboundFrame({"type": "chat", "content": 1}))
+        await drain()
+        
+        assert ws.sent == [[{"type": "typing", "content": 0}, {"type": "chat", "content": 1}]]
+        await client.close()
+    
+    @pytest.mark.asyncio
+    async def test_unbatched_clients_get_single_frames(self, manager):
+        """Clients that did not opt in keep receiving one event per frame"""
+        manager = manager()
+        plain, batched = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(plain, "s1", "p1", "P1")
+        await manager.connect(batched, "s1", "p2", "P2", batching=True)
+        await drain()
+        plain.sent.clear()
+        
+        for i in range(3):
+            await manager.broadcast_to_session("s1", {"type": "notice", "content": i})
+        await asyncio.sleep(0.05)
+        
+        assert plain.sent == [{"type": "notice", "content": i} for i in range(3)]
+        assert batched.sent == [[{"type": "notice", "content": i} for i in range(3)]]
+
+
+class TestWireEncoding:
+    """Test cases for subprotocol negotiation and binary frames"""
+    
+    def test_negotiation_falls_back_to_json(self):
+        """Clients that offer nothing we know get plain JSON"""
+        assert negotiate_encoding([]) == (None, WireEncoding.JSON)
+        assert negotiate_encoding(["chat.v2"]) == (None, WireEncoding.JSON)
+    
+    def test_negotiation_follows_client_preference(self):
+        """The first supported subprotocol the client offers is accepted"""
+        pytest.importorskip("msgpack")
+        offered = ["chat.v2", "team-llm.msgpack.v1", "team-llm.json.v1"]
+        assert negotiate_encoding(offered) == ("team-llm.msgpack.v1", WireEncoding.MSGPACK)
+        assert negotiate_encoding(offered[::-1]) == ("team-llm.json.v1", WireEncoding.JSON)
+    
+    @pytest.mark.asyncio
+    async def test_mixed_encodings_in_one_session(self, manager):
+        """JSON and MessagePack clients receive the same events"""
+        pytest.importorskip("msgpack")
+        manager = manager()
+        text_ws, binary_ws = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(text_ws, "s1", "p1", "P1")
+        await manager.connect(
+            binary_ws, "s1", "p2", "P2",
+            subprotocol="team-llm.msgpack.v1", encoding=WireEncoding.MSGPACK
+        )
+        await drain()
+        text_ws.sent.clear()
+        
+        await manager.broadcast_to_session("s1", {"type": "chat", "content": "héllo", "sequence_number": 3})
+        await drain()
+        
+        assert binary_ws.subprotocol == "team-llm.msgpack.v1"
+        assert text_ws.sent == [{"type": "chat", "content": "héllo", "sequence_number": 3}]
+        assert binary_ws.sent[-1] == {"type": "chat", "content": "héllo", "sequence_number": 3}
+        assert binary_ws.binary_frames == len(binary_ws.sent)
+    
+    @pytest.mark.asyncio
+    async def test_msgpack_batch_is_one_array(self):
+        """Batched MessagePack events arrive as a single array frame"""
+        pytest.importorskip("msgpack")
+        ws = FakeWebSocket()
+        client = ClientConnection(
+            ws, queue_size=100, overflow_policy=QueueOverflowPolicy.DROP_OLDEST,
+            on_failure=lambda c: None, batch_window=0.02, encoding=WireEncoding.MSGPACK
+        )
+        client.start()
+        for i in range(20):
+            client.enqueue(OutboundFrame({"type": "notice", "content": i}))
+        await asyncio.sleep(0.05)
+        
+        assert ws.sent == [[{"type": "notice", "content": i} for i in range(20)]]
+        assert ws.binary_frames == 1
+        await client.close()
+
+
+class TestReplay:
+    """Test cases for resuming a session from its replay buffer"""
+    
+    def test_buffer_returns_only_missed_events(self):
+        """since() yields the events after last_seq, in order"""
+        buffer = ReplayBuffer(capacity=10)
+        for i in range(5):
+            buffer.append({"type": "chat", "content": i})
+        
+        missed = buffer.since(buffer.epoch, 3)
+        
+        assert [frame.message for frame in missed] == [
+            {"type": "chat", "content": 3, "event_seq": 4},
+            {"type": "chat", "content": 4, "event_seq": 5}
+        ]
+        assert buffer.since(buffer.epoch, 5) == []
+    
+    def test_buffer_refuses_gaps_it_cannot_fill(self):
+        """Overwritten events, unknown epochs and future positions need a snapshot"""
+        buffer = ReplayBuffer(capacity=3)
+        for i in range(10):
+            buffer.append({"type": "chat", "content": i})
+        
+        assert buffer.first_seq == 8
+        assert buffer.since(buffer.epoch, 6) is None
+        assert len(buffer.since(buffer.epoch, 7)) == 3
+        assert buffer.since("other", 9) is None
+        assert buffer.since(buffer.epoch, 11) is None
+    
+    @pytest.mark.asyncio
+    async def test_reconnect_receives_delta(self, manager):
+        """A client resuming from its last event_seq gets exactly what it missed"""
+        manager = manager()
+        watcher, flaky = FakeWebSocket(), FakeWebSocket()
+        await manager.connect(watcher, "s1", "p1", "P1")
+        await manager.connect(flaky, "s1", "p2", "P2")
+        await manager.broadcast_to_session("s1", {"type": "chat", "content": "before"})
+        await drain()
+        epoch, last_seq = manager.replay_position("s1")
+        assert flaky.seqs[-1] == last_seq
+        
+        await manager.disconnect(flaky)
+        for i in range(3):
+            await manager.broadcast_to_session("s1", {"type": "chat", "content": i})
+        await manager.broadcast_to_session("s1", {"type": "typing", "is_typing": True})
+        
+        returning = FakeWebSocket()
+        resumed = await manager.connect(returning, "s1", "p2", "P2", resume_from=(epoch, last_seq))
+        await drain()
+        
+        assert resumed
+        # Its own departure, then the chat; the typing event is not replayed
+        assert returning.sent[0]["type"] == "participant_left"
+        assert [m["content"] for m in returning.sent[1:]] == [0, 1, 2]
+        assert returning.seqs == [last_seq + 1, last_seq + 2, last_seq + 3, last_seq + 4]
+        assert watcher.sent[-1] == {"type": "participant_joined", "participant_id": "p2", "participant_name": "P2"}
+        assert watcher.seqs[-1] == last_seq + 5
+    
+    @pytest.mark.asyncio
+    async def test_large_gap_falls_back_to_snapshot(self, manager):
+        """Nothing is replayed when the buffer no longer covers the gap"""
+        manager = manager()
+        manager.replay_buffer_size = 2
+        ws = FakeWebSocket()
+        await manager.connect(ws, "s1", "p1", "P1")
+        epoch, last_seq = manager.replay_position("s1")
+        for i in range(5):
+            await manager.broadcast_to_session("s1", {"type": "chat", "content": i})
+        
+        returning = FakeWebSocket()
+        resumed = await manager.connect(returning, "s1", "p2", "P2", resume_from=(epoch, last_seq))
+        await drain()
+        
+        assert not resumed
+        assert returning.sent == []
+
+
+class TestBackplane:
+    """Test cases for cross-worker broadcast delivery"""
+    
+    @pytest.mark.asyncio
+    async def test_broadcast_reaches_other_workers(self, manager):
+        """Managers sharing a backplane deliver each other's broadcasts"""
+        backplane = InMemoryBackplane()
+        worker_a = manager(backplane=backplane)
+        worker_b = manager(backplane=backplane)
+        ws_a = FakeWebSocket()
+        ws_b = FakeWebSocket()
+        await worker_a.connect(ws_a, "s1", "pa", "A")
+        await worker_b.connect(ws_b, "s1", "pb", "B")
+        await drain()
+        
+        await worker_a.broadcast_to_session("s1", {"type": "chat", "content": "hi"}, exclude=ws_a)
+        await worker_b.broadcast_to_participants(["pa"], {"type": "notice", "content": "for a"})
+        await drain()
+        
+        assert {"type": "chat", "content": "hi"} in ws_b.sent
+        assert {"type": "chat", "content": "hi"} not in ws_a.sent
+        assert {"type": "notice", "content": "for a"} in ws_a.sent
+        assert {"type": "notice", "content": "for a"} not in ws_b.sent
+        # Worker A heard about B joining on worker B
+        assert {"type": "participant_joined", "participant_id": "pb", "participant_name": "B"} in ws_a.sent
+    
+    @pytest.mark.asyncio
+    async def test_observers_see_broadcasts_from_other_workers(self, manager):
+        """Session observers run on every worker, with or without local connections"""
+        backplane = InMemoryBackplane()
+        worker_a = manager(backplane=backplane)
+        worker_b = manager(backplane=backplane)
+        observed = []
+        worker_b.observe_sessions(lambda session_id, event: observed.append((session_id, event["type"])))
+        
+        await worker_a.broadcast_to_session("s1", {"type": "chat", "content": "hi"})
+        await worker_a.broadcast_to_session("s1", {"type": "typing", "is_typing": True})
+        await worker_a.broadcast_to_participants(["pa"], {"type": "notice", "content": "for a"})
+        
+        # Ephemeral and targeted events are not session history
+        assert observed == [("s1", "chat")]
+    
+    def test_envelope_round_trip(self):
+        """Envelopes survive JSON serialization without re-encoding the frame"""
+        frame = OutboundFrame({"type": "chat", "content": "héllo"})
+        envelope = BackplaneEnvelope(frame=frame, session_id="s1", exclude="abc")
+        
+        restored = BackplaneEnvelope.from_json(envelope.to_json())
+        
+        assert restored.session_id == "s1"
+        assert restored.exclude == "abc"
+        assert restored.frame.event_type == "chat"
+        assert restored.frame.text == frame.text
+        assert restored.frame.message == {"type": "chat", "content": "héllo"}
+    
+    @pytest.mark.asyncio
+    async def test_postgres_large_envelopes_keep_their_order(self, monkeypatch):
+        """An envelope sent by reference is dispatched before notifications that arrived after it"""
+        backplane = PostgresBackplane("postgresql://unused")
+        received = []
+        backplane.subscribe(received.append)
+        stored = BackplaneEnvelope(frame=OutboundFrame({"type": "chat", "content": "x" * 9000}), session_id="s1")
+        
+        async def fetch_payload(ref):
+            await asyncio.sleep(0.02)
+            return stored.to_json() if ref == 7 else None
+        
+        monkeypatch.setattr(backplane, "_fetch_payload", fetch_payload)
+        backplane._on_notify(None, 0, backplane.channel, json.dumps({"ref": 7}))
+        small = BackplaneEnvelope(frame=OutboundFrame({"type": "typing"}), session_id="s1")
+        backplane._on_notify(None, 0, backplane.channel, small.to_json())
+        await asyncio.sleep(0.05)
+        await backplane.stop()
+        
+        assert [envelope.frame.event_type for envelope in received] == ["chat", "typing"]
+        assert received[0].frame.message["content"] == "x" * 9000
+    
+    @pytest.mark.integration
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not os.getenv("TEST_POSTGRES_URL"), reason="TEST_POSTGRES_URL not set")
+    async def test_postgres_listen_notify(self):
+        """Two Postgres backplanes deliver each other's notifications"""
+        dsn = os.environ["TEST_POSTGRES_URL"].replace("postgresql+asyncpg://", "postgresql://")
+        publisher = PostgresBackplane(dsn, channel="team_llm_ws_test")
+        listener = PostgresBackplane(dsn, channel="team_llm_ws_test")
+        received = asyncio.Queue()
+        listener.subscribe(received.put_nowait)
+        await publisher.start()
+        await listener.start()
+        try:
+            await publisher.publish(BackplaneEnvelope(
+                frame=OutboundFrame({"type": "chat", "content": "hi"}),
+                session_id="s1"
+            ))
+            envelope = await asyncio.wait_for(received.get(), timeout=5)
+            assert envelope.session_id == "s1"
+            assert envelope.frame.message == {"type": "chat", "content": "hi"}
+            
+            # Too large for NOTIFY, so it travels through the payload table
+            await publisher.publish(BackplaneEnvelope(
+                frame=OutboundFrame({"type": "chat", "content": "x" * 10000}),
+                session_id="s1"
+            ))
+            envelope = await asyncio.wait_for(received.get(), timeout=5)
+            assert envelope.frame.message["content"] == "x" * 10000
+        finally:
+            await publisher.stop()
+            await listener.stop()
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+
+class TestLivenessMonitor:
+    """Test cases for ping deadlines and expiry"""
+    
+    def _monitor(self, clock, pinged, expired):
+        return LivenessMonitor(
+            idle_timeout=60,
+            pong_timeout=30,
+            on_idle=pinged.append,
+            on_expired=expired.append,
+            clock=clock
+        )
+    
+    def test_idle_connection_is_pinged_then_expired(self):
+        """Silence past the idle timeout pings, silence after the ping expires"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        monitor.register("ws")
+        
+        clock.now = 59
+        monitor.process_due()
+        assert pinged == []
+        
+        clock.now = 60
+        monitor.process_due()
+        assert pinged == ["ws"]
+        
+        clock.now = 90
+        monitor.process_due()
+        assert expired == ["ws"]
+        assert len(monitor) == 0
+    
+    def test_inbound_frames_postpone_ping(self):
+        """Activity pushes the idle deadline back and a pong cancels expiry"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        monitor.register("ws")
+        
+        clock.now = 50
+        monitor.touch("ws")
+        clock.now = 60
+        monitor.process_due()
+        assert pinged == []
+        
+        clock.now = 110
+        monitor.process_due()
+        assert pinged == ["ws"]
+        
+        clock.now = 115
+        monitor.touch("ws")  # pong
+        clock.now = 140
+        monitor.process_due()
+        assert expired == []
+        assert len(monitor) == 1
+    
+    def test_only_due_connections_are_examined(self):
+        """Connections whose deadline has not passed are not visited"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        for i in range(1000):
+            clock.now = i * 0.01
+            monitor.register(i)
+        
+        clock.now = 60.05
+        examined = monitor.process_due()
+        
+        assert examined == 6
+        assert pinged == [0, 1, 2, 3, 4, 5]
+    
+    def test_unregistered_connections_are_ignored(self):
+        """A removed connection is neither pinged nor expired"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        monitor.register("ws")
+        monitor.unregister("ws")
+        
+        clock.now = 200
+        monitor.process_due()
+        assert pinged == [] and expired == []
+    
+    def test_restarts_on_a_new_event_loop(self):
+        """A monitor started on a closed loop runs again on the next one"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        
+        async def run_once():
+            clock.now = 0
+            monitor.start()
+            monitor.register("ws")
+            clock.now = 60
+            monitor._wakeup.set()
+            await asyncio.sleep(0.01)
+            monitor.unregister("ws")
+        
+        asyncio.run(run_once())
+        assert pinged == ["ws"]
+        asyncio.run(run_once())
+        assert pinged == ["ws", "ws"]
+    
+    @pytest.mark.asyncio
+    async def test_errors_back_off(self, monkeypatch):
+        """A failing iteration waits before retrying instead of spinning"""
+        clock, pinged, expired = FakeClock(), [], []
+        monitor = self._monitor(clock, pinged, expired)
+        calls = []
+        
+        def fail():
+            calls.append(1)
+            raise RuntimeError("boom")
+        
+        monkeypatch.setattr(monitor, "process_due", fail)
+        monkeypatch.setattr(monitor, "ERROR_BACKOFF", 0.05)
+        monitor.register("ws")
+        clock.now = 60
+        monitor.start()
+        await asyncio.sleep(0.3)
+        await monitor.stop()
+        
+        # 0.05 + 0.1 + 0.2 seconds of backoff fit at most three failures
+        assert 1 <= len(calls) <= 4
+
+
+class TestTypingTracker:
+    """Test cases for typing indicator coalescing"""
+    
+    def _tracker(self, emitted, min_interval=0.05, timeout=0.1):
+        async def emit(session_id, participant_id, name, is_typing, source):
+            emitted.append((participant_id, is_typing))
+        return TypingTracker(emit, min_interval=min_interval, timeout=timeout)
+    
+    @pytest.mark.asyncio
+    async def test_keystrokes_collapse_to_one_transition(self):
+        """A burst of typing frames produces a single started event"""
+        emitted = []
+        tracker = self._tracker(emitted, timeout=1)
+        for _ in range(50):
+            await tracker.update("s1", "p1", "P1", True)
+        await tracker.update("s1", "p1", "P1", False)
+        await asyncio.sleep(0.08)
+        
+        assert emitted == [("p1", True), ("p1", False)]
+        tracker.clear()
+    
+    @pytest.mark.asyncio
+    async def test_typing_expires_without_refresh(self):
+        """A participant who goes quiet is reported as stopped"""
+        emitted = []
+        tracker = self._tracker(emitted, timeout=0.05)
+        await tracker.update("s1", "p1", "P1", True)
+        await asyncio.sleep(0.12)
+        
+        assert emitted == [("p1", True), ("p1", False)]
+        assert not tracker.is_typing("s1", "p1")
+    
+    @pytest.mark.asyncio
+    async def test_flapping_is_throttled(self):
+        """Rapid start/stop toggles are rate limited and settle on the final state"""
+        emitted = []
+        tracker = self._tracker(emitted, min_interval=0.05, timeout=1)
+        for i in range(10):
+            await tracker.update("s1", "p1", "P1", i % 2 == 0)
+        assert emitted == [("p1", True)]
+        
+        await asyncio.sleep(0.08)
+        assert emitted == [("p1", True), ("p1", False)]
+        tracker.clear()
+    
+    @pytest.mark.asyncio
+    async def test_forget_reports_stop(self):
+        """Disconnecting while typing clears the indicator for others"""
+        emitted = []
+        tracker = self._tracker(emitted, timeout=1)
+        await tracker.update("s1", "p1", "P1", True)
+        await tracker.forget("s1", "p1")
+        
+        assert emitted == [("p1", True), ("p1", False)]
+
+
+class TestAITurnScheduler:
+    """Test cases for background AI turns"""
+    
+    @pytest.mark.asyncio
+    async def test_schedule_returns_immediately(self):
+        """A slow turn does not block the caller"""
+        scheduler = AITurnScheduler()
+        finished = asyncio.Event()
+        
+        async def slow_turn():
+            await asyncio.sleep(0.05)
+            finished.set()
+        
+        task = scheduler.schedule("s1", slow_turn)
+        assert scheduler.is_running("s1") and not finished.is_set()
+        
+        await task
+        assert finished.is_set() and not scheduler.is_running("s1")
+    
+    @pytest.mark.asyncio
+    async def test_newer_input_supersedes_running_turn(self):
+        """Only the turn for the latest message completes"""
+        scheduler = AITurnScheduler()
+        completed = []
+        
+        def turn(label):
+            async def run():
+                await asyncio.sleep(0.02)
+                completed.append(label)
+            return run
+        
+        scheduler.schedule("s1", turn("first"))
+        scheduler.schedule("s2", turn("other session"))
+        await asyncio.sleep(0)
+        latest = scheduler.schedule("s1", turn("second"))
+        await latest
+        await asyncio.sleep(0.03)
+        
+        assert sorted(completed) == ["other session", "second"]
+        assert scheduler.superseded == 1
+    
+    @pytest.mark.asyncio
+    async def test_shielded_delivery_survives_supersede(self):
+        """Work a turn shields is finished even when the turn is cancelled"""
+        scheduler = AITurnScheduler()
+        delivered = []
+        
+        async def deliver():
+            await asyncio.sleep(0.02)
+            delivered.append("reply")
+        
+        async def turn():
+            await asyncio.shield(deliver())
+        
+        scheduler.schedule("s1", turn)
+        await asyncio.sleep(0.005)
+        scheduler.cancel("s1")
+        await asyncio.sleep(0.03)
+        
+        assert delivered == ["reply"]
+
+
+class TestReplyPacer:
+    """Test cases for staggered delivery of AI replies"""
+    
+    @pytest.mark.asyncio
+    async def test_reply_waits_for_typing_time(self):
+        """A reply is not sent before it could have been typed"""
+        pacer = ReplyPacer(chars_per_second=100, min_delay=0, min_gap=0)
+        
+        async with pacer.slot("x" * 5):
+            elapsed = asyncio.get_running_loop().time() - pacer.started
+        
+        assert elapsed >= 0.05
+    
+    @pytest.mark.asyncio
+    async def test_persona_speed_overrides_default(self):
+        """Slower typists take longer for the same reply"""
+        pacer = ReplyPacer(chars_per_second=100, min_delay=0.01, min_gap=0)
+        
+        assert pacer.typing_time("x" * 10) == pytest.approx(0.1)
+        assert pacer.typing_time("x" * 10, chars_per_second=50) == pytest.approx(0.2)
+        assert pacer.typing_time("") == pytest.approx(0.01)
+    
+    @pytest.mark.asyncio
+    async def test_streamed_text_is_released_at_typing_speed(self):
+        """until_typed waits for the characters typed so far"""
+        pacer = ReplyPacer(chars_per_second=200, min_delay=0, min_gap=0)
+        
+        await pacer.until_typed(10)
+        
+        assert asyncio.get_running_loop().time() - pacer.started >= 0.05
+    
+    @pytest.mark.asyncio
+    async def test_replies_ready_together_are_spaced_out(self):
+        """Shorter replies go first and consecutive replies keep the minimum gap"""
+        pacer = ReplyPacer(chars_per_second=1000, min_delay=0, min_gap=0.03)
+        loop = asyncio.get_running_loop()
+        sent = []
+        
+        async def send(content):
+            async with pacer.slot(content):
+                sent.append((content, loop.time() - pacer.started))
+        
+        await asyncio.gather(send("x" * 40), send("x" * 10))
+        
+        assert [content for content, _ in sent] == ["x" * 10, "x" * 40]
+        assert sent[1][1] - sent[0][1] >= 0.03
+
+
+class TestInboundRateLimiter:
+    """Test cases for per-participant and per-session event budgets"""
+    
+    def _limiter(self, clock):
+        # Chat: 1/s with bursts of 2 per participant, 2/s with bursts of 3 per session
+        return InboundRateLimiter({"chat": ((1.0, 2), (2.0, 3))}, clock=clock)
+    
+    def test_burst_then_refill(self):
+        """A participant can burst up to capacity and then regains one event per second"""
+        clock = FakeClock()
+        limiter = self._limiter(clock)
+        
+        assert limiter.check("s1", "p1", "chat") is None
+        assert limiter.check("s1", "p1", "chat") is None
+        limited = limiter.check("s1", "p1", "chat")
+        assert limited.scope == "participant" and limited.retry_after == pytest.approx(1.0)
+        
+        clock.now = 1.0
+        assert limiter.check("s1", "p1", "chat") is None
+        assert limiter.check("s1", "p1", "typing") is None  # Not limited
+    
+    def test_session_budget_is_shared(self):
+        """Participants within their own budgets can still exhaust the session's"""
+        limiter = self._limiter(FakeClock())
+        
+        assert limiter.check("s1", "p1", "chat") is None
+        assert limiter.check("s1", "p1", "chat") is None
+        assert limiter.check("s1", "p2", "chat") is None
+        assert limiter.check("s1", "p2", "chat").scope == "session"
+        assert limiter.check("s2", "p3", "chat") is None
+    
+    def test_violations_are_reported_once_per_window(self):
+        """A flood gets one notification until the budget would allow an event again"""
+        clock = FakeClock()
+        limiter = self._limiter(clock)
+        for _ in range(2):
+            limiter.check("s1", "p1", "chat")
+        
+        notifications = [limiter.check("s1", "p1", "chat").notify for _ in range(5)]
+        assert notifications == [True, False, False, False, False]
+        assert limiter.rejected == 5
+        
+        clock.now = 1.5
+        assert limiter.check("s1", "p1", "chat") is None
+        assert limiter.check("s1", "p1", "chat").notify is True
+    
+    def test_forget_resets_budgets(self):
+        """A participant who reconnects after leaving starts with a full budget"""
+        limiter = self._limiter(FakeClock())
+        for _ in range(2):
+            limiter.check("s1", "p1", "chat")
+        
+        limiter.forget_participant("s1", "p1")
+        limiter.forget_session("s1")
+        assert limiter.check("s1", "p1", "chat") is None
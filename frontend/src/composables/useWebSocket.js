@@ -6,6 +6,19 @@ export function useWebSocket(url = null) {
   const messages = ref([])
   const participants = ref([])
   const typingUsers = ref(new Set())
+  // Resume token: lets a reconnect fetch only the events it missed
+  const epoch = ref(null)
+  const lastEventSeq = ref(0)
+  // Events that arrive before session_info are held until its epoch is known
+  let pending = null
+  
+  const resumeUrl = (wsUrl) => {
+    if (!epoch.value) {
+      return wsUrl
+    }
+    const separator = wsUrl.includes('?') ? '&' : '?'
+    return `${wsUrl}${separator}epoch=${epoch.value}&last_seq=${lastEventSeq.value}`
+  }
   
   const connect = (wsUrl = url) => {
     if (!wsUrl) {
@@ -13,7 +26,8 @@ export function useWebSocket(url = null) {
       return
     }
     
-    socket.value = new WebSocket(wsUrl)
+    socket.value = new WebSocket(resumeUrl(wsUrl))
+    pending = []
     
     socket.value.onopen = () => {
       console.log('WebSocket connected')
@@ -36,9 +50,83 @@ export function useWebSocket(url = null) {
   }
   
   const handleMessage = (data) => {
+    if (data.type === 'session_info') {
+      participants.value = data.participants
+      // A new epoch restarts the sequence; within one it never goes back
+      if (data.epoch !== epoch.value) {
+        epoch.value = data.epoch
+        lastEventSeq.value = 0
+      }
+      // Held events were queued before session_info, so its event_seq covers them
+      const held = pending || []
+      pending = null
+      held.forEach(applyEvent)
+      if (data.event_seq > lastEventSeq.value) {
+        lastEventSeq.value = data.event_seq
+      }
+      return
+    }
+    if (pending && data.event_seq) {
+      pending.push(data)
+      return
+    }
+    applyEvent(data)
+  }
+  
+  const applyEvent = (data) => {
+    if (data.event_seq) {
+      // Already seen, e.g. replayed again after a reconnect
+      if (data.event_seq <= lastEventSeq.value) {
+        return
+      }
+      lastEventSeq.value = data.event_seq
+    }
+    
     switch (data.type) {
-      case 'chat':
-        messages.value.push(data)
+      case 'ping':
+        // Answer server liveness checks
+        socket.value.send(JSON.stringify({ type: 'pong' }))
+        break
+        
+      case 'chat': {
+        if (data.message_id && messages.value.some(m => m.message_id === data.message_id)) {
+          break
+        }
+        // A streamed reply replaces the draft built from its deltas
+        const draft = data.stream_id
+          ? messages.value.findIndex(m => m.stream_id === data.stream_id)
+          : -1
+        if (draft >= 0) {
+          messages.value.splice(draft, 1, data)
+        } else {
+          messages.value.push(data)
+        }
+        break
+      }
+        
+      case 'chat_delta': {
+        const draft = messages.value.find(m => m.stream_id === data.stream_id)
+        if (draft) {
+          draft.content += data.delta
+        } else {
+          messages.value.push({
+            stream_id: data.stream_id,
+            participant_id: data.participant_id,
+            participant_name: data.participant_name,
+            participant_type: 'AI',
+            content: data.delta,
+            timestamp: new Date().toISOString(),
+            streaming: true
+          })
+        }
+        break
+      }
+        
+      case 'chat_delta_cancelled':
+        // The reply was abandoned; drop its draft
+        messages.value = messages.value.filter(
+          m => !(m.streaming && m.stream_id === data.stream_id)
+        )
         break
         
       case 'participant_joined':
@@ -56,10 +144,6 @@ export function useWebSocket(url = null) {
           typingUsers.value.delete(data.participant_id)
         }
         break
-        
-      case 'session_info':
-        participants.value = data.participants
-        break
     }
   }
   
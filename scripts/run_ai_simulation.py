@@ -145,6 +145,10 @@ class AIAgent:
         try:
             async for message in self.websocket:
                 data = json.loads(message)
+                if data.get("type") == "ping":
+                    # Answer server liveness checks
+                    await self.websocket.send(json.dumps({"type": "pong"}))
+                    continue
                 await message_handler(self, data)
         except websockets.exceptions.ConnectionClosed:
             print(f"❌ {self.name} disconnected")